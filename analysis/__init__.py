@@ -0,0 +1,37 @@
+"""Shared data loading for the plot_*.py scripts.
+
+``columnar`` (pandas, pyarrow) and ``stream`` are only imported when one of
+their names is first used, so ``analysis.validator`` and the other tools
+that need neither start without them.
+"""
+import importlib
+
+from .cache import cached
+from .groups import (
+    UNGROUPED,
+    UNOPTIMIZED,
+    GroupIndex,
+    extract_numeric,
+    load_contract_groups,
+    parse_prefix,
+)
+
+_LAZY = {
+    "read_results": "columnar",
+    "write_table": "columnar",
+    "follow": "stream",
+    "load_records": "stream",
+    "read_records": "stream",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
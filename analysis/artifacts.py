@@ -0,0 +1,51 @@
+"""Access to the compiled variants stored under ``evaluation/<prefix>/``."""
+import json
+import os
+
+EVALUATION_DIR = "./evaluation"
+
+
+def list_prefixes(evaluation_dir=EVALUATION_DIR):
+    return sorted(
+        entry for entry in os.listdir(evaluation_dir)
+        if os.path.isdir(os.path.join(evaluation_dir, entry))
+    )
+
+
+def artifact_path(prefix, contract_name, evaluation_dir=EVALUATION_DIR):
+    return os.path.join(evaluation_dir, prefix, f"{contract_name}.json")
+
+
+def hex_to_bytes(value):
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def load_deployed_bytecode(path):
+    # Runtime code as returned by eth_getCode for contracts without immutables
+    with open(path, "r") as file:
+        artifact = json.load(file)
+    return hex_to_bytes(artifact["deployedBytecode"])
+
+
+def iter_deployed_bytecodes(contract_name, prefixes=None, evaluation_dir=EVALUATION_DIR):
+    """Yield ``(prefix, runtime bytecode)`` for every variant of a contract.
+
+    The code comes from the artifact pack when it holds the variant, as a
+    memoryview into the mapping, and as ``bytes`` from the JSON artifact
+    otherwise. Callers that keep, hash by value or pickle it copy it.
+    """
+    from .pack import ArtifactPack
+
+    pack = ArtifactPack.open(evaluation_dir)
+    try:
+        for prefix in prefixes or list_prefixes(evaluation_dir):
+            code = pack and pack.deployed_bytecode(prefix, contract_name)
+            if code is not None:
+                yield prefix, code
+                continue
+            path = artifact_path(prefix, contract_name, evaluation_dir)
+            if os.path.isfile(path):
+                yield prefix, load_deployed_bytecode(path)
+    finally:
+        if pack:
+            pack.close()
@@ -0,0 +1,83 @@
+"""On-disk cache for parsed analysis inputs.
+
+Entries are keyed by the source files they were built from. A source is
+considered unchanged when its mtime and size match the recorded values; if
+only the mtime moved, the content hash decides, so touching a file does not
+force a rebuild.
+"""
+import hashlib
+import os
+import pickle
+
+CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", ".analysis_cache")
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _entry_path(name, sources, version):
+    key = hashlib.sha256(
+        "\0".join([name, repr(version)] + [os.path.abspath(p) for p in sources]).encode()
+    ).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, f"{name}-{key}.pkl")
+
+
+def _is_fresh(recorded, path):
+    mtime, size = _stat(path)
+    if recorded["size"] != size:
+        return False
+    if recorded["mtime"] == mtime:
+        return True
+    if recorded["sha256"] != file_digest(path):
+        return False
+    recorded["mtime"] = mtime  # same content, remember the new mtime
+    return True
+
+
+def cached(name, sources, build, version=1):
+    """Return ``build()`` for ``sources``, reusing a stored result if fresh.
+
+    ``name`` and ``version`` separate different kinds of entries; bump
+    ``version`` whenever the shape of the built value changes.
+    """
+    sources = list(sources)
+    entry_path = _entry_path(name, sources, version)
+
+    try:
+        with open(entry_path, "rb") as file:
+            entry = pickle.load(file)
+        before = repr(entry["sources"])
+        if entry["version"] == version and all(
+            _is_fresh(entry["sources"][p], p) for p in sources
+        ):
+            if repr(entry["sources"]) != before:
+                _store(entry_path, entry)
+            return entry["value"]
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+        pass
+
+    recorded = {}
+    for p in sources:
+        mtime, size = _stat(p)
+        recorded[p] = {"mtime": mtime, "size": size, "sha256": file_digest(p)}
+    value = build()
+    _store(entry_path, {"version": version, "sources": recorded, "value": value})
+    return value
+
+
+def _store(entry_path, entry):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry_path)
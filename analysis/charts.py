@@ -0,0 +1,363 @@
+"""The charts of the plot_*.py scripts as reusable prepare/draw pairs.
+
+Each chart reads one result set, turns it into the frame it plots
+(``prepare``, pure pandas) and draws that frame onto a Matplotlib axes
+(``draw``). The plot scripts print the prepared frames and show the
+figures; ``analysis.render`` renders many charts headless in parallel.
+Matplotlib and seaborn are only imported once something is drawn.
+
+Axis ranges that used to be fixed (300,000-1,100,000 for the TokenValidator
+bars, 24,000-28,000 for the hash bars) come from the data via
+``axis_ticks``, with the same kind of round tick steps.
+"""
+import math
+from typing import Callable, NamedTuple, Optional
+
+from .columnar import read_results
+from .groups import UNOPTIMIZED
+
+
+class Chart(NamedTuple):
+    result_set: str  # key of columnar.RESULT_SETS
+    columns: list  # columns read from the results
+    prepare: Callable  # results frame -> data to draw, None if there is nothing to plot
+    draw: Callable  # (axes, data) -> None
+    output: str  # file the plot script saves it to
+    figsize: Optional[tuple] = None  # None keeps Matplotlib's default size
+
+
+def axis_ticks(low, high, ticks=8):
+    """Round ``(start, stop, step)`` with ``start < low`` and ``high < stop``, about ``ticks`` steps apart.
+
+    ``step`` is 1, 2, 2.5 or 5 times a power of ten; ``start`` and ``stop``
+    are multiples of it. Both keep a gap to the data, so no bar ends on the
+    edge of the plot.
+    """
+    span = high - low or abs(high) or 1
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(f * magnitude for f in (1, 2, 2.5, 5, 10) if f * magnitude >= raw)
+    return (math.ceil(low / step) - 1) * step, (math.floor(high / step) + 1) * step, step
+
+
+def add_commas(value, tick_number):
+    return f'{int(value):,}'
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _comma_axis(ax):
+    from matplotlib.ticker import FuncFormatter
+    ax.yaxis.set_major_formatter(FuncFormatter(add_commas))
+
+
+def _rotate_xticks(ax):
+    _pyplot().setp(ax.get_xticklabels(), rotation=45, ha="right")
+
+
+# TokenValidator: runtime cost of the optimized and unoptimized validator and the token deployment per group
+
+def prepare_tokenvalidator(df):
+    df = df.drop_duplicates()
+    df = df.loc[df.groupby(['ozTokenAGroup'], observed=True)['deploymentCostToken'].idxmin()]
+    df["gasUnOptimized"] = df["gasUsedUnoptimized"] - df["gasUsedOptimized"]
+    # "none" first, then the groups in order (the group column is an ordered categorical)
+    return df.sort_values("ozTokenAGroup")
+
+
+def draw_tokenvalidator(ax, df):
+    import numpy as np
+
+    groups = df["ozTokenAGroup"].astype(str)
+    bar_width = 0.4  # Keep bars narrow to avoid overlap
+
+    # Stacked bar components
+    ax.bar(groups, df["gasUsedOptimized"], label="Optimized Validator (Runtime Cost)", width=bar_width)
+    ax.bar(groups, df["gasUnOptimized"], bottom=df["gasUsedOptimized"], label="Unoptimized Validator (Excess Cost)", width=bar_width)
+    ax.plot(groups, df["deploymentCostToken"], color="black", marker="o", linestyle="--", label="Deployment Cost Token")
+
+    # Y-axis from the lowest to the highest value, with a help line at every tick
+    values = [df["gasUsedOptimized"].min(), df["gasUsedUnoptimized"].max(), df["deploymentCostToken"].min(), df["deploymentCostToken"].max()]
+    lowest_tick, highest_tick, step = axis_ticks(float(min(values)), float(max(values)))
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_ylim(lowest_tick * 0.9, highest_tick)
+    ax.set_yticks(np.arange(lowest_tick, highest_tick, step))
+    _comma_axis(ax)
+    for line in np.arange(lowest_tick, highest_tick, step):
+        ax.axhline(y=line, color='gray', linestyle='--', linewidth=0.8)
+
+    ax.set_title("Gas Usage Breakdown by Optimization Level", fontsize=16)
+    ax.set_xlabel("Optimization Level of Token", fontsize=12)
+    ax.set_ylabel("Gas Used", fontsize=12)
+    _rotate_xticks(ax)
+    ax.legend(title="Gas Usage Components", fontsize=10)
+
+
+# Hash: getCodeHash with and without metadata, optimized and unoptimized validator, per group
+
+HASH_GAS = ["gasUsedOptimizedNoMeta", "gasUsedUnoptimizedNoMeta", "gasUsedOptimizedMeta", "gasUsedUnoptimizedMeta"]
+
+
+def prepare_hash(df):
+    # Remove rows where prefixes couldn't be parsed (optional)
+    df = df[df['ozTokenAOptimizerRuns'] != UNOPTIMIZED]
+    df = df.drop(columns=['ozTokenAOptimizerRuns']).drop_duplicates()
+
+    # Calculate the stacked values
+    df["Meta"] = df["gasUsedOptimizedMeta"]
+    df["UnoptimizedMeta"] = df["gasUsedUnoptimizedMeta"] - df["gasUsedOptimizedMeta"]
+    df["OptimizedNoMeta"] = df["gasUsedOptimizedNoMeta"] - df["gasUsedUnoptimizedMeta"]
+    df["UnoptimizedNoMeta"] = df["gasUsedUnoptimizedNoMeta"] - df["gasUsedOptimizedNoMeta"]
+    return df.sort_values(by="ozTokenAGroup")
+
+
+def draw_hash(ax, df):
+    import numpy as np
+
+    groups = df["ozTokenAGroup"].astype(str)
+    bar_width = 0.4
+    ax.bar(groups, df["Meta"], label="Optimized Hashvalidator", width=bar_width)
+    ax.bar(groups, df["UnoptimizedMeta"], bottom=df["Meta"], label="Unoptimized Hashvalidator", width=bar_width)
+    ax.bar(groups, df["OptimizedNoMeta"], bottom=df["Meta"] + df["UnoptimizedMeta"], label="Optimized Meta Data Excluding Hashvalidator", width=bar_width)
+    ax.bar(
+        groups,
+        df["UnoptimizedNoMeta"],
+        bottom=df["Meta"] + df["UnoptimizedMeta"] + df["OptimizedNoMeta"],
+        label="Unoptimized Meta Data Excluding Hashvalidator",
+        width=bar_width,
+    )
+
+    # The stacks start at the optimized Meta hash and end at the unoptimized NoMeta hash
+    low, high, step = axis_ticks(float(df["Meta"].min()), float(df["gasUsedUnoptimizedNoMeta"].max()))
+    ax.set_ylim(low, high)
+    for line in np.arange(low + step, high, step):
+        ax.axhline(y=line, color='gray', linestyle='--', linewidth=0.8)
+
+    ax.set_title("Gas Usage Breakdown by Optimization Level", fontsize=16)
+    ax.set_xlabel("ozTokenGroup", fontsize=12)
+    ax.set_ylabel("Gas Used", fontsize=12)
+    _rotate_xticks(ax)
+    ax.legend(title="Gas Usage Components", fontsize=10)
+
+
+# AuditCheck: gas per token and AuditCheck group, and gas per token by validateTokens batch size
+
+AUDITOR_COLUMNS = [
+    "tokenOptimizerRuns",
+    "auditCheckOptimizerRuns",
+    "tokenGroup",
+    "auditCheckGroup",
+    "checkContract",
+    "method",
+    "batchSize",
+    "gasUsed",
+    "gasPerToken",
+]
+
+
+def prepare_auditor_heatmap(results):
+    # The heatmap shows the original AuditCheck, the batch chart the AuditCheckHash variant
+    df = results[(results["checkContract"] == "AuditCheck") & (results["method"] == "validateToken")]
+    df = df[(df['tokenOptimizerRuns'] != UNOPTIMIZED) & (df['auditCheckOptimizerRuns'] != UNOPTIMIZED)]
+    df = df[["tokenGroup", "auditCheckGroup", "gasUsed"]].drop_duplicates()
+
+    # Gas used as float, seaborn can't handle nullable ints
+    heatmap_data = df.pivot(index='tokenGroup', columns='auditCheckGroup', values='gasUsed').astype("float64")
+    heatmap_data = heatmap_data.sort_index(ascending=False, axis=0)  # TokenGroups (rows)
+    return heatmap_data.sort_index(ascending=True, axis=1)  # AuditCheckGroups (columns)
+
+
+def draw_auditor_heatmap(ax, heatmap_data):
+    import seaborn as sns
+
+    sns.heatmap(
+        heatmap_data,
+        ax=ax,
+        annot=False,  # Disable text annotations inside cells
+        cmap="viridis",
+        cbar_kws={"label": "Gas Used"},
+        linewidths=0.5,
+        linecolor='gray'
+    )
+    ax.set_title("Validation Gas Consumption Heatmap", fontsize=16)
+    ax.set_xlabel("AuditCheck Optimization Level", fontsize=12)
+    ax.set_ylabel("Token Optimization Level", fontsize=12)
+    _rotate_xticks(ax)
+
+
+class BatchGas(NamedTuple):
+    per_batch: object  # mean gas per token, batch size x AuditCheck group
+    reference: float  # mean of AuditCheck.validateToken
+    single: float  # mean of AuditCheckHash.validateToken
+
+
+def prepare_auditor_batch(results):
+    # Gas per token by batch size, averaged over the whole optimizer grid
+    batch = results[(results["tokenOptimizerRuns"] != UNOPTIMIZED) & (results["auditCheckOptimizerRuns"] != UNOPTIMIZED)]
+    if not (batch["checkContract"] == "AuditCheckHash").any():
+        return None
+    batch = batch.astype({"gasPerToken": "float64"})
+    reference = batch[batch["checkContract"] == "AuditCheck"]["gasPerToken"].mean()
+    single = batch[(batch["checkContract"] == "AuditCheckHash") & (batch["method"] == "validateToken")]["gasPerToken"].mean()
+    per_batch = (
+        batch[batch["method"] == "validateTokens"]
+        .groupby(["batchSize", "auditCheckGroup"], observed=True)["gasPerToken"]
+        .mean()
+        .unstack("auditCheckGroup")
+    )
+    return BatchGas(per_batch, reference, single)
+
+
+def draw_auditor_batch(ax, data):
+    per_batch = data.per_batch
+    for group in per_batch.columns:
+        ax.plot(per_batch.index, per_batch[group], marker="o", label=f"validateTokens, AuditCheck {group}")
+    ax.axhline(y=data.reference, color="black", linestyle="--", label="AuditCheck.validateToken")
+    ax.axhline(y=data.single, color="gray", linestyle=":", label="AuditCheckHash.validateToken")
+    ax.set_xscale("log", base=2)
+    ax.set_xticks(per_batch.index, [str(size) for size in per_batch.index])
+    ax.set_title("Validation Gas per Token by Batch Size", fontsize=16)
+    ax.set_xlabel("Tokens per validateTokens Call", fontsize=12)
+    ax.set_ylabel("Gas Used per Token", fontsize=12)
+    ax.legend(fontsize=10)
+
+
+# Per-variant line charts of the TokenValidator lookups
+
+def _prepare_by_runs(df):
+    # Unoptimized (UNOPTIMIZED = -1) first, then ascending optimizer runs
+    return df.sort_values("ozTokenAOptimizerRuns").reset_index(drop=True)
+
+
+def prepare_dispatch_index(df):
+    df = _prepare_by_runs(df)
+    df["savingIndexed"] = df["gasUsedScan"] - df["gasUsedIndexed"]
+    df["savingOffset"] = df["gasUsedScan"] - df["gasUsedOffset"]
+    return df
+
+
+def prepare_verdict_cache(df):
+    df = _prepare_by_runs(df)
+    # Extra cost of storing the verdict on the first call, saving on every later one
+    df["storeOverhead"] = df["gasUsedCold"] - df["gasUsedScan"]
+    df["savingWarm"] = df["gasUsedScan"] - df["gasUsedWarm"]
+    return df
+
+
+def _draw_by_runs(ax, df, lines, title, legend):
+    import numpy as np
+
+    x = np.arange(len(df))
+    for column, marker, label in lines:
+        ax.plot(x, df[column].astype("float64"), marker=marker, label=label)
+
+    # Mark where the token group changes
+    groups = df["ozTokenAGroup"].astype(str).tolist()
+    for i in range(1, len(groups)):
+        if groups[i] != groups[i - 1]:
+            ax.axvline(x=i - 0.5, color='gray', linestyle='--', linewidth=0.8)
+
+    _comma_axis(ax)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel("Optimizer Runs of Token", fontsize=12)
+    ax.set_ylabel("Gas Used", fontsize=12)
+    labels = ["none" if runs == UNOPTIMIZED else f"{runs:,}" for runs in df["ozTokenAOptimizerRuns"]]
+    ax.set_xticks(x, labels)
+    _rotate_xticks(ax)
+    ax.legend(title=legend, fontsize=10)
+
+
+def draw_dispatch_index(ax, df):
+    lines = [
+        ("gasUsedScan", "o", "Full Bytecode Scan (validateToken)"),
+        ("gasUsedIndexed", "s", "Dispatcher Walk (validateTokenIndexed)"),
+        ("gasUsedOffset", "^", "Supplied Offset (validateTokenAt)"),
+    ]
+    _draw_by_runs(ax, df, lines, "Transfer Lookup Gas by Token Optimization Level", "Lookup")
+
+
+def draw_verdict_cache(ax, df):
+    lines = [
+        ("gasUsedScan", "o", "Uncached (validateToken)"),
+        ("gasUsedCold", "s", "Cold Call (validateTokenCached)"),
+        ("gasUsedWarm", "^", "Warm Call (validateTokenCached)"),
+    ]
+    _draw_by_runs(ax, df, lines, "Cached Validation Gas by Token Optimization Level", "Call")
+
+
+CHARTS = {
+    "tokenvalidator": Chart(
+        "evaluation_results",
+        ["ozTokenAGroup", "gasUsedOptimized", "gasUsedUnoptimized", "deploymentCostToken"],
+        prepare_tokenvalidator,
+        draw_tokenvalidator,
+        "barchart_static_analysis.pdf",
+    ),
+    "hash": Chart(
+        "hash_results",
+        ["ozTokenAOptimizerRuns", "ozTokenAGroup"] + HASH_GAS,
+        prepare_hash,
+        draw_hash,
+        "barchart_hash.pdf",
+        (12, 8),
+    ),
+    "auditor_heatmap": Chart(
+        "validation_gas_results", AUDITOR_COLUMNS, prepare_auditor_heatmap, draw_auditor_heatmap, "validation_gas_heatmap.pdf", (12, 8)
+    ),
+    "auditor_batch": Chart(
+        "validation_gas_results", AUDITOR_COLUMNS, prepare_auditor_batch, draw_auditor_batch, "validation_gas_batch.pdf", (12, 8)
+    ),
+    "dispatch_index": Chart(
+        "dispatch_index_results",
+        ["ozTokenAOptimizerRuns", "ozTokenAGroup", "gasUsedScan", "gasUsedIndexed", "gasUsedOffset"],
+        prepare_dispatch_index,
+        draw_dispatch_index,
+        "dispatch_index_gas.pdf",
+        (12, 6),
+    ),
+    "verdict_cache": Chart(
+        "verdict_cache_results",
+        ["ozTokenAOptimizerRuns", "ozTokenAGroup", "gasUsedScan", "gasUsedCold", "gasUsedWarm"],
+        prepare_verdict_cache,
+        draw_verdict_cache,
+        "verdict_cache_gas.pdf",
+        (12, 6),
+    ),
+}
+
+
+def load(name, results_path=None, groups_path="contract_groups.json"):
+    """Read and prepare the data of chart ``name``, None if there is nothing to plot."""
+    chart = CHARTS[name]
+    return chart.prepare(read_results(chart.result_set, chart.columns, groups_path, results_path))
+
+
+def figure(name, data, title=None):
+    """Draw prepared ``data`` as chart ``name`` on a new pyplot figure and return it."""
+    chart = CHARTS[name]
+    fig, ax = _pyplot().subplots(figsize=chart.figsize)
+    chart.draw(ax, data)
+    if title:
+        ax.set_title(title, fontsize=16)
+    fig.tight_layout()
+    return fig
+
+
+def render(name, results_path=None, groups_path="contract_groups.json", output=None, title=None):
+    """Render chart ``name`` to ``output`` (default: the plot script's file), return the path.
+
+    Returns None without writing anything when the results hold nothing to plot.
+    """
+    data = load(name, results_path, groups_path)
+    if data is None:
+        return None
+    output = output or CHARTS[name].output
+    fig = figure(name, data, title)
+    try:
+        fig.savefig(output)
+    finally:
+        _pyplot().close(fig)
+    return output
@@ -0,0 +1,202 @@
+"""Code hashes as computed by ``TokenValidator.getCodeHash``/``getCodeHashNoMeta``.
+
+``getCodeHashNoMeta`` reads the metadata length from the end of the code as
+``uint8(bytecode[len - 2] << 8) + uint8(bytecode[len - 1])``. Shifting a
+``bytes1`` left by 8 leaves nothing, so only the last byte counts. If that
+length ``m`` satisfies ``0 < m < size`` and the byte at ``size - m - 2`` is
+``0xa1`` or ``0xa2``, the last ``m + 2`` bytes are dropped before hashing.
+The contract reverts for code shorter than two bytes and when
+``m == size - 1``; both are reported here with ``noMetaHash = None``.
+
+Artifacts are memory-mapped and the hex of ``deployedBytecode`` is decoded
+straight from the mapping; the metadata is cut off with a memoryview, so
+no extra copy of the code is made.
+"""
+import argparse
+import binascii
+import json
+import mmap
+import os
+from typing import NamedTuple, Optional
+
+from .artifacts import EVALUATION_DIR, artifact_path, list_prefixes
+from .pack import ArtifactPack
+
+_BACKENDS = {}
+_PREFERRED = ("pycryptodome", "pysha3", "eth-hash", "python")
+
+
+def register_backend(name):
+    """Register ``factory() -> keccak256(data) -> bytes`` under ``name``.
+
+    The factory raises ``ImportError`` when its library is missing.
+    """
+    def decorator(factory):
+        _BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+@register_backend("pycryptodome")
+def _pycryptodome():
+    from Crypto.Hash import keccak
+
+    def keccak256(data):
+        return keccak.new(data=data, digest_bits=256).digest()
+    return keccak256
+
+
+@register_backend("pysha3")
+def _pysha3():
+    import sha3
+
+    def keccak256(data):
+        return sha3.keccak_256(data).digest()
+    return keccak256
+
+
+@register_backend("eth-hash")
+def _eth_hash():
+    from eth_hash.auto import keccak
+
+    def keccak256(data):
+        return keccak(bytes(data))
+    return keccak256
+
+
+@register_backend("python")
+def _python():
+    from ._keccak import keccak256
+    return keccak256
+
+
+def get_keccak(name=None, native=False):
+    """Return a keccak256 function, the fastest installed one if ``name`` is None.
+
+    With ``native`` the pure Python fallback is not considered, and
+    ``ImportError`` is raised when no library backend is installed.
+    """
+    if name is not None:
+        return _BACKENDS[name]()
+    for candidate in _PREFERRED + tuple(n for n in _BACKENDS if n not in _PREFERRED):
+        if native and candidate == "python":
+            continue
+        try:
+            return _BACKENDS[candidate]()
+        except ImportError:
+            continue
+    if native:
+        raise ImportError("no native keccak backend installed, e.g. pip install pycryptodome")
+    raise ImportError("no keccak backend available")
+
+
+class CodeHashes(NamedTuple):
+    full_hash: bytes  # getCodeHash (extcodehash)
+    no_meta_hash: Optional[bytes]  # getCodeHashNoMeta, None if it reverts
+    meta_length: int  # CBOR length read from the code, 0 if nothing was stripped
+
+
+def metadata_length(code):
+    """Number of trailing metadata bytes (CBOR length, excluding the 2 length bytes).
+
+    Returns 0 if ``getCodeHashNoMeta`` keeps the code as is and None if it reverts.
+    """
+    size = len(code)
+    if size < 2:
+        return None
+    meta_length = code[-1]
+    if 0 < meta_length < size:
+        if meta_length == size - 1:
+            return None
+        if code[size - meta_length - 2] in (0xA1, 0xA2):
+            return meta_length
+    return 0
+
+
+def hash_code(code, keccak256=None):
+    """Return ``CodeHashes`` for one runtime bytecode (bytes-like)."""
+    keccak256 = keccak256 or get_keccak()
+    view = memoryview(code)
+    full_hash = keccak256(view)
+    meta_length = metadata_length(view)
+    if meta_length is None:
+        return CodeHashes(full_hash, None, 0)
+    if meta_length == 0:
+        return CodeHashes(full_hash, full_hash, 0)
+    return CodeHashes(full_hash, keccak256(view[:len(view) - meta_length - 2]), meta_length)
+
+
+_FIELD = b'"deployedBytecode"'
+
+
+def read_deployed_bytecode(path):
+    """Decode ``deployedBytecode`` from a mapped artifact without parsing the JSON."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        key = mapped.find(_FIELD)
+        if key < 0:
+            raise ValueError(f"{path}: no deployedBytecode")
+        start = mapped.find(b'"', key + len(_FIELD)) + 1
+        end = mapped.find(b'"', start)
+        if mapped[start:start + 2] == b"0x":
+            start += 2
+        with memoryview(mapped) as view:
+            return binascii.unhexlify(view[start:end])
+
+
+def iter_artifact_hashes(paths, keccak256=None):
+    """Yield ``(path, CodeHashes)`` for each artifact path, one file at a time."""
+    keccak256 = keccak256 or get_keccak()
+    for path in paths:
+        yield path, hash_code(read_deployed_bytecode(path), keccak256)
+
+
+def hash_table(contract_names, prefixes=None, evaluation_dir=EVALUATION_DIR, keccak256=None):
+    """Rows of ``(contract, prefix, fullHash, noMetaHash, metaLength)`` for the variants.
+
+    Packed variants are hashed straight from the mapped pack.
+    """
+    keccak256 = keccak256 or get_keccak()
+    pack = ArtifactPack.open(evaluation_dir)
+    try:
+        for prefix in prefixes or list_prefixes(evaluation_dir):
+            for contract_name in contract_names:
+                code = pack and pack.deployed_bytecode(prefix, contract_name)
+                if code is None:
+                    path = artifact_path(prefix, contract_name, evaluation_dir)
+                    if not os.path.isfile(path):
+                        continue
+                    code = read_deployed_bytecode(path)
+                result = hash_code(code, keccak256)
+                yield {
+                    "contract": contract_name,
+                    "prefix": prefix,
+                    "fullHash": "0x" + result.full_hash.hex(),
+                    "noMetaHash": None if result.no_meta_hash is None else "0x" + result.no_meta_hash.hex(),
+                    "metaLength": result.meta_length,
+                }
+    finally:
+        if pack:
+            pack.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hash artifact bytecode with and without the CBOR metadata.")
+    parser.add_argument("--contract", action="append", dest="contracts", help="artifact name (repeatable, default ozTokenA)")
+    parser.add_argument("--prefix", action="append", dest="prefixes", help="only hash these prefixes (repeatable)")
+    parser.add_argument("--evaluation-dir", default=EVALUATION_DIR)
+    parser.add_argument("--backend", choices=sorted(_BACKENDS), help="keccak implementation to use")
+    parser.add_argument("--output", default="code_hashes.json")
+    args = parser.parse_args(argv)
+
+    keccak256 = get_keccak(args.backend)
+    rows = list(hash_table(args.contracts or ["ozTokenA"], args.prefixes, args.evaluation_dir, keccak256))
+    for row in rows:
+        print(f"{row['contract']:>16} {row['prefix']:>16}  {row['fullHash']}  {row['noMetaHash']}  meta={row['metaLength']}")
+
+    with open(args.output, "w") as file:
+        json.dump(rows, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
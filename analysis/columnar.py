@@ -0,0 +1,239 @@
+"""Typed columnar (Parquet) copies of the evaluation result files.
+
+The measurement scripts write JSON with stringified integers. ``write_table``
+turns such a file into Parquet with int64 gas columns, each ``<stem>Prefix``
+split into a categorical ``<stem>MetadataHash`` and an int64
+``<stem>OptimizerRuns`` (``UNOPTIMIZED`` for "...none"), and the group label
+precomputed as an ordered categorical ``<stem>Group``. ``read_results`` reads
+only the requested columns and rebuilds the Parquet file first when its JSON
+source or contract_groups.json changed. The inputs a table was built from are
+recorded in a ``<table>.source.json`` sidecar next to it. Like the analysis
+cache, an input counts as changed when its size differs, or when its mtime
+moved and its content hash differs.
+
+    python3 -m analysis.columnar            # convert every result file present
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .cache import _is_fresh, file_digest
+from .groups import UNOPTIMIZED, load_contract_groups, parse_prefix
+from .stream import load_stream_results
+
+FORMAT_VERSION = "4"
+
+# Prefix stems (with their contract_groups.json key) and gas (or other integer) columns of each result file, and
+# values for columns that older result files do not have yet
+RESULT_SETS = {
+    "evaluation_results": {
+        "prefixes": {"ozTokenA": "ozTokenAGroups"},
+        "gas": ["gasUsedOptimized", "gasUsedUnoptimized", "deploymentCostToken"],
+    },
+    "hash_results": {
+        "prefixes": {"ozTokenA": "ozTokenAGroups"},
+        "gas": [
+            "gasUsedOptimizedNoMeta",
+            "gasUsedUnoptimizedNoMeta",
+            "gasUsedOptimizedMeta",
+            "gasUsedUnoptimizedMeta",
+        ],
+    },
+    "dispatch_index_results": {
+        "prefixes": {"ozTokenA": "ozTokenAGroups"},
+        "gas": ["gasUsedScan", "gasUsedIndexed", "gasUsedOffset"],
+    },
+    "verdict_cache_results": {
+        "prefixes": {"ozTokenA": "ozTokenAGroups"},
+        "gas": ["gasUsedScan", "gasUsedCold", "gasUsedWarm"],
+    },
+    "validation_gas_results": {
+        "prefixes": {"token": "tokenGroups", "auditCheck": "auditCheckGroups"},
+        "gas": ["gasUsed", "gasPerToken", "batchSize"],
+        "defaults": {"checkContract": "AuditCheck", "method": "validateToken", "batchSize": 1, "gasPerToken": "gasUsed"},
+    },
+}
+
+
+def source_path(name):
+    """The JSON results file of ``name``, or its ``.jsonl`` stream if there is no JSON yet."""
+    path = f"{name}.json"
+    if not os.path.exists(path) and os.path.exists(f"{name}.jsonl"):
+        return f"{name}.jsonl"
+    return path
+
+
+def table_path(name, results_path=None):
+    """The Parquet copy of ``name``, next to ``results_path`` if that is given."""
+    if results_path:
+        return f"{os.path.splitext(results_path)[0]}.parquet"
+    return f"{name}.parquet"
+
+
+def _read(results_path):
+    if results_path.endswith(".jsonl"):
+        return load_stream_results(results_path)
+    with open(results_path, "r") as file:
+        return json.load(file)
+
+
+def _prefix_runs(values):
+    # Parse each distinct prefix once and broadcast through the category codes
+    prefixes = pd.Categorical(values)
+    runs = np.array(
+        [parse_prefix(p)[1] for p in prefixes.categories], dtype=np.int64
+    )
+    out = np.full(len(prefixes), UNOPTIMIZED, dtype=np.int64)
+    valid = prefixes.codes >= 0
+    out[valid] = runs[prefixes.codes[valid]]
+    return out
+
+
+def _group_column(runs, index):
+    unique, inverse = np.unique(runs, return_inverse=True)
+    codes = np.asarray(index.codes_for(unique.tolist()), dtype=np.int8)[inverse]
+    return pd.Categorical.from_codes(codes, categories=index.categories, ordered=True)
+
+
+def _metadata_hashes(values):
+    prefixes = pd.Categorical(values)
+    hashes = [parse_prefix(p)[0] or "unknown" for p in prefixes.categories]
+    # Categories of the split column are the distinct metadata hashes, codes go through the prefixes
+    categories = sorted(set(hashes))
+    lookup = np.array([categories.index(h) for h in hashes], dtype=np.int8)
+    codes = np.where(prefixes.codes >= 0, lookup[prefixes.codes], -1)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def build_frame(results_path, groups_path, prefixes, gas, defaults=None):
+    """Typed frame of a results file, in the column layout of the Parquet tables.
+
+    ``defaults`` fills missing values; a default naming another column copies it.
+    """
+    df = pd.DataFrame(_read(results_path))
+    for column, default in (defaults or {}).items():
+        value = df[default] if isinstance(default, str) and default in df else default
+        df[column] = df[column].fillna(value) if column in df else value
+    indexes = load_contract_groups(groups_path) if groups_path else {}
+
+    columns = {}
+    for stem, group_key in prefixes.items():
+        raw = df[f"{stem}Prefix"]
+        runs = _prefix_runs(raw)
+        columns[f"{stem}MetadataHash"] = _metadata_hashes(raw)
+        columns[f"{stem}OptimizerRuns"] = runs
+        if group_key is not None:
+            columns[f"{stem}Group"] = _group_column(runs, indexes[group_key]).remove_unused_categories()
+    for column in gas:
+        columns[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+    known = {f"{stem}Prefix" for stem in prefixes} | set(gas)
+    for column in df.columns:
+        if column not in known:
+            columns[column] = df[column]
+    return pd.DataFrame(columns)
+
+
+def _inputs(results_path, groups_path):
+    return [(role, path) for role, path in (("source", results_path), ("groups", groups_path)) if path]
+
+
+def sidecar_path(path):
+    return f"{path}.source.json"
+
+
+def _fingerprint(results_path, groups_path):
+    # Recorded in the same form as the entries of analysis.cache, so the same freshness rule applies
+    fingerprint = {"version": FORMAT_VERSION}
+    for role, path in _inputs(results_path, groups_path):
+        st = os.stat(path)
+        fingerprint[role] = {"path": os.path.abspath(path), "mtime": st.st_mtime_ns, "size": st.st_size, "sha256": file_digest(path)}
+    return fingerprint
+
+
+def _write_sidecar(path, fingerprint):
+    # The table's own stat ties the sidecar to the table it was written with
+    st = os.stat(path)
+    fingerprint = {**fingerprint, "table": {"mtime": st.st_mtime_ns, "size": st.st_size}}
+    tmp_path = f"{sidecar_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(fingerprint, file, sort_keys=True)
+    os.replace(tmp_path, sidecar_path(path))
+
+
+def write_table(name, groups_path="contract_groups.json", results_path=None, out_path=None):
+    """Convert the results of ``name`` (a key of ``RESULT_SETS``) to Parquet and return its path."""
+    spec = RESULT_SETS[name]
+    out_path = out_path or table_path(name, results_path)
+    results_path = results_path or source_path(name)
+    fingerprint = _fingerprint(results_path, groups_path)
+    df = build_frame(results_path, groups_path, spec["prefixes"], spec["gas"], spec.get("defaults"))
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+    os.replace(tmp_path, out_path)
+    _write_sidecar(out_path, fingerprint)
+    return out_path
+
+
+def _is_current(path, results_path, groups_path):
+    """True if the table at ``path`` was built from the current inputs.
+
+    An input whose mtime moved without a content change is recorded with its
+    new mtime in the sidecar, so it is only hashed once.
+    """
+    try:
+        with open(sidecar_path(path), "r") as file:
+            recorded = json.load(file)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return False
+    inputs = _inputs(results_path, groups_path)
+    if (
+        recorded.get("version") != FORMAT_VERSION
+        or recorded.get("table") != {"mtime": st.st_mtime_ns, "size": st.st_size}
+        or set(recorded) != {"version", "table"} | {role for role, _ in inputs}
+    ):
+        return False
+    before = json.dumps(recorded, sort_keys=True)
+    for role, input_path in inputs:
+        entry = recorded[role]
+        if entry["path"] != os.path.abspath(input_path) or not _is_fresh(entry, input_path):
+            return False
+    if json.dumps(recorded, sort_keys=True) != before:
+        del recorded["table"]
+        _write_sidecar(path, recorded)
+    return True
+
+
+def read_results(name, columns=None, groups_path="contract_groups.json", results_path=None):
+    """Read ``columns`` of the results of ``name`` from their Parquet table.
+
+    Only the requested columns are read from disk. The table is (re)built from
+    the JSON results when it is missing or older than its inputs.
+    ``results_path`` reads another file of the same layout instead of ``<name>.json``,
+    e.g. the results of another compiler version; its table is stored next to it.
+    """
+    path = table_path(name, results_path)
+    results_path = results_path or source_path(name)
+    if not _is_current(path, results_path, groups_path):
+        write_table(name, groups_path, results_path, path)
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the result JSON files to Parquet.")
+    parser.add_argument("names", nargs="*", help=f"result sets to convert (default: every one present of {', '.join(RESULT_SETS)})")
+    parser.add_argument("--groups", default="contract_groups.json", help="contract groups file")
+    args = parser.parse_args(argv)
+
+    names = args.names or [name for name in RESULT_SETS if os.path.exists(source_path(name))]
+    for name in names:
+        print(f"{source_path(name)} -> {write_table(name, args.groups)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Vectorized decoding of many runtime bytecodes at once.
+
+A corpus is one packed ``uint8`` buffer plus ``offsets`` (contract ``k``
+occupies ``buffer[offsets[k]:offsets[k + 1]]``). Instruction boundaries are
+found by walking every contract in lockstep: each NumPy step advances all
+program counters by one instruction, so the Python overhead grows with the
+longest contract and not with the size of the corpus.
+
+On top of the instruction starts the corpus indexes every PUSH4 and the
+Solidity dispatcher entries ``PUSH4 <selector> EQ PUSH1-3 <target> JUMPI``,
+so analyses can look up a selector's jump target instead of rescanning.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from .validator import (
+    DEFAULT_GAS_LIMIT,
+    DEFAULT_THRESHOLD,
+    OUT_OF_BOUNDS,
+    TRANSFER_PATTERN,
+    ValidationResult,
+    ValidatorRevert,
+    _SCAN_STEP,
+    count_comparisons,
+)
+
+TRANSFER_SELECTOR = 0xA9059CBB
+_PAD = 40  # zero bytes after the buffer so fixed-width gathers never go out of range
+
+# Instruction length per opcode (PUSH1-PUSH32 carry 1-32 immediate bytes)
+EVM_STEP = np.ones(256, dtype=np.int64)
+EVM_STEP[0x60:0x80] += np.arange(1, 33)
+
+# The byte walk of TokenValidator.validateToken only skips PUSH1-PUSH3 data
+VALIDATOR_SCAN_STEP = np.asarray(_SCAN_STEP, dtype=np.int64)
+
+
+class DispatchIndex(NamedTuple):
+    """Dispatcher entries sorted by ``(selector, contract)``."""
+    contract: np.ndarray  # int64 contract number
+    selector: np.ndarray  # uint32 function selector
+    target: np.ndarray  # int64 jump target of the selector's branch
+    position: np.ndarray  # int64 offset of the PUSH4 inside its contract
+
+
+def pack(bytecodes):
+    """Pack an iterable of bytes-like codes into ``(buffer, offsets)``."""
+    bytecodes = list(bytecodes)
+    offsets = np.zeros(len(bytecodes) + 1, dtype=np.int64)
+    np.cumsum([len(code) for code in bytecodes], out=offsets[1:])
+    buffer = np.frombuffer(b"".join(bytecodes), dtype=np.uint8)
+    return buffer, offsets
+
+
+def instruction_starts(buffer, offsets, step=EVM_STEP, contracts=None):
+    """Boolean mask over ``buffer`` marking where each walk lands.
+
+    ``step`` gives the advance per opcode; pass ``VALIDATOR_SCAN_STEP`` to
+    reproduce the positions visited by the validator's selector scan.
+    ``contracts`` restricts the walk to a subset of contract numbers.
+    """
+    mask = np.zeros(len(buffer), dtype=bool)
+    pc = offsets[:-1] if contracts is None else offsets[:-1][contracts]
+    end = offsets[1:] if contracts is None else offsets[1:][contracts]
+    live = pc < end
+    pc, end = pc[live], end[live]
+    while pc.size:
+        mask[pc] = True
+        pc = pc + step[buffer[pc]]
+        live = pc < end
+        if not live.all():
+            pc, end = pc[live], end[live]
+    return mask
+
+
+def _gather_be(padded, positions, width):
+    # Big-endian unsigned integers of ``width`` bytes starting at ``positions``
+    value = np.zeros(len(positions), dtype=np.int64)
+    for k in range(width):
+        value = (value << 8) | padded[positions + k]
+    return value
+
+
+class BytecodeCorpus:
+    """A packed set of runtime bytecodes with lazily built indexes."""
+
+    def __init__(self, buffer, offsets, names=None):
+        self.buffer = np.asarray(buffer, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.names = list(names) if names is not None else list(range(len(self)))
+        self._padded = np.concatenate([self.buffer, np.zeros(_PAD, dtype=np.uint8)])
+        self._starts = None
+        self._dispatch = None
+
+    @classmethod
+    def from_bytecodes(cls, items):
+        """Build from ``(name, bytes-like)`` pairs, e.g. ``iter_deployed_bytecodes``."""
+        items = list(items)
+        buffer, offsets = pack(code for _, code in items)
+        return cls(buffer, offsets, [name for name, _ in items])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def code(self, k):
+        return self.buffer[self.offsets[k]:self.offsets[k + 1]].tobytes()
+
+    def contract_of(self, positions):
+        return np.searchsorted(self.offsets, positions, side="right") - 1
+
+    @property
+    def starts(self):
+        """Instruction-start mask respecting PUSH1-PUSH32 immediates."""
+        if self._starts is None:
+            self._starts = instruction_starts(self.buffer, self.offsets)
+        return self._starts
+
+    def push4_positions(self):
+        """Buffer positions of every PUSH4 whose immediate lies inside its contract."""
+        positions = np.flatnonzero(self.starts & (self.buffer == 0x63))
+        ends = self.offsets[1:][self.contract_of(positions)]
+        return positions[positions + 4 < ends]
+
+    def push4_values(self, positions):
+        return _gather_be(self._padded, positions + 1, 4).astype(np.uint32)
+
+    @property
+    def dispatch(self):
+        """Index of ``PUSH4 <selector> EQ PUSH1-3 <target> JUMPI`` branches."""
+        if self._dispatch is None:
+            self._dispatch = self._build_dispatch()
+        return self._dispatch
+
+    def _build_dispatch(self):
+        padded = self._padded
+        positions = self.push4_positions()
+        contract = self.contract_of(positions)
+        ends = self.offsets[1:][contract]
+        is_eq = padded[positions + 5] == 0x14
+        push = padded[positions + 6].astype(np.int64)
+
+        parts = []
+        for width in (1, 2, 3):
+            jumpi = positions + 7 + width
+            hit = is_eq & (push == 0x5F + width) & (jumpi < ends)
+            hit &= padded[np.where(hit, jumpi, 0)] == 0x57
+            p = positions[hit]
+            parts.append((contract[hit], p, _gather_be(padded, p + 7, width)))
+
+        contract = np.concatenate([c for c, _, _ in parts])
+        position = np.concatenate([p for _, p, _ in parts])
+        target = np.concatenate([t for _, _, t in parts])
+        selector = self.push4_values(position)
+        # Keep the first branch per (contract, selector), then sort for lookups
+        order = np.lexsort((position, selector, contract))
+        contract, selector, target, position = contract[order], selector[order], target[order], position[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (contract[1:] != contract[:-1]) | (selector[1:] != selector[:-1])
+        contract, selector, target, position = contract[first], selector[first], target[first], position[first]
+        order = np.lexsort((contract, selector))
+        return DispatchIndex(
+            contract[order],
+            selector[order],
+            target[order],
+            position[order] - self.offsets[contract[order]],
+        )
+
+    def jump_targets(self, selector):
+        """Jump target of ``selector`` for every contract, -1 where absent."""
+        index = self.dispatch
+        lo, hi = np.searchsorted(index.selector, [selector, selector + 1])
+        out = np.full(len(self), -1, dtype=np.int64)
+        out[index.contract[lo:hi]] = index.target[lo:hi]
+        return out
+
+    def validator_transfer_starts(self):
+        """``(transfer_start, reverts)`` of the validator's selector scan per contract.
+
+        Only contracts containing the PUSH4 a9059cbb EQ PUSH2 pattern, or a
+        PUSH4 close enough to the end for the scan to overrun, are walked.
+        """
+        padded, offsets = self._padded, self.offsets
+        n = len(self)
+        candidates = np.flatnonzero(self.buffer == 0x63)
+        contract = self.contract_of(candidates)
+        ends = offsets[1:][contract]
+
+        # Per candidate: full pattern match, or a partial match that reads past the end
+        matched = np.ones(len(candidates), dtype=bool)
+        overrun = np.zeros(len(candidates), dtype=bool)
+        for k in range(1, len(TRANSFER_PATTERN)):
+            inside = candidates + k < ends
+            overrun |= matched & ~inside
+            matched &= inside & (padded[candidates + k] == TRANSFER_PATTERN[k])
+        overrun |= matched & (candidates + 8 >= ends)
+        relevant = matched | overrun
+
+        transfer_start = np.zeros(n, dtype=np.int64)
+        reverts = np.zeros(n, dtype=bool)
+        if not relevant.any():
+            return transfer_start, reverts
+
+        candidates, contract = candidates[relevant], contract[relevant]
+        matched, overrun = matched[relevant], overrun[relevant]
+        visited = instruction_starts(self.buffer, offsets, VALIDATOR_SCAN_STEP, np.unique(contract))[candidates]
+        candidates, contract = candidates[visited], contract[visited]
+        matched, overrun = matched[visited], overrun[visited]
+
+        # The scan stops at the first visited candidate of each contract
+        first_contract, first = np.unique(contract, return_index=True)
+        reverts[first_contract] = overrun[first]
+        ok = matched[first] & ~overrun[first]
+        transfer_start[first_contract[ok]] = _gather_be(padded, candidates[first][ok] + 7, 2)
+        return transfer_start, reverts
+
+    def validate(self, threshold=DEFAULT_THRESHOLD, gas_limit=DEFAULT_GAS_LIMIT):
+        """``validateToken`` outcome for every contract, like ``validate_token``."""
+        transfer_start, reverts = self.validator_transfer_starts()
+        results = []
+        for k in range(len(self)):
+            if reverts[k]:
+                results.append(ValidationResult(0, 0, None, OUT_OF_BOUNDS))
+                continue
+            start = int(transfer_start[k])
+            if start == 0:
+                results.append(ValidationResult(0, 0, threshold >= 0))
+                continue
+            try:
+                count = count_comparisons(self.code(k), start, gas_limit)
+            except ValidatorRevert as revert:
+                results.append(ValidationResult(start, 0, None, revert.reason))
+                continue
+            results.append(ValidationResult(start, count, threshold >= count))
+        return results
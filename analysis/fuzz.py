@@ -0,0 +1,565 @@
+"""Differential fuzzing of the offline TokenValidator against the deployed one.
+
+Token runtime bytecodes are generated (Solidity-like dispatchers with
+linear or split selector tables, deep stacks, loops, stack underflows,
+truncated code, random bytes) or mutated from the compiled variants in
+``evaluation/``. Every case is run through ``analysis.validator`` in a
+process pool, and, unless ``--offline-only`` is given, installed on a
+local node with ``hardhat_setCode`` and checked with ``validateToken``
+(``eth_call`` and ``eth_estimateGas`` in pooled JSON-RPC batches, see
+``analysis.screen.RpcClient``).
+
+Both sides are reduced to one outcome: ``pass``, ``fail``, ``out of
+bounds`` (panic 0x32), ``underflow`` (panic 0x11), ``out of gas`` (the
+offline interpreter found a loop or its gas bound exceeded ``--gas-limit``)
+or ``revert``. The report lists the cases where the outcomes differ, the
+cases that do not terminate and the highest gas of the cases that do.
+Flagged cases carry their bytecode, and every case can be rebuilt from its
+generator and seed.
+
+    npx hardhat node
+    python3 -m analysis.fuzz --cases 5000 --jobs 8
+    python3 -m analysis.fuzz --offline-only --cases 100000 --generators loop,deep_stack
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from .artifacts import EVALUATION_DIR, artifact_path, iter_deployed_bytecodes
+from .screen import DEFAULT_BATCH_SIZE, DEFAULT_RPC_URL, DEFAULT_WORKERS, RpcClient, VALIDATE_TOKEN_SELECTOR
+from .validator import (
+    DEFAULT_GAS_LIMIT,
+    DEFAULT_THRESHOLD,
+    INFINITE_LOOP,
+    OUT_OF_BOUNDS,
+    OUT_OF_GAS,
+    UNDERFLOW,
+    validate_token,
+)
+
+TRANSFER_SELECTOR = 0xA9059CBB
+DEFAULT_DEPLOY_PREFIX = "ipfs2147483647"  # TokenValidator variant deployed when no address is given
+DEFAULT_CORPUS = ("ozTokenA", "SignedToken")  # artifacts the mutate generator starts from
+CASE_ADDRESS_BASE = 0xF022 << 144  # the cases live at 0xf022000...<index>
+REPORT_LIMIT = 20  # cases listed per section of the report
+
+PASS, FAIL, REVERT, NO_GAS = "pass", "fail", "revert", "out of gas"
+OUT_OF_BOUNDS_OUTCOME, UNDERFLOW_OUTCOME = "out of bounds", "underflow"
+
+_OFFLINE_OUTCOMES = {
+    OUT_OF_BOUNDS: OUT_OF_BOUNDS_OUTCOME,
+    UNDERFLOW: UNDERFLOW_OUTCOME,
+    INFINITE_LOOP: NO_GAS,
+    OUT_OF_GAS: NO_GAS,
+}
+_PANIC_SELECTOR = "4e487b71"  # Panic(uint256)
+_PANIC_OUTCOMES = {0x32: OUT_OF_BOUNDS_OUTCOME, 0x11: UNDERFLOW_OUTCOME}
+
+# (opcode, stack items taken, stack items added) of the instructions the bodies are made of, as
+# validateTransferFunction counts them: it ignores DUP11 - DUP16, so they leave its stack as it is
+_BODY_OPS = (
+    [(op, 2, 1) for op in range(0x01, 0x08)]  # ADD MUL SUB DIV SDIV MOD SMOD
+    + [(0x08, 3, 1), (0x09, 3, 1), (0x0A, 2, 1), (0x0B, 2, 1)]  # ADDMOD MULMOD EXP SIGNEXTEND
+    + [(op, 2, 1) for op in range(0x10, 0x15)] + [(0x15, 1, 1)]  # LT GT SLT SGT EQ ISZERO
+    + [(op, 2, 1) for op in (0x16, 0x17, 0x18, 0x1A, 0x1B, 0x1C, 0x1D)] + [(0x19, 1, 1)]  # logic, shifts, NOT
+    + [(0x20, 2, 1), (0x33, 0, 1), (0x34, 0, 1), (0x35, 1, 1), (0x36, 0, 1)]  # KECCAK256 CALLER CALLVALUE CALLDATALOAD CALLDATASIZE
+    + [(0x50, 1, 0), (0x51, 1, 1), (0x52, 2, 0), (0x54, 1, 1), (0x55, 2, 0), (0x5B, 0, 0)]  # POP MLOAD MSTORE SLOAD SSTORE JUMPDEST
+    + [(0xA0 + topics, 2 + topics, 0) for topics in range(5)]  # LOG0 - LOG4
+    + [(0x80 + n, n + 1, n + 2) for n in range(10)] + [(0x80 + n, n + 1, n + 1) for n in range(10, 16)]  # DUP1 - DUP16
+    + [(0x90 + n, n + 2, n + 2) for n in range(16)]  # SWAP1 - SWAP16
+)
+
+GENERATORS = {}
+
+
+def register_generator(name):
+    """Register ``generate(rng, corpus) -> bytes`` under ``name``."""
+
+    def decorator(generate):
+        GENERATORS[name] = generate
+        return generate
+
+    return decorator
+
+
+class _Assembler:
+    """Bytecode with labels; ``ref`` is a PUSH2 of a label's offset, ``label`` a JUMPDEST."""
+
+    def __init__(self):
+        self.parts = []
+
+    def emit(self, data):
+        self.parts.append(bytes.fromhex(data) if isinstance(data, str) else bytes(data))
+
+    def push(self, value, width=None):
+        width = width or max(1, (value.bit_length() + 7) // 8)
+        self.emit(bytes([0x5F + width]) + value.to_bytes(width, "big"))
+
+    def label(self, name):
+        self.parts.append(("label", name))
+
+    def ref(self, name):
+        self.parts.append(("ref", name))
+
+    def assemble(self):
+        offsets, position = {}, 0
+        for part in self.parts:
+            if isinstance(part, bytes):
+                position += len(part)
+            elif part[0] == "label":
+                offsets[part[1]] = position
+                position += 1
+            else:
+                position += 3
+        code = bytearray()
+        for part in self.parts:
+            if isinstance(part, bytes):
+                code += part
+            elif part[0] == "label":
+                code.append(0x5B)
+            else:
+                code += b"\x61" + (offsets[part[1]] & 0xFFFF).to_bytes(2, "big")
+        return bytes(code)
+
+
+def _body(rng, asm, tag, length, height=0, strict=1.0):
+    """Random instructions with forward conditional jumps; ``strict`` is the share that keeps the stack valid."""
+    pending = []  # (label, stack height when jumping there)
+    for step in range(length):
+        if pending and rng.random() < 0.15:
+            skip, jump_height = pending.pop()
+            asm.label(skip)
+            # The validator always takes the jump, the fall-through path must not need more
+            height = min(height, jump_height)
+        roll = rng.random()
+        if roll < 0.3 or height == 0:
+            asm.push(rng.getrandbits(rng.choice((8, 8, 16, 32, 160, 256))) or 1)
+            height += 1
+        elif roll < 0.36 and height >= 1:
+            skip = f"{tag}.{step}"
+            asm.ref(skip)
+            asm.emit("57")  # JUMPI
+            height -= 1
+            pending.append((skip, height))
+        else:
+            candidates = [op for op in _BODY_OPS if op[1] <= height] if rng.random() < strict else _BODY_OPS
+            opcode, taken, added = rng.choice(candidates)
+            asm.emit(bytes([opcode]))
+            height = max(0, height - taken + added)
+    for skip, jump_height in reversed(pending):
+        asm.label(skip)
+        height = min(height, jump_height)
+    return height
+
+
+def _metadata(rng):
+    # CBOR trailer like solc's: ipfs hash and compiler version, then its length
+    return bytes.fromhex("fea2646970667358221220") + rng.randbytes(32) + bytes.fromhex("64736f6c634300081400") + b"\x33"
+
+
+def _token(rng, transfer_body, with_transfer=True):
+    """A dispatcher with random selectors; ``transfer_body(asm)`` writes the transfer function."""
+    asm = _Assembler()
+    selectors = [rng.getrandbits(32) for _ in range(rng.randint(1, 24))]
+    if with_transfer:
+        selectors[rng.randrange(len(selectors))] = TRANSFER_SELECTOR
+    selectors = list(dict.fromkeys(selectors))
+    names = {selector: f"f{i}" for i, selector in enumerate(selectors)}
+
+    asm.emit("6080604052")  # PUSH1 80 PUSH1 40 MSTORE
+    asm.emit("348015")  # CALLVALUE DUP1 ISZERO
+    asm.ref("payable")
+    asm.emit("575f80fd")  # JUMPI PUSH0 DUP1 REVERT
+    asm.label("payable")
+    asm.emit("5060043610")  # POP PUSH1 04 CALLDATASIZE LT
+    asm.ref("fallback")
+    asm.emit("575f3560e01c")  # JUMPI PUSH0 CALLDATALOAD PUSH1 e0 SHR
+
+    def entries(group):
+        for selector in group:
+            asm.emit("80")
+            asm.push(selector, 4)
+            asm.emit("14")  # EQ
+            asm.ref(names[selector])
+            asm.emit("57")
+
+    ordered = sorted(selectors)
+    if len(ordered) > 4 and rng.random() < 0.5:
+        # Split dispatcher as solc emits it for many functions: DUP1 PUSH4 pivot GT PUSH2 low
+        # JUMPI jumps to the selectors below the pivot
+        middle = len(ordered) // 2
+        asm.emit("80")
+        asm.push(ordered[middle], 4)
+        asm.emit("11")
+        asm.ref("low")
+        asm.emit("57")
+        entries(ordered[middle:])
+        asm.ref("fallback")
+        asm.emit("56")
+        asm.label("low")
+        entries(ordered[:middle])
+    else:
+        entries(selectors)
+    asm.label("fallback")
+    asm.emit("5f80fd")
+
+    for selector in selectors:
+        asm.label(names[selector])
+        if selector == TRANSFER_SELECTOR:
+            transfer_body(asm)
+        else:
+            _body(rng, asm, names[selector], rng.randint(0, 40))
+            asm.emit(rng.choice(("f3", "fd", "00")))
+    if rng.random() < 0.7:
+        asm.emit(_metadata(rng))
+    return asm.assemble()
+
+
+def _returning_body(rng, length):
+    def write(asm):
+        _body(rng, asm, "t", length)
+        asm.emit(rng.choice(("f3", "f3", "fd", "00", "fe")))
+    return write
+
+
+@register_generator("dispatcher")
+def _dispatcher(rng, corpus):
+    return _token(rng, _returning_body(rng, rng.randint(0, 400)), with_transfer=rng.random() < 0.95)
+
+
+@register_generator("deep_stack")
+def _deep_stack(rng, corpus):
+    # Fill the 100 slots of internalstack to just below, at or past the top
+    def write(asm):
+        depth = rng.randint(80, 120)
+        for height in range(depth):
+            if height and rng.random() < 0.2:
+                asm.emit(bytes([0x80 + rng.randrange(min(height, 10))]))  # DUP1 - DUP10
+            else:
+                asm.push(rng.getrandbits(16) or 1)
+        _body(rng, asm, "t", rng.randint(0, 20), height=depth)
+        asm.emit("f3")
+    return _token(rng, write)
+
+
+@register_generator("loop")
+def _loop(rng, corpus):
+    def write(asm):
+        _body(rng, asm, "t", rng.randint(0, 20))
+        asm.label("loop")
+        # The loop body either leaves the stack as it is, so the interpreter revisits the same
+        # state, or grows it until the 100 slots run out
+        _body(rng, asm, "l", rng.randint(0, 30))
+        if rng.random() < 0.5:
+            asm.ref("loop")
+            asm.emit("56")  # JUMP
+        else:
+            asm.push(1)
+            asm.ref("loop")
+            asm.emit("57")  # JUMPI
+        asm.emit("f3")
+    return _token(rng, write)
+
+
+@register_generator("underflow")
+def _underflow(rng, corpus):
+    def write(asm):
+        asm.emit(rng.choice(("50", "56", "57", "01", "14", "90", "80", "f3")))
+        if rng.random() < 0.5:
+            asm.push(0)
+            asm.emit("56")  # jump to 0, underflows newJumpAddress - 1
+        _body(rng, asm, "t", rng.randint(0, 20), strict=0.5)
+        asm.emit("f3")
+    return _token(rng, write)
+
+
+@register_generator("truncated")
+def _truncated(rng, corpus):
+    code = _token(rng, _returning_body(rng, rng.randint(0, 40)))
+    tail = rng.choice((
+        bytes.fromhex("63a9059cbb1461")[:rng.randint(1, 8)],  # the scan reads past the end
+        bytes([0x60 + rng.randrange(32)]) + rng.randbytes(rng.randrange(4)),  # PUSH without its immediate
+    ))
+    return code[:rng.randrange(len(code) + 1)] + tail
+
+
+@register_generator("random")
+def _random(rng, corpus):
+    code = bytearray(rng.randbytes(rng.randint(16, 2048)))
+    position = rng.randrange(len(code))
+    target = rng.randrange(len(code) + 8)
+    code[position:position] = bytes.fromhex("63a9059cbb1461") + target.to_bytes(2, "big")
+    return bytes(code)
+
+
+@register_generator("mutate")
+def _mutate(rng, corpus):
+    code = bytearray(rng.choice(corpus) if corpus else _token(rng, _returning_body(rng, 40)))
+    for _ in range(rng.randint(1, 16)):
+        position = rng.randrange(len(code)) if code else 0
+        kind = rng.random()
+        if kind < 0.35:
+            code[position:position + 1] = bytes([rng.randrange(256)])
+        elif kind < 0.55:
+            code[position:position] = bytes([rng.choice(_BODY_OPS)[0]])
+        elif kind < 0.7:
+            del code[position:position + rng.randint(1, 4)]
+        elif kind < 0.85:
+            end = min(len(code), position + rng.randint(1, 64))
+            code[position:position] = code[position:end]
+        else:
+            # Point a PUSH2 jump target somewhere else
+            push2 = code.find(b"\x61", position)
+            if 0 <= push2 < len(code) - 2:
+                code[push2 + 1:push2 + 3] = rng.randrange(len(code)).to_bytes(2, "big")
+    return bytes(code)
+
+
+class Case(NamedTuple):
+    index: int
+    generator: str
+    seed: str
+    code: bytes
+    offline: dict
+
+
+def case_seed(seed, generator, index):
+    return f"{seed}:{generator}:{index}"
+
+
+def generate(generator, seed, corpus=()):
+    """Rebuild the bytecode of a case from its generator and seed."""
+    return GENERATORS[generator](random.Random(seed), list(corpus))
+
+
+def offline_outcome(code, threshold=DEFAULT_THRESHOLD, gas_limit=DEFAULT_GAS_LIMIT):
+    result = validate_token(code, threshold, gas_limit)
+    if result.error is not None:
+        outcome = _OFFLINE_OUTCOMES.get(result.error, REVERT)
+    else:
+        outcome = PASS if result.passed else FAIL
+    return {
+        "outcome": outcome,
+        "transferStart": result.transfer_start,
+        "comparisonCount": result.comparison_count,
+        "error": result.error,
+    }
+
+
+_corpus = ()
+
+
+def _init_worker(corpus):
+    global _corpus
+    _corpus = corpus
+
+
+def _offline_chunk(args):
+    # Generate and analyze a chunk of cases in a worker process
+    jobs, threshold, gas_limit = args
+    cases = []
+    for index, generator, seed in jobs:
+        code = generate(generator, seed, _corpus)
+        cases.append(Case(index, generator, seed, code, offline_outcome(code, threshold, gas_limit)))
+    return cases
+
+
+def run_offline(count, generators, seed, threshold=DEFAULT_THRESHOLD, gas_limit=DEFAULT_GAS_LIMIT, jobs=None, corpus=()):
+    """Generate ``count`` cases round-robin over ``generators`` and analyze them in parallel."""
+    work = [(index, generators[index % len(generators)], case_seed(seed, generators[index % len(generators)], index)) for index in range(count)]
+    chunk = max(1, min(256, count // ((jobs or os.cpu_count() or 1) * 4) or 1))
+    chunks = [(work[i:i + chunk], threshold, gas_limit) for i in range(0, len(work), chunk)]
+    cases = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(tuple(corpus),)) as pool:
+        for chunk_cases in pool.map(_offline_chunk, chunks):
+            cases.extend(chunk_cases)
+    return cases
+
+
+def case_address(index):
+    return f"0x{CASE_ADDRESS_BASE + index:040x}"
+
+
+def _onchain_outcome(reply):
+    if "error" not in reply:
+        result = reply.get("result") or "0x"
+        return (PASS if int(result, 16) else FAIL) if result != "0x" else REVERT
+    error = reply["error"]
+    data = error.get("data")
+    if isinstance(data, dict):
+        data = data.get("data")
+    message = str(error.get("message", "")).lower()
+    if isinstance(data, str) and data[2:10] == _PANIC_SELECTOR:
+        return _PANIC_OUTCOMES.get(int(data[10:74] or "0", 16), REVERT)
+    for code, outcome in _PANIC_OUTCOMES.items():
+        if f"panic code 0x{code:x}" in message:
+            return outcome
+    return NO_GAS if "out of gas" in message or "ran out of gas" in message else REVERT
+
+
+def run_onchain(client, token_validator, cases, gas_limit=DEFAULT_GAS_LIMIT, set_code_method="hardhat_setCode"):
+    """Install every case on the node and return ``[{"outcome", "gas"}]`` in case order."""
+    replies = client.call_many([(set_code_method, [case_address(case.index), "0x" + case.code.hex()]) for case in cases])
+    failed = [reply for reply in replies if "error" in reply]
+    if failed:
+        raise RuntimeError(f"{set_code_method} failed for {len(failed)} cases: {failed[0]['error']}")
+
+    calls = []
+    for case in cases:
+        call = {
+            "to": token_validator,
+            "data": VALIDATE_TOKEN_SELECTOR + case_address(case.index)[2:].rjust(64, "0"),
+            "gas": hex(gas_limit),
+        }
+        calls.append(("eth_call", [call, "latest"]))
+        calls.append(("eth_estimateGas", [call]))
+    replies = client.call_many(calls)
+    results = []
+    for call_reply, gas_reply in zip(replies[0::2], replies[1::2]):
+        outcome = _onchain_outcome(call_reply)
+        gas = int(gas_reply["result"], 16) if outcome in (PASS, FAIL) and "result" in gas_reply else None
+        results.append({"outcome": outcome, "gas": gas})
+    return results
+
+
+def deploy_validator(client, threshold=DEFAULT_THRESHOLD, prefix=DEFAULT_DEPLOY_PREFIX, evaluation_dir=EVALUATION_DIR):
+    """Deploy ``evaluation/<prefix>/TokenValidator.json`` from the node's first account."""
+    with open(artifact_path(prefix, "TokenValidator", evaluation_dir), "r") as file:
+        bytecode = json.load(file)["bytecode"]
+    (accounts,) = client.call_many([("eth_accounts", [])])
+    transaction = {"from": accounts["result"][0], "data": bytecode + f"{threshold:064x}", "gas": hex(DEFAULT_GAS_LIMIT)}
+    (sent,) = client.call_many([("eth_sendTransaction", [transaction])])
+    if "error" in sent:
+        raise RuntimeError(f"TokenValidator deployment failed: {sent['error']}")
+    (receipt,) = client.call_many([("eth_getTransactionReceipt", [sent["result"]])])
+    return receipt["result"]["contractAddress"]
+
+
+def load_corpus(contract_names=DEFAULT_CORPUS, evaluation_dir=EVALUATION_DIR):
+    """Runtime bytecodes of the compiled variants, empty without ``evaluation/``."""
+    if not os.path.isdir(evaluation_dir):
+        return []
+    codes = []
+    for contract_name in contract_names:
+        codes.extend(bytes(code) for _, code in iter_deployed_bytecodes(contract_name, evaluation_dir=evaluation_dir))
+    return list(dict.fromkeys(codes))
+
+
+def _listed(case, onchain=None):
+    row = {
+        "index": case.index,
+        "generator": case.generator,
+        "seed": case.seed,
+        "codeSize": len(case.code),
+        "offline": case.offline,
+    }
+    if onchain is not None:
+        row["onchain"] = onchain
+        row["address"] = case_address(case.index)
+    row["code"] = "0x" + case.code.hex()
+    return row
+
+
+def build_report(cases, onchain=None, limit=REPORT_LIMIT):
+    """Outcome counts, mismatches, non-terminating cases and the worst gas of a fuzz run."""
+    onchain = onchain or [None] * len(cases)
+    outcomes = {}
+    mismatches, non_terminating, measured = [], [], []
+    for case, chain in zip(cases, onchain):
+        counts = outcomes.setdefault(case.generator, {})
+        key = case.offline["outcome"] if chain is None else f"{case.offline['outcome']} / {chain['outcome']}"
+        counts[key] = counts.get(key, 0) + 1
+        if chain is not None and chain["outcome"] != case.offline["outcome"]:
+            mismatches.append((case, chain))
+        if case.offline["outcome"] == NO_GAS or (chain is not None and chain["outcome"] == NO_GAS):
+            non_terminating.append((case, chain))
+        if chain is not None and chain["gas"] is not None:
+            measured.append((case, chain))
+
+    measured.sort(key=lambda item: item[1]["gas"], reverse=True)
+    report = {
+        "cases": len(cases),
+        "outcomes": outcomes,
+        "mismatchCount": len(mismatches),
+        "nonTerminatingCount": len(non_terminating),
+    }
+    if measured:
+        report["gasBound"] = {
+            "max": measured[0][1]["gas"],
+            "maxPerCodeByte": max(chain["gas"] / max(1, len(case.code)) for case, chain in measured),
+            "maxCodeSize": max(len(case.code) for case, _ in measured),
+        }
+    report["mismatches"] = [_listed(case, chain) for case, chain in mismatches[:limit]]
+    report["nonTerminating"] = [_listed(case, chain) for case, chain in non_terminating[:limit]]
+    report["worstGas"] = [_listed(case, chain) for case, chain in measured[:limit]]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz the offline TokenValidator against the deployed contract.")
+    parser.add_argument("--cases", type=int, default=1000, help="number of generated bytecodes")
+    parser.add_argument("--seed", default="0", help="base seed, a case is rebuilt from seed, generator and index")
+    parser.add_argument("--generators", default=",".join(GENERATORS), help=f"comma separated, of {', '.join(GENERATORS)}")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="validationThreshold of the TokenValidator")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="processes for the offline analysis")
+    parser.add_argument("--offline-only", action="store_true", help="skip the node, only report offline outcomes")
+    parser.add_argument("--rpc-url", default=DEFAULT_RPC_URL)
+    parser.add_argument("--token-validator", help="address of a deployed TokenValidator (default: deploy one)")
+    parser.add_argument("--deploy-prefix", default=DEFAULT_DEPLOY_PREFIX, help="evaluation/ variant deployed without --token-validator")
+    parser.add_argument("--set-code-method", default="hardhat_setCode", help="e.g. anvil_setCode for anvil")
+    parser.add_argument("--gas-limit", type=int, default=DEFAULT_GAS_LIMIT, help="gas of every validateToken call, also the offline gas budget")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="requests per JSON-RPC batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="JSON-RPC batches in flight")
+    parser.add_argument("--evaluation-dir", default=EVALUATION_DIR)
+    parser.add_argument("--output", default="fuzz_report.json")
+    args = parser.parse_args(argv)
+
+    generators = args.generators.split(",")
+    unknown = [name for name in generators if name not in GENERATORS]
+    if unknown:
+        parser.error(f"unknown generators: {', '.join(unknown)}")
+
+    timings = {}
+    started = time.perf_counter()
+    corpus = load_corpus(evaluation_dir=args.evaluation_dir) if "mutate" in generators else []
+    cases = run_offline(args.cases, generators, args.seed, args.threshold, args.gas_limit, args.jobs, corpus)
+    timings["offline"] = time.perf_counter() - started
+
+    onchain = None
+    if not args.offline_only:
+        started = time.perf_counter()
+        with RpcClient(args.rpc_url, args.batch_size, args.workers) as client:
+            token_validator = args.token_validator or deploy_validator(client, args.threshold, args.deploy_prefix, args.evaluation_dir)
+            onchain = run_onchain(client, token_validator, cases, args.gas_limit, args.set_code_method)
+            requests = client.requests_sent
+        timings["onchain"] = time.perf_counter() - started
+
+    report = build_report(cases, onchain)
+    report["threshold"] = args.threshold
+    report["seed"] = args.seed
+    report["gasLimit"] = args.gas_limit
+    report["timings"] = {phase: round(seconds, 3) for phase, seconds in timings.items()}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    for generator, counts in report["outcomes"].items():
+        print(f"{generator:>12}  " + ", ".join(f"{outcome}: {count}" for outcome, count in sorted(counts.items())))
+    print(f"{args.cases} cases offline in {timings['offline']:.2f}s with {args.jobs} processes")
+    if onchain is not None:
+        print(f"{args.cases} cases on {args.rpc_url} in {timings['onchain']:.2f}s ({requests} requests)")
+        print(f"{report['mismatchCount']} mismatches, {report['nonTerminatingCount']} non-terminating")
+        if "gasBound" in report:
+            bound = report["gasBound"]
+            print(f"Worst-case gas {bound['max']:,}, at most {bound['maxPerCodeByte']:.1f} gas per code byte")
+    else:
+        print(f"{report['nonTerminatingCount']} non-terminating")
+    print(f"Report saved to {args.output}")
+    return 1 if report["mismatchCount"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""Prefix -> group lookup built from ``contract_groups.json``."""
+import json
+import re
+
+from .cache import cached
+
+UNOPTIMIZED = -1  # optimizer runs value used for the "...none" prefixes
+UNGROUPED = "none"  # group label for prefixes that are not in any group
+
+_PREFIX_RE = re.compile(r"^(ipfs|none)(\d+|none)$")
+
+
+def extract_numeric(prefix):
+    # Remove "none" prefix and convert the remaining part to an integer
+    if prefix.startswith("none"):
+        return int(prefix.replace("none", ""))
+    else:
+        raise ValueError(f"Unexpected prefix format: {prefix}")
+
+
+def parse_prefix(prefix):
+    """Split an evaluation prefix into ``(metadata_hash, optimizer_runs)``.
+
+    ``ipfs2147483647`` -> ``("ipfs", 2147483647)``, ``nonenone`` ->
+    ``("none", UNOPTIMIZED)``. Unknown formats give ``(None, UNOPTIMIZED)``.
+    """
+    match = _PREFIX_RE.match(prefix)
+    if match is None:
+        return None, UNOPTIMIZED
+    metadata_hash, runs = match.groups()
+    return metadata_hash, UNOPTIMIZED if runs == "none" else int(runs)
+
+
+class GroupIndex:
+    """Optimizer runs -> "Group N" mapping for one entry of contract_groups.json.
+
+    Groups are numbered by their lowest optimizer runs value; the group that
+    holds the unoptimized build ("nonenone") is left out, as the plots have
+    always done.
+    """
+
+    def __init__(self, groups):
+        self.groups = [g for g in groups if "nonenone" not in g["contracts"]]
+        ordered = sorted(
+            self.groups,
+            key=lambda group: min(extract_numeric(c) for c in group["contracts"]),
+        )
+        self.labels = [f"Group {idx}" for idx in range(len(ordered))]
+        self.mapping = {}
+        for label, group in zip(self.labels, ordered):
+            for contract in group["contracts"]:
+                self.mapping[extract_numeric(contract)] = label
+
+    @property
+    def categories(self):
+        return [UNGROUPED] + self.labels
+
+    def codes_for(self, runs):
+        # Category code per optimizer runs value, 0 (UNGROUPED) when unknown
+        codes = {value: idx + 1 for idx, value in enumerate(self.labels)}
+        return [codes[self.mapping[r]] if r in self.mapping else 0 for r in runs]
+
+    def print_groups(self, label):
+        print(f"--- {label.upper()} GROUPS ---")
+        for group_number, group in enumerate(self.groups, start=1):
+            numeric_values = sorted(extract_numeric(c) for c in group["contracts"])
+            print(f"Group {group_number}: Range {numeric_values[0]} to {numeric_values[-1]}")
+
+
+def load_contract_groups(path="contract_groups.json"):
+    """Return ``{groupKey: GroupIndex}`` for every entry in the groups file."""
+
+    def build():
+        with open(path, "r") as file:
+            contract_groups = json.load(file)
+        return {key: GroupIndex(groups) for key, groups in contract_groups.items()}
+
+    return cached("groups", [path], build)
@@ -0,0 +1,125 @@
+"""Reader for the packed artifacts built by ``scripts/pack_artifacts.js``.
+
+``evaluation/artifacts.bin`` holds the raw bytecodes and the ABI JSON of every
+variant, each distinct one once, and ``evaluation/artifacts.index.json`` maps
+``<prefix>/<Contract>`` to their ``[offset, length]`` in it (see
+``scripts/lib/artifact_pack.js``). The blob is memory-mapped: bytecodes are
+returned as memoryview slices of the mapping and an ABI is only parsed the
+first time it is asked for.
+
+Entries whose artifact changed since packing are treated as missing, callers
+fall back to the JSON artifact for those. Whether an artifact changed is
+decided from its link target or its stat, without reading it, once per entry.
+The index records the size, mtime and inode of the blob it was written with;
+a blob with another stat is not used. Its sha256 is only checked on request
+(``verify=True``), ``buildPack`` does so before copying from an old pack.
+"""
+import hashlib
+import json
+import mmap
+import os
+import stat
+
+from .artifacts import EVALUATION_DIR, artifact_path
+
+INDEX_FILE = "artifacts.index.json"
+BLOB_FILE = "artifacts.bin"
+PACK_VERSION = 3
+
+
+def stat_stamp(st):
+    return f"{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+
+
+def artifact_source(path):
+    """Identity of an artifact: the store blob behind the link, size, mtime and inode of a plain file."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if stat.S_ISLNK(st.st_mode):
+        return os.path.basename(os.readlink(path))[:-len(".json")]
+    return f"stat:{stat_stamp(st)}"
+
+
+class ArtifactPack:
+    """Memory-mapped artifact pack of an evaluation directory, use ``open``."""
+
+    def __init__(self, evaluation_dir, index, blob_path):
+        self.evaluation_dir = evaluation_dir
+        self.entries = index["entries"]
+        self.blob_digest = index["blobDigest"]
+        self._abis = {}
+        self._fresh = {}
+        with open(blob_path, "rb") as file:
+            # An empty blob cannot be mapped, and nothing can be read from it anyway
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if index["blobSize"] else b""
+        self._view = memoryview(self._mapped)
+
+    @classmethod
+    def open(cls, evaluation_dir=EVALUATION_DIR, verify=False):
+        """Return the pack of ``evaluation_dir``, or None if it has none or it does not match its index.
+
+        The blob is matched by its stat; ``verify`` also hashes all of it.
+        """
+        index_path = os.path.join(evaluation_dir, INDEX_FILE)
+        blob_path = os.path.join(evaluation_dir, BLOB_FILE)
+        if not (os.path.isfile(index_path) and os.path.isfile(blob_path)):
+            return None
+        with open(index_path, "r") as file:
+            index = json.load(file)
+        if index.get("version") != PACK_VERSION or stat_stamp(os.stat(blob_path)) != index["blobStamp"]:
+            return None
+        pack = cls(evaluation_dir, index, blob_path)
+        if verify and hashlib.sha256(pack._view).hexdigest() != pack.blob_digest:
+            pack.close()
+            return None
+        return pack
+
+    def entry(self, prefix, contract_name):
+        """Index entry of a variant, None if it is not packed or its artifact changed since."""
+        key = f"{prefix}/{contract_name}"
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if key not in self._fresh:
+            self._fresh[key] = artifact_source(artifact_path(prefix, contract_name, self.evaluation_dir)) == entry["source"]
+        return entry if self._fresh[key] else None
+
+    def _slice(self, span):
+        offset, length = span
+        return self._view[offset:offset + length]
+
+    def bytecode(self, prefix, contract_name):
+        """Creation bytecode as a memoryview into the mapping, None if not packed."""
+        entry = self.entry(prefix, contract_name)
+        return None if entry is None else self._slice(entry["bytecode"])
+
+    def deployed_bytecode(self, prefix, contract_name):
+        """Runtime bytecode as a memoryview into the mapping, None if not packed."""
+        entry = self.entry(prefix, contract_name)
+        return None if entry is None else self._slice(entry["deployedBytecode"])
+
+    def abi(self, prefix, contract_name):
+        """Parsed ABI, shared by all variants with the same ABI, None if not packed."""
+        entry = self.entry(prefix, contract_name)
+        if entry is None:
+            return None
+        offset = entry["abi"][0]
+        if offset not in self._abis:
+            self._abis[offset] = json.loads(bytes(self._slice(entry["abi"])))
+        return self._abis[offset]
+
+    def close(self):
+        self._view.release()
+        if isinstance(self._mapped, mmap.mmap):
+            try:
+                self._mapped.close()
+            except BufferError:
+                pass  # slices handed out are still alive, the mapping goes with the last of them
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
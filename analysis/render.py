@@ -0,0 +1,112 @@
+"""Headless batch rendering of the charts in ``analysis.charts``.
+
+A job names a chart and the results it is drawn from; jobs run in a
+process pool with the Agg backend, so nothing blocks on a window.
+Matplotlib and seaborn are only imported inside the workers.
+
+Jobs come from a JSON file, a list of
+``{"chart", "results", "groups", "output", "title"}`` objects where only
+``chart`` is required, or from the command line, one job per results file:
+
+    python3 -m analysis.render jobs.json --jobs 8
+    python3 -m analysis.render --chart hash --results sweeps/*/hash_results.json --out-dir charts
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DEFAULT_GROUPS = "contract_groups.json"
+
+
+def _init_worker():
+    os.environ["MPLBACKEND"] = "Agg"
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_job(job):
+    """Render one job, return ``(output path or None, seconds)``."""
+    from .charts import render
+
+    started = time.perf_counter()
+    output = job.get("output")
+    if output and os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    path = render(job["chart"], job.get("results"), job.get("groups", DEFAULT_GROUPS), output, job.get("title"))
+    return path, time.perf_counter() - started
+
+
+def jobs_for_results(chart, results_paths, groups_path=None, out_dir="."):
+    """One job per results file. Each file uses the contract_groups.json next to it, if there is one."""
+    jobs = []
+    for results_path in results_paths:
+        directory = os.path.dirname(results_path)
+        local_groups = os.path.join(directory, DEFAULT_GROUPS)
+        # Name the chart after the directory of the results, e.g. sweeps/0.8.20/hash_results.json -> hash_0.8.20.pdf
+        label = os.path.basename(os.path.normpath(directory)) if directory else os.path.splitext(os.path.basename(results_path))[0]
+        jobs.append({
+            "chart": chart,
+            "results": results_path,
+            "groups": groups_path or (local_groups if os.path.exists(local_groups) else DEFAULT_GROUPS),
+            "output": os.path.join(out_dir, f"{chart}_{label}.pdf"),
+            "title": label,
+        })
+    return jobs
+
+
+def render_all(jobs, workers=None):
+    """Render ``jobs`` in parallel, return ``[(job, output path or None, seconds or error)]`` in job order."""
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                path, seconds = future.result()
+                results[i] = (jobs[i], path, seconds)
+            except Exception as error:
+                results[i] = (jobs[i], None, error)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render many charts headless and in parallel.")
+    parser.add_argument("spec", nargs="?", help="JSON file with a list of jobs")
+    parser.add_argument("--chart", help="chart for --results (one of analysis.charts.CHARTS)")
+    parser.add_argument("--results", nargs="+", default=[], help="results files, one chart each")
+    parser.add_argument("--groups", help="contract groups file (default: next to each results file, else ./contract_groups.json)")
+    parser.add_argument("--out-dir", default=".", help="directory for the charts of --results")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.spec:
+        with open(args.spec, "r") as file:
+            jobs.extend(json.load(file))
+    if args.results:
+        if not args.chart:
+            parser.error("--results needs --chart")
+        jobs.extend(jobs_for_results(args.chart, args.results, args.groups, args.out_dir))
+    if not jobs:
+        parser.error("nothing to render, pass a job file or --chart with --results")
+
+    started = time.perf_counter()
+    results = render_all(jobs, args.jobs)
+    failed = rendered = 0
+    for job, path, outcome in results:
+        if isinstance(outcome, Exception):
+            failed += 1
+            print(f"FAILED {job['chart']} ({job.get('results', 'default results')}): {outcome}")
+        elif path is None:
+            print(f"skipped {job['chart']} ({job.get('results', 'default results')}): nothing to plot")
+        else:
+            rendered += 1
+            print(f"{path} ({outcome:.2f}s)")
+    print(f"Rendered {rendered} of {len(results)} charts in {time.perf_counter() - started:.2f}s with {args.jobs} workers")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,349 @@
+"""Bulk screening of token addresses against a JSON-RPC node.
+
+Bytecode is fetched with ``eth_getCode`` in JSON-RPC batches, several
+batches in flight at once over a pool of keep-alive connections. Addresses
+are deduplicated by code hash and every distinct bytecode is run once
+through the offline TokenValidator (``BytecodeCorpus.validate``); verdicts
+are also kept in a JSON cache keyed by code hash and threshold, so repeated
+screens of the same bytecode skip the analysis entirely.
+
+With ``--confirm`` the offline verdicts are checked against the deployed
+TokenValidator, one ``eth_call`` per distinct bytecode, and the AuditCheck
+verdict is read for every address. AuditCheck looks at the signature stored
+in the token, so its verdict depends on the address and not only on the
+code. The calls are batched and pooled like ``eth_getCode``.
+
+    npx hardhat node
+    npx hardhat run --network localhost scripts/fill_screening_node.js
+    python3 -m analysis.screen --targets screening_targets.json --confirm
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .codehash import _BACKENDS, get_keccak
+from .validator import DEFAULT_THRESHOLD
+
+DEFAULT_RPC_URL = "http://127.0.0.1:8545"
+DEFAULT_BATCH_SIZE = 100  # requests per JSON-RPC batch
+DEFAULT_WORKERS = 8  # batches in flight
+DEFAULT_CACHE = "screening_cache.json"
+
+# validateToken(address) has the same selector on TokenValidator and AuditCheck
+VALIDATE_TOKEN_SELECTOR = "0x9532b6ab"  # validateToken(address)
+
+
+class RpcError(Exception):
+    """A JSON-RPC request failed as a whole (transport or HTTP error)."""
+
+
+class RpcClient:
+    """Sends JSON-RPC batches over one keep-alive connection per worker thread.
+
+    The worker threads, and with them the connections, live as long as the
+    client; ``close()`` (or leaving a ``with`` block) shuts them down.
+    """
+
+    def __init__(self, url=DEFAULT_RPC_URL, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS, timeout=60):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.requests_sent = 0
+        self.batches_sent = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rpc")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = factory(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _post(self, payload):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        # One retry on a fresh connection, the server may have closed an idle keep-alive
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", self.path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise RpcError(f"JSON-RPC batch failed: {error}") from error
+                continue
+            if response.status != 200:
+                raise RpcError(f"JSON-RPC batch failed with HTTP {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    def _send_batch(self, calls):
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, (method, params) in enumerate(calls)]
+        replies = self._post(payload)
+        if not isinstance(replies, list):
+            # Some nodes answer a whole batch with one error object
+            raise RpcError(f"JSON-RPC batch rejected: {replies}")
+        with self._lock:
+            self.requests_sent += len(calls)
+            self.batches_sent += 1
+        by_id = {reply.get("id"): reply for reply in replies}
+        return [by_id.get(i, {"error": {"message": "no reply"}}) for i in range(len(calls))]
+
+    def call_many(self, calls):
+        """Send ``(method, params)`` calls, return their replies (``result`` or ``error``) in order."""
+        batches = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        replies = []
+        for batch_replies in self._pool.map(self._send_batch, batches):
+            replies.extend(batch_replies)
+        return replies
+
+
+def _bool_result(reply):
+    # None when the call reverted, like ValidationResult.passed
+    if "error" in reply or not reply.get("result") or reply["result"] == "0x":
+        return None
+    return int(reply["result"], 16) != 0
+
+
+def _validate_call(contract, token):
+    return ("eth_call", [{"to": contract, "data": VALIDATE_TOKEN_SELECTOR + token[2:].lower().rjust(64, "0")}, "latest"])
+
+
+def load_verdict_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def store_verdict_cache(path, cache):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(cache, file)
+    os.replace(tmp_path, path)
+
+
+def analyze_codes(codes, threshold=DEFAULT_THRESHOLD, cache=None):
+    """Offline verdicts for ``{code hash: bytecode}``, reusing and filling ``cache``.
+
+    Returns ``(verdicts, cache_hits)``; ``verdicts`` maps each code hash to
+    ``{"transferStart", "comparisonCount", "passed", "error"}``.
+    """
+    from .corpus import BytecodeCorpus
+
+    cache = {} if cache is None else cache
+    verdicts = {}
+    missing = []
+    for code_hash, code in codes.items():
+        key = f"{code_hash}:{threshold}"
+        if key in cache:
+            verdicts[code_hash] = cache[key]
+        else:
+            missing.append((code_hash, code))
+
+    if missing:
+        corpus = BytecodeCorpus.from_bytecodes(missing)
+        for code_hash, result in zip(corpus.names, corpus.validate(threshold)):
+            verdict = {
+                "transferStart": result.transfer_start,
+                "comparisonCount": result.comparison_count,
+                "passed": result.passed,
+                "error": result.error,
+            }
+            verdicts[code_hash] = cache[f"{code_hash}:{threshold}"] = verdict
+    return verdicts, len(codes) - len(missing)
+
+
+def screen(addresses, client, threshold=DEFAULT_THRESHOLD, token_validator=None, audit_check=None, cache=None, keccak256=None):
+    """Screen ``addresses`` and return ``(rows, stats)``.
+
+    The TokenValidator (per distinct bytecode) and AuditCheck (per address)
+    are only called when their address is given. Code hashes are computed
+    with ``keccak256``, by default a native backend: the pure Python one would
+    dominate the run time, so it is only used when passed in explicitly.
+    """
+    keccak256 = keccak256 or get_keccak(native=True)
+    timings = {}
+
+    started = time.perf_counter()
+    addresses = list(dict.fromkeys(address.lower() for address in addresses))
+    replies = client.call_many([("eth_getCode", [address, "latest"]) for address in addresses])
+    timings["fetch"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    code_hashes = {}  # address -> code hash, None for accounts without code or failed fetches
+    codes = {}  # code hash -> bytecode
+    fetch_errors = {}
+    for address, reply in zip(addresses, replies):
+        if "error" in reply:
+            fetch_errors[address] = reply["error"].get("message", str(reply["error"]))
+            code_hashes[address] = None
+            continue
+        code = bytes.fromhex(reply["result"][2:])
+        if not code:
+            code_hashes[address] = None
+            continue
+        code_hash = "0x" + keccak256(code).hex()
+        code_hashes[address] = code_hash
+        codes.setdefault(code_hash, code)
+    timings["dedupe"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    verdicts, cache_hits = analyze_codes(codes, threshold, cache)
+    timings["analyze"] = time.perf_counter() - started
+
+    # One TokenValidator call per bytecode (the first address that has it), AuditCheck per address
+    started = time.perf_counter()
+    representatives = {}
+    for address, code_hash in code_hashes.items():
+        if code_hash is not None:
+            representatives.setdefault(code_hash, address)
+    calls, targets = [], []
+    if token_validator:
+        for code_hash, address in representatives.items():
+            calls.append(_validate_call(token_validator, address))
+            targets.append(("tokenValidator", code_hash))
+    if audit_check:
+        for address, code_hash in code_hashes.items():
+            if code_hash is not None:
+                calls.append(_validate_call(audit_check, address))
+                targets.append(("auditCheck", address))
+    onchain = {"tokenValidator": {}, "auditCheck": {}}
+    for (kind, key), reply in zip(targets, client.call_many(calls) if calls else []):
+        onchain[kind][key] = _bool_result(reply)
+    timings["confirm"] = time.perf_counter() - started
+
+    rows = []
+    mismatches = 0
+    for address, code_hash in code_hashes.items():
+        verdict = verdicts.get(code_hash, {})
+        row = {
+            "address": address,
+            "codeHash": code_hash,
+            "codeSize": len(codes[code_hash]) if code_hash else 0,
+            "transferStart": verdict.get("transferStart"),
+            "comparisonCount": verdict.get("comparisonCount"),
+            "passed": verdict.get("passed"),
+            "error": verdict.get("error") or fetch_errors.get(address),
+        }
+        if token_validator:
+            row["onchainPassed"] = onchain["tokenValidator"].get(code_hash)
+            if code_hash and row["onchainPassed"] != row["passed"]:
+                mismatches += 1
+        if audit_check:
+            row["auditCheckPassed"] = onchain["auditCheck"].get(address)
+        rows.append(row)
+
+    total = sum(timings.values())
+    with_code = sum(1 for code_hash in code_hashes.values() if code_hash is not None)
+    stats = {
+        "addresses": len(addresses),
+        "withCode": with_code,
+        "fetchErrors": len(fetch_errors),
+        "uniqueCodes": len(codes),
+        "dedupeHits": with_code - len(codes),
+        "cacheHits": cache_hits,
+        "analyzed": len(codes) - cache_hits,
+        "confirmCalls": len(calls),
+        "validatorMismatches": mismatches,
+        "rpcRequests": client.requests_sent,
+        "rpcBatches": client.batches_sent,
+        "seconds": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+        "addressesPerSecond": round(len(addresses) / total, 1) if total else None,
+    }
+    return rows, stats
+
+
+def read_addresses(path):
+    """Addresses from a targets file written by fill_screening_node.js, a JSON list or one per line.
+
+    Returns ``(addresses, targets)``, ``targets`` holding the deployed check contracts if known.
+    """
+    with open(path, "r") as file:
+        text = file.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")], {}
+    if isinstance(data, dict):
+        return [token["address"] for token in data["tokens"]], data
+    return [entry["address"] if isinstance(entry, dict) else entry for entry in data], {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen many token addresses with the offline TokenValidator.")
+    parser.add_argument("--targets", default="screening_targets.json", help="targets file or address list")
+    parser.add_argument("--rpc-url", default=DEFAULT_RPC_URL)
+    parser.add_argument("--threshold", type=int, help="validationThreshold (default: from the targets file or 12)")
+    parser.add_argument("--confirm", action="store_true", help="confirm the verdicts with eth_call on the deployed checks")
+    parser.add_argument("--token-validator", help="TokenValidator address for --confirm")
+    parser.add_argument("--audit-check", help="AuditCheck address for --confirm")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="requests per JSON-RPC batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="batches in flight")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="verdict cache file ('' to disable)")
+    parser.add_argument("--backend", choices=sorted(_BACKENDS), help="keccak implementation to use (default: the fastest native one)")
+    parser.add_argument("--output", default="screening_results.json")
+    args = parser.parse_args(argv)
+
+    addresses, targets = read_addresses(args.targets)
+    threshold = args.threshold if args.threshold is not None else targets.get("threshold", DEFAULT_THRESHOLD)
+    token_validator = audit_check = None
+    if args.confirm:
+        token_validator = args.token_validator or targets.get("tokenValidator")
+        audit_check = args.audit_check or targets.get("auditCheck")
+        if not token_validator and not audit_check:
+            parser.error("--confirm needs --token-validator or --audit-check (or a targets file naming them)")
+
+    try:
+        keccak256 = get_keccak(args.backend, native=args.backend is None)
+    except ImportError as error:
+        parser.error(f"{error}, or pass --backend python to screen with the slow pure Python keccak")
+
+    cache = load_verdict_cache(args.cache)
+    with RpcClient(args.rpc_url, args.batch_size, args.workers) as client:
+        rows, stats = screen(addresses, client, threshold, token_validator, audit_check, cache, keccak256)
+    if args.cache:
+        store_verdict_cache(args.cache, cache)
+
+    passed = sum(1 for row in rows if row["passed"])
+    print(f"{stats['addresses']} addresses, {stats['uniqueCodes']} distinct bytecodes "
+          f"({stats['dedupeHits']} deduplicated, {stats['cacheHits']} cached, {stats['analyzed']} analyzed), "
+          f"{passed} pass the TokenValidator")
+    if token_validator:
+        print(f"TokenValidator confirmed on-chain, {stats['validatorMismatches']} mismatches")
+    if audit_check:
+        print(f"AuditCheck: {sum(1 for row in rows if row.get('auditCheckPassed'))} audited")
+    seconds = ", ".join(f"{stage} {value:.3f}s" for stage, value in stats["seconds"].items())
+    print(f"{stats['rpcRequests']} RPC requests in {stats['rpcBatches']} batches; {seconds}; "
+          f"{stats['addressesPerSecond']} addresses/s")
+
+    with open(args.output, "w") as file:
+        json.dump({"stats": stats, "results": rows}, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Incremental reading of the append-only JSONL result streams.
+
+The measurement scripts append one ``{"key": ..., "result": ...}`` line per
+measurement (see scripts/lib/result_store.js). Readers here only ever parse
+complete lines, so a file that is still being written can be read at any time,
+and remember how far they got, so a grown file only costs its new tail.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from .cache import CACHE_DIR
+
+
+def read_records(path, offset=0):
+    """Parse the complete lines of ``path`` from byte ``offset`` on.
+
+    Returns ``(records, new_offset)``; pass ``new_offset`` back in to continue
+    where this call stopped. A trailing partial line is left for the next call.
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        data = file.read()
+    end = data.rfind(b"\n") + 1
+    records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return records, offset + end
+
+
+def follow(path, interval=1.0, offset=0):
+    """Yield each new batch of records appended to ``path``, polling every ``interval`` seconds.
+
+    Runs until the caller stops iterating; a missing file is waited for.
+    """
+    while True:
+        if os.path.exists(path):
+            records, offset = read_records(path, offset)
+            if records:
+                yield records
+                continue
+        time.sleep(interval)
+
+
+TAIL_WINDOW = 1 << 16  # bytes before the cached offset hashed to tell an append from a rewrite
+
+
+def _tail_digest(path, offset):
+    with open(path, "rb") as file:
+        file.seek(max(0, offset - TAIL_WINDOW))
+        return hashlib.sha256(file.read(offset - max(0, offset - TAIL_WINDOW))).hexdigest()
+
+
+def _stream_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _load_batches(pickled_path, length):
+    # The record batches appended to the cache, up to the length its stamp covers
+    records = []
+    with open(pickled_path, "rb") as file:
+        while file.tell() < length:
+            records.extend(pickle.load(file))
+    return records
+
+
+def load_records(path):
+    """All complete records of ``path``, parsing only what was appended since the last call.
+
+    The parsed records are appended to the analysis cache in batches, next to a
+    stamp holding the byte offset they cover, the size, mtime and inode of the
+    stream, and a hash of the ``TAIL_WINDOW`` bytes before the offset. A stream
+    whose stat matches the stamp is not read at all. A grown one with the same
+    inode and tail is only parsed from the offset on; anything else (another
+    inode, a truncated file, a changed tail) is parsed from the start. A
+    rewrite that keeps the size or only changes bytes before the tail window
+    is not noticed: the streams are append-only.
+    """
+    key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:32]
+    stamp_path = os.path.join(CACHE_DIR, f"stream-{key}.json")
+    pickled_path = os.path.join(CACHE_DIR, f"stream-{key}.pkl")
+    stamp = None
+    try:
+        with open(stamp_path, "r") as file:
+            stamp = json.load(file)
+        records = _load_batches(pickled_path, stamp["pickled"])
+    except (OSError, EOFError, KeyError, ValueError, pickle.UnpicklingError):
+        stamp = None
+
+    current = _stream_stamp(path)
+    if stamp is not None and stamp["stat"] == current:
+        return records
+    if (
+        stamp is None
+        or stamp["stat"][2] != current[2]
+        or stamp["offset"] > current[0]
+        or stamp["tail"] != _tail_digest(path, stamp["offset"])
+    ):
+        stamp = {"offset": 0, "pickled": 0}
+        records = []
+
+    new_records, offset = read_records(path, stamp["offset"])
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Drop whatever an interrupted writer left past the stamped length, then append the batch
+    with open(pickled_path, "ab") as file:
+        file.truncate(stamp["pickled"])
+        if new_records:
+            pickle.dump(new_records, file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickled = file.tell()
+    stamp = {"offset": offset, "stat": current, "tail": _tail_digest(path, offset), "pickled": pickled}
+    tmp_path = f"{stamp_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(stamp, file)
+    os.replace(tmp_path, stamp_path)
+    return records + new_records
+
+
+def load_stream_results(path):
+    """The ``result`` part of every complete record of ``path``, in measurement order."""
+    return [record["result"] for record in load_records(path)]
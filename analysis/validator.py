@@ -0,0 +1,284 @@
+"""Offline re-implementation of ``TokenValidator.validateToken``.
+
+The functions here follow contracts/TokenValidator.sol step by step,
+including the places where the contract reverts: reading past the end of
+the bytecode, indexing outside the 100 slot ``internalstack`` and checked
+arithmetic underflow on ``stackPointer`` or the jump address. A reverted
+call is reported with ``passed=None`` since ``validateToken`` has no verdict
+in that case. Keep this file in sync with the contract.
+"""
+import argparse
+import json
+from typing import NamedTuple, Optional
+
+from .artifacts import EVALUATION_DIR, iter_deployed_bytecodes
+
+TRANSFER_PATTERN = bytes.fromhex("63a9059cbb1461")  # PUSH4 a9059cbb EQ PUSH2
+STACK_SIZE = 100  # length of internalstack in validateTransferFunction
+DEFAULT_THRESHOLD = 12  # threshold used by scripts/test_from_evaluation_v6.js
+DEFAULT_GAS_LIMIT = 30_000_000  # gas of an eth_call, the block gas limit of a hardhat node
+
+# Upper bounds of the gas validateToken spends, so the interpreter can give up where the call
+# would run out of gas. They err on the high side: a token that stays within the budget here
+# also does on-chain, one that exceeds it may still fit. Measure with analysis/fuzz.py.
+CALL_GAS = 60_000  # intrinsic gas, the call, EXTCODESIZE, EXTCODECOPY and the internalstack
+SCAN_BYTE_GAS = 300  # one byte of the selector scan
+STEP_GAS = 1_000  # one instruction of validateTransferFunction, through its whole if/else chain
+PUSH_BYTE_GAS = 250  # one immediate byte of a PUSH, read in a loop by the contract
+
+OUT_OF_BOUNDS = "array index out of bounds"
+UNDERFLOW = "arithmetic underflow"
+INFINITE_LOOP = "infinite loop"
+OUT_OF_GAS = "gas budget exceeded"
+
+# Bytes the selector scan steps over (PUSH1-PUSH3 skip their immediates)
+_SCAN_STEP = [1] * 256
+_SCAN_STEP[0x60] = 2
+_SCAN_STEP[0x61] = 3
+_SCAN_STEP[0x62] = 4
+
+
+class ValidatorRevert(Exception):
+    """The on-chain call would revert; ``reason`` names the panic."""
+
+    def __init__(self, reason, pc=None):
+        super().__init__(reason if pc is None else f"{reason} at {pc}")
+        self.reason = reason
+        self.pc = pc
+
+
+class ValidationResult(NamedTuple):
+    transfer_start: int
+    comparison_count: int
+    passed: Optional[bool]  # None if validateToken reverts
+    error: Optional[str] = None
+
+
+def _scan_may_overrun(code):
+    # True if a PUSH4 near the end could make the scan read past the code
+    tail = len(code) - len(TRANSFER_PATTERN) - 2
+    for pos in range(max(tail, 0), len(code)):
+        if code[pos] != 0x63:
+            continue
+        window = code[pos:]
+        if TRANSFER_PATTERN.startswith(window) or window.startswith(TRANSFER_PATTERN):
+            return True
+    return False
+
+
+def find_transfer_start(code):
+    """Return the transfer entry offset found by the selector scan, 0 if none."""
+    if TRANSFER_PATTERN not in code and not _scan_may_overrun(code):
+        return 0
+
+    size = len(code)
+    step = _SCAN_STEP
+    i = 0
+    while i < size:
+        byte = code[i]
+        if byte == 0x63:
+            # Compare byte by byte like the short-circuiting && in the contract
+            for offset in range(1, len(TRANSFER_PATTERN)):
+                if i + offset >= size:
+                    raise ValidatorRevert(OUT_OF_BOUNDS, i + offset)
+                if code[i + offset] != TRANSFER_PATTERN[offset]:
+                    break
+            else:
+                if i + 8 >= size:
+                    raise ValidatorRevert(OUT_OF_BOUNDS, i + 8)
+                return code[i + 7] * 256 + code[i + 8]
+        i += step[byte]
+    return 0
+
+
+def _setup_gas(size):
+    # Gas bound of everything before validateTransferFunction: the call, the copied code and a
+    # full selector scan, including the quadratic memory expansion of code and internalstack
+    words = size // 32 + STACK_SIZE + 16
+    return CALL_GAS + size * SCAN_BYTE_GAS + 3 * words + words * words // 512
+
+
+def count_comparisons(code, start, gas_limit=DEFAULT_GAS_LIMIT):
+    """Run the simplified stack machine of ``validateTransferFunction``.
+
+    Raises ``ValidatorRevert`` where the contract would revert. Jumps are
+    always taken; since neither the comparison count nor the jump return
+    address influences control flow, reaching a jump target twice with the
+    same live stack means the contract loops until it runs out of gas. A
+    finite walk whose gas bound exceeds ``gas_limit`` raises ``OUT_OF_GAS``.
+    """
+    size = len(code)
+    stack = [0] * STACK_SIZE
+    sp = 0
+    comparison_count = 0
+    seen = set()
+    i = start
+    gas = _setup_gas(size)
+
+    while True:
+        gas += STEP_GAS
+        if gas > gas_limit:
+            raise ValidatorRevert(OUT_OF_GAS, i)
+        if i >= size:
+            raise ValidatorRevert(OUT_OF_BOUNDS, i)
+        opcode = code[i]
+
+        if opcode == 0x56 or opcode == 0x57:  # JUMP, JUMPI
+            if sp < 1:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp > STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            target = stack[sp - 1]
+            sp -= 1
+            if opcode == 0x57:
+                if sp < 1:
+                    raise ValidatorRevert(UNDERFLOW, i)
+                sp -= 1
+            if target == 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+            state = (target, tuple(stack[:sp]))
+            if state in seen:
+                raise ValidatorRevert(INFINITE_LOOP, i)
+            seen.add(state)
+            i = target
+            continue
+        elif 0x10 <= opcode <= 0x15:  # LT GT SLT SGT EQ ISZERO
+            comparison_count += 1
+            sp -= 1 if opcode == 0x15 else 2
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = 0xBEEF
+            sp += 1
+        elif 0x60 <= opcode <= 0x7F:  # PUSH1 - PUSH32
+            length = opcode - 0x5F
+            if i + length >= size:
+                raise ValidatorRevert(OUT_OF_BOUNDS, size)
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = int.from_bytes(code[i + 1:i + 1 + length], "big")
+            sp += 1
+            i += length
+            gas += length * PUSH_BYTE_GAS
+        elif 0x80 <= opcode <= 0x89:  # DUP1 - DUP10
+            position = opcode - 0x7F
+            if sp < position:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = stack[sp - position]
+            sp += 1
+        elif 0x90 <= opcode <= 0x97:  # SWAP1 - SWAP8
+            position = opcode - 0x8E
+            if sp < position:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp > STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp - position], stack[sp - 1] = stack[sp - 1], stack[sp - position]
+        elif 0x01 <= opcode <= 0x0B:  # arithmetic
+            sp -= 3 if opcode == 0x08 or opcode == 0x09 else 2
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = 0xDEADBEEF
+            sp += 1
+        elif 0x16 <= opcode <= 0x1D and opcode != 0x19:  # bitwise logic / shifts
+            sp -= 1
+            if sp < 1:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp > STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp - 1] = 0xDEAF
+        elif opcode == 0x36:  # CALLDATASIZE
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = 64
+            sp += 1
+        elif opcode == 0x35:  # CALLDATALOAD
+            if sp < 1:
+                raise ValidatorRevert(UNDERFLOW, i)
+            if sp > STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp - 1] = 0xDEAD
+        elif opcode == 0x50:  # POP
+            sp -= 1
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+        elif 0x32 <= opcode <= 0x34:  # ORIGIN CALLER CALLVALUE
+            if sp >= STACK_SIZE:
+                raise ValidatorRevert(OUT_OF_BOUNDS, i)
+            stack[sp] = 0x1234
+            sp += 1
+        elif opcode in (0x52, 0x53, 0x55):  # MSTORE MSTORE8 SSTORE
+            sp -= 2
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+        elif opcode == 0x20:  # KECCAK256
+            sp -= 1
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+        elif 0xA0 <= opcode <= 0xA4:  # LOG0 - LOG4
+            sp -= 2 + (opcode - 0xA0)
+            if sp < 0:
+                raise ValidatorRevert(UNDERFLOW, i)
+        elif opcode == 0xF3:  # RETURN
+            return comparison_count
+        elif opcode == 0xFD:  # REVERT, the contract stops interpreting here
+            return comparison_count
+        i += 1
+
+
+def validate_token(code, threshold=DEFAULT_THRESHOLD, gas_limit=DEFAULT_GAS_LIMIT):
+    """Return the ``validateToken`` outcome for a runtime bytecode."""
+    transfer_start = 0
+    comparison_count = 0
+    try:
+        transfer_start = find_transfer_start(code)
+        if transfer_start > 0:
+            comparison_count = count_comparisons(code, transfer_start, gas_limit)
+    except ValidatorRevert as revert:
+        return ValidationResult(transfer_start, comparison_count, None, revert.reason)
+    return ValidationResult(transfer_start, comparison_count, threshold >= comparison_count)
+
+
+def validate_artifacts(contract_name, threshold=DEFAULT_THRESHOLD, prefixes=None, evaluation_dir=EVALUATION_DIR):
+    """Validate every compiled variant of ``contract_name`` under ``evaluation_dir``."""
+    from .corpus import BytecodeCorpus  # needs numpy, keep it out of the single-token path
+
+    corpus = BytecodeCorpus.from_bytecodes(iter_deployed_bytecodes(contract_name, prefixes, evaluation_dir))
+    results = []
+    for prefix, result in zip(corpus.names, corpus.validate(threshold)):
+        results.append({
+            "prefix": prefix,
+            "contract": contract_name,
+            "transferStart": result.transfer_start,
+            "comparisonCount": result.comparison_count,
+            "passed": result.passed,
+            "error": result.error,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the TokenValidator check on compiled artifacts without a chain.")
+    parser.add_argument("--contract", default="ozTokenA", help="artifact name inside each evaluation/<prefix>/ directory")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="validationThreshold of the TokenValidator")
+    parser.add_argument("--evaluation-dir", default=EVALUATION_DIR)
+    parser.add_argument("--prefix", action="append", dest="prefixes", help="only check these prefixes (repeatable)")
+    parser.add_argument("--output", default="offline_validation_results.json")
+    args = parser.parse_args(argv)
+
+    results = validate_artifacts(args.contract, args.threshold, args.prefixes, args.evaluation_dir)
+    for row in results:
+        print(f"{row['prefix']:>16}  start={row['transferStart']:<6} comparisons={row['comparisonCount']:<4} "
+              f"passed={row['passed']}" + (f"  ({row['error']})" if row["error"] else ""))
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
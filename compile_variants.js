@@ -1,84 +1,311 @@
 const fs = require("fs");
-const { execSync } = require("child_process");
+const os = require("os");
+const path = require("path");
+const crypto = require("crypto");
+const { spawn } = require("child_process");
+const { buildPack } = require("./scripts/lib/artifact_pack");
 
 // Constants
-const CONFIG_FILE = "./hardhat.config.js";
-const ARTIFACT_SCRIPT = "./secure_artifacts.sh";
+const ROOT = __dirname;
+const SOURCES_DIR = path.join(ROOT, "contracts");
+const STORE_DIR = path.join(ROOT, ".variant-store"); // content-addressed artifact store
+const JOBS_DIR = path.join(STORE_DIR, "jobs"); // scratch space of the running compiles
+const EVALUATION_DIR = path.join(ROOT, "evaluation");
+const SOLC_VERSION = "0.8.20";
 const RUN_VALUES = Array.from({ length: 32 }, (_, i) => 2 ** (31 - i) - 1); // 2^31-1 to 2^0-1
 const BYTECODE_HASH_VALUES = ["ipfs", "none"];
+const CONTRACTS = ["AuditCheck", "AuditCheckHash", "Auditor", "ozTokenA", "SignedToken", "TokenValidator"]; // artifacts kept per variant
 
-// Backup original config
-const originalConfig = fs.readFileSync(CONFIG_FILE, "utf8");
+// Parse "--name value" style options
+function parseArgs(argv) {
+  const options = { jobs: Math.max(1, os.cpus().length - 1), runs: RUN_VALUES, bytecodeHash: BYTECODE_HASH_VALUES, contracts: CONTRACTS, unoptimized: true, force: false };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === "--jobs") options.jobs = parseInt(argv[++i], 10);
+    else if (arg === "--runs") options.runs = argv[++i].split(",").map((value) => parseInt(value, 10));
+    else if (arg === "--bytecode-hash") options.bytecodeHash = argv[++i].split(",");
+    else if (arg === "--contracts") options.contracts = argv[++i].split(",");
+    else if (arg === "--no-unoptimized") options.unoptimized = false;
+    else if (arg === "--force") options.force = true;
+    else throw new Error(`Unknown argument: ${arg}`);
+  }
+  return options;
+}
+
+// One entry per variant: the evaluation prefix and the solc settings it is built with
+function buildMatrix({ runs, bytecodeHash, unoptimized }) {
+  const matrix = [];
+  for (const hash of bytecodeHash) {
+    for (const run of runs) {
+      matrix.push({ prefix: `${hash}${run}`, settings: { optimizer: { enabled: true, runs: run }, metadata: { bytecodeHash: hash } } });
+    }
+    if (unoptimized) {
+      matrix.push({ prefix: `${hash}none`, settings: { optimizer: { enabled: false, runs: 0 }, metadata: { bytecodeHash: hash } } });
+    }
+  }
+  return matrix;
+}
+
+function sha256(data) {
+  return crypto.createHash("sha256").update(data).digest("hex");
+}
+
+function sourceFile(contractName) {
+  return path.join(SOURCES_DIR, `${contractName}.sol`);
+}
+
+// The source file of a contract and every local file it imports, directly or not. Imports
+// from node_modules are pinned by package-lock.json.
+function sourceClosure(file, seen = new Set()) {
+  if (seen.has(file)) return seen;
+  seen.add(file);
+  const importPattern = /import\s+(?:[^"';]*?\s+from\s+)?["']([^"']+)["']/g;
+  for (const [, target] of fs.readFileSync(file, "utf8").matchAll(importPattern)) {
+    if (target.startsWith(".")) {
+      sourceClosure(path.resolve(path.dirname(file), target), seen);
+    }
+  }
+  return seen;
+}
 
-// Helper to update the Hardhat config
-function updateConfig(runs, bytecodeHash, optimized) {
-  const newConfig = `
+// Hash of the sources a contract is built from plus the lock file, so editing one contract
+// only invalidates the contracts that import it
+function hashSources(contractName) {
+  const hash = crypto.createHash("sha256");
+  for (const file of [...sourceClosure(sourceFile(contractName))].sort()) {
+    hash.update(path.relative(ROOT, file)).update("\0").update(fs.readFileSync(file)).update("\0");
+  }
+  hash.update(fs.readFileSync(path.join(ROOT, "package-lock.json")));
+  return hash.digest("hex");
+}
+
+function contractKey(sourceHash, contractName, settings) {
+  return sha256(JSON.stringify({ sourceHash, contractName, version: SOLC_VERSION, settings }));
+}
+
+function manifestPath(key) {
+  return path.join(STORE_DIR, "contracts", `${key}.json`);
+}
+
+function blobPath(blobHash) {
+  return path.join(STORE_DIR, "blobs", `${blobHash}.json`);
+}
+
+// A contract of a variant is built if its manifest exists and its blobs are still in the store
+function isBuilt(key) {
+  if (!fs.existsSync(manifestPath(key))) return false;
+  const manifest = JSON.parse(fs.readFileSync(manifestPath(key), "utf8"));
+  return [manifest.artifact, manifest.sourceMap].filter(Boolean).every((blobHash) => fs.existsSync(blobPath(blobHash)));
+}
+
+// Isolated config per job, hardhat.config.js is never touched. Only the given source files
+// (and what they import) are compiled; they keep their contracts/ source names, so the
+// metadata hash in the bytecode is the same as in a full compile.
+function writeJobConfig(jobDir, settings, sourceFiles) {
+  const config = `
 require("@nomicfoundation/hardhat-toolbox");
+const { subtask } = require("hardhat/config");
+const { TASK_COMPILE_SOLIDITY_GET_SOURCE_PATHS } = require("hardhat/builtin-tasks/task-names");
+
+const SOURCE_FILES = new Set(${JSON.stringify(sourceFiles)});
+subtask(TASK_COMPILE_SOLIDITY_GET_SOURCE_PATHS).setAction(async (args, hre, runSuper) =>
+  (await runSuper(args)).filter((sourcePath) => SOURCE_FILES.has(sourcePath))
+);
 
 module.exports = {
   solidity: {
-    version: "0.8.20",
-    settings: {
-      optimizer: {
-        enabled: true,  // Enable optimizer
-        runs: ${runs}  // Dynamic runs value
-      },
-      metadata: {
-        bytecodeHash: "${bytecodeHash}"  // Dynamic bytecodeHash
-      }
-    }
+    version: ${JSON.stringify(SOLC_VERSION)},
+    settings: ${JSON.stringify(settings)}
+  },
+  paths: {
+    root: ${JSON.stringify(ROOT)},
+    sources: ${JSON.stringify(SOURCES_DIR)},
+    artifacts: ${JSON.stringify(path.join(jobDir, "artifacts"))},
+    cache: ${JSON.stringify(path.join(jobDir, "cache"))}
+  },
+  typechain: {
+    outDir: ${JSON.stringify(path.join(jobDir, "typechain-types"))}
   }
 };`;
+  const configPath = path.join(jobDir, "hardhat.config.js");
+  fs.writeFileSync(configPath, config, "utf8");
+  return configPath;
+}
 
-    const noneConfig = `
-  require("@nomicfoundation/hardhat-toolbox");
-  module.exports = {
-    solidity: {
-      version: "0.8.20",
-      settings: {
-        optimizer: {
-          enabled: false,  // Enable optimizer
-          runs: 0  // Dynamic runs value
-        },
-        metadata: {
-          bytecodeHash: "${bytecodeHash}"  // Dynamic bytecodeHash
-        }
-      }
+function run(command, args, options) {
+  return new Promise((resolve, reject) => {
+    const child = spawn(command, args, { stdio: ["ignore", "pipe", "pipe"], ...options });
+    let output = "";
+    child.stdout.on("data", (chunk) => (output += chunk));
+    child.stderr.on("data", (chunk) => (output += chunk));
+    child.on("error", reject);
+    child.on("close", (code) => (code === 0 ? resolve(output) : reject(new Error(`${command} ${args.join(" ")} exited with ${code}\n${output}`))));
+  });
+}
+
+function storeBlob(content) {
+  const blobHash = sha256(content);
+  if (!fs.existsSync(blobPath(blobHash))) {
+    fs.writeFileSync(`${blobPath(blobHash)}.${process.pid}.tmp`, content);
+    fs.renameSync(`${blobPath(blobHash)}.${process.pid}.tmp`, blobPath(blobHash));
+  }
+  return blobHash;
+}
+
+// Build info hardhat keeps next to an artifact, parsed once per job
+function loadBuildInfo(artifactPath, buildInfos) {
+  const dbgPath = artifactPath.replace(/\.json$/, ".dbg.json");
+  if (!fs.existsSync(dbgPath)) return null;
+  const buildInfoPath = path.resolve(path.dirname(dbgPath), JSON.parse(fs.readFileSync(dbgPath, "utf8")).buildInfo);
+  if (!buildInfos.has(buildInfoPath)) {
+    buildInfos.set(buildInfoPath, JSON.parse(fs.readFileSync(buildInfoPath, "utf8")));
+  }
+  return buildInfos.get(buildInfoPath);
+}
+
+// Runtime source map of a contract plus the sources its file ids refer to, taken from the
+// build info (used by scripts/profile_validator.js)
+function extractSourceMap(artifact, buildInfo) {
+  const { sourceName, contractName } = artifact;
+  const sources = {};
+  for (const [name, { id }] of Object.entries(buildInfo.output.sources)) {
+    sources[id] = { name, content: buildInfo.input.sources[name].content };
+  }
+  return {
+    sourceName,
+    contractName,
+    sourceMap: buildInfo.output.contracts[sourceName][contractName].evm.deployedBytecode.sourceMap,
+    sources,
+  };
+}
+
+// Store the artifacts of a finished job once per content hash and record one manifest per contract
+function storeArtifacts(jobDir, variant, contractNames) {
+  const buildInfos = new Map();
+  for (const contractName of contractNames) {
+    const artifactPath = path.join(jobDir, "artifacts", "contracts", `${contractName}.sol`, `${contractName}.json`);
+    if (!fs.existsSync(artifactPath)) {
+      console.warn(`Warning: Artifact JSON for ${contractName} not found at ${artifactPath}`);
+      continue;
+    }
+    const key = variant.keys[contractName];
+    let data = fs.readFileSync(artifactPath);
+    const artifact = JSON.parse(data);
+    const buildInfo = loadBuildInfo(artifactPath, buildInfos);
+    const sourceMap = buildInfo ? extractSourceMap(artifact, buildInfo) : null;
+    // Hardhat artifacts leave out where the immutables sit in the runtime code, scripts/grouping_audit.js
+    // needs them to mask the values. Only added when there are any, so other artifacts stay as hardhat wrote them.
+    const immutableReferences = buildInfo && buildInfo.output.contracts[artifact.sourceName][artifact.contractName].evm.deployedBytecode.immutableReferences;
+    if (immutableReferences && Object.keys(immutableReferences).length) {
+      data = JSON.stringify({ ...artifact, immutableReferences }, null, 2);
     }
-  };`;
-
-  optimized ? fs.writeFileSync(CONFIG_FILE, newConfig, "utf8") : fs.writeFileSync(CONFIG_FILE, noneConfig, "utf8");
-  //fs.writeFileSync(CONFIG_FILE, newConfig, "utf8");
-  console.log(`Updated hardhat.config.js with runs: ${runs}, bytecodeHash: "${bytecodeHash}", optimized: ${optimized}`);
-}
-
-// Helper to compile and secure artifacts
-function compileAndSecure(prefix) {
-  console.log(`Compiling with prefix: ${prefix}`);
-  try {
-    execSync("npx hardhat compile", { stdio: "inherit" });
-    execSync(`${ARTIFACT_SCRIPT} ${prefix}`, { stdio: "inherit" });
-    console.log(`Artifacts secured for prefix: ${prefix}`);
-  } catch (error) {
-    console.error(`Error during compilation or artifact securing for prefix: ${prefix}`, error);
+    const manifest = {
+      key,
+      contractName,
+      prefix: variant.prefix,
+      version: SOLC_VERSION,
+      settings: variant.settings,
+      artifact: storeBlob(data),
+      sourceMap: sourceMap ? storeBlob(JSON.stringify(sourceMap)) : null,
+    };
+    fs.writeFileSync(manifestPath(key), JSON.stringify(manifest, null, 2));
+  }
+}
+
+// Compile the contracts of a variant that are not in the store yet
+async function compileVariant(variant, contractNames) {
+  const jobKey = sha256(contractNames.map((contractName) => variant.keys[contractName]).join(","));
+  const jobDir = path.join(JOBS_DIR, jobKey);
+  fs.rmSync(jobDir, { recursive: true, force: true });
+  fs.mkdirSync(jobDir, { recursive: true });
+  const configPath = writeJobConfig(jobDir, variant.settings, contractNames.map(sourceFile));
+
+  console.log(`Compiling ${contractNames.join(", ")} with prefix: ${variant.prefix}`);
+  await run("npx", ["hardhat", "compile", "--config", configPath], { cwd: ROOT });
+  storeArtifacts(jobDir, variant, contractNames);
+  fs.rmSync(jobDir, { recursive: true, force: true });
+  console.log(`Artifacts stored for prefix: ${variant.prefix}`);
+}
+
+// Expose evaluation/<prefix>/<Contract>.json as links into the store
+function linkVariant(prefix, contractName, key) {
+  const manifest = JSON.parse(fs.readFileSync(manifestPath(key), "utf8"));
+  const outputDir = path.join(EVALUATION_DIR, prefix);
+  fs.mkdirSync(outputDir, { recursive: true });
+  const links = [[`${contractName}.json`, manifest.artifact]];
+  if (manifest.sourceMap) {
+    links.push([`${contractName}.sourcemap.json`, manifest.sourceMap]);
+  }
+  for (const [fileName, blobHash] of links) {
+    const linkPath = path.join(outputDir, fileName);
+    fs.rmSync(linkPath, { force: true });
+    fs.symlinkSync(path.relative(outputDir, blobPath(blobHash)), linkPath);
   }
 }
 
-// Main execution loop
-try {
-  for (const bytecodeHash of BYTECODE_HASH_VALUES) {
-    for (const runs of RUN_VALUES) {
-      const prefix = `${bytecodeHash}${runs}`;
-      updateConfig(runs, bytecodeHash, true);
-      compileAndSecure(prefix);
+// Run tasks with at most `limit` in flight
+async function runPool(tasks, limit) {
+  const failures = [];
+  let next = 0;
+  const worker = async () => {
+    while (next < tasks.length) {
+      const task = tasks[next++];
+      try {
+        await task.run();
+      } catch (error) {
+        console.error(`Error during compilation for prefix: ${task.prefix}`, error.message);
+        failures.push(task.prefix);
+      }
     }
-    updateConfig(0, bytecodeHash, false);
-    compileAndSecure(`${bytecodeHash}none`);
+  };
+  await Promise.all(Array.from({ length: Math.min(limit, tasks.length) }, worker));
+  return failures;
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  for (const dir of ["contracts", "blobs", "jobs"]) {
+    fs.mkdirSync(path.join(STORE_DIR, dir), { recursive: true });
+  }
+
+  const sourceHashes = Object.fromEntries(options.contracts.map((contractName) => [contractName, hashSources(contractName)]));
+  const variants = buildMatrix(options).map((variant) => ({
+    ...variant,
+    keys: Object.fromEntries(options.contracts.map((contractName) => [contractName, contractKey(sourceHashes[contractName], contractName, variant.settings)])),
+  }));
+  const pending = variants
+    .map((variant) => ({ variant, contractNames: options.contracts.filter((contractName) => options.force || !isBuilt(variant.keys[contractName])) }))
+    .filter(({ contractNames }) => contractNames.length);
+  const pendingContracts = pending.reduce((count, { contractNames }) => count + contractNames.length, 0);
+  console.log(
+    `${variants.length} variants x ${options.contracts.length} contracts, ${pendingContracts} contracts in ${pending.length} variants to compile with ${options.jobs} workers`
+  );
+
+  const tasks = pending.map(({ variant, contractNames }) => ({ prefix: variant.prefix, run: () => compileVariant(variant, contractNames) }));
+  // The first compile downloads solc if needed, let it finish before starting the others
+  const failures = tasks.length ? await runPool(tasks.slice(0, 1), 1) : [];
+  failures.push(...(await runPool(tasks.slice(1), options.jobs)));
+
+  let linked = 0;
+  for (const variant of variants) {
+    for (const contractName of options.contracts) {
+      if (isBuilt(variant.keys[contractName])) {
+        linkVariant(variant.prefix, contractName, variant.keys[contractName]);
+        linked++;
+      }
+    }
+  }
+  console.log(`Linked ${linked} artifacts into ${path.relative(ROOT, EVALUATION_DIR)}/`);
+  // Unchanged artifacts are copied from the previous pack, only the new ones are parsed
+  console.log(`Packed ${buildPack(EVALUATION_DIR)} artifacts`);
+  if (failures.length) {
+    throw new Error(`Compilation failed for: ${failures.join(", ")}`);
   }
-} catch (error) {
-  console.error("Unexpected error:", error);
-} finally {
-  // Restore original config
-  fs.writeFileSync(CONFIG_FILE, originalConfig, "utf8");
-  console.log("Restored original hardhat.config.js");
 }
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
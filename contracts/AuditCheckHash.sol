@@ -0,0 +1,87 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.20;
+
+import {ISignedToken, IAuditor} from "./AuditCheck.sol";
+
+contract AuditCheckHash {
+    /**
+     * @dev Validates if a token has been audited by checking the ECDSA signature.
+     * Same check as AuditCheck.validateToken, but the code hash comes from EXTCODEHASH
+     * instead of copying and hashing the bytecode.
+     * @param tokenAddress The address of the token to validate.
+     * @return isValid True if the token is audited, otherwise false.
+     */
+    function validateToken(address tokenAddress) external view returns (bool) {
+        try ISignedToken(tokenAddress).getSignature() returns (address auditorContract, bytes memory signature) {
+            // Ensure the token has a valid auditor contract
+            if (auditorContract == address(0) || signature.length == 0) {
+                return false; // No valid signature or auditor contract
+            }
+
+            // Check if the signer of the code hash is the auditor
+            return recoverSigner(tokenAddress, signature) == IAuditor(auditorContract).getAddress();
+        } catch {
+            // If getSignature fails, consider the token invalid
+            return false;
+        }
+    }
+
+    /**
+     * @dev Validates several tokens in one call. The address of every auditor contract is
+     * looked up once per call, tokens signed through the same auditor reuse it.
+     * @param tokenAddresses The addresses of the tokens to validate.
+     * @return results True at the index of every audited token.
+     */
+    function validateTokens(address[] calldata tokenAddresses) external view returns (bool[] memory results) {
+        results = new bool[](tokenAddresses.length);
+        address[] memory auditorContracts = new address[](tokenAddresses.length);
+        address[] memory auditorAddresses = new address[](tokenAddresses.length);
+        uint256 knownAuditors = 0;
+
+        for (uint256 i = 0; i < tokenAddresses.length; i++) {
+            try ISignedToken(tokenAddresses[i]).getSignature() returns (address auditorContract, bytes memory signature) {
+                if (auditorContract == address(0) || signature.length == 0) {
+                    continue; // No valid signature or auditor contract
+                }
+
+                // Reuse the auditor address if an earlier token named the same auditor contract
+                uint256 j = 0;
+                while (j < knownAuditors && auditorContracts[j] != auditorContract) {
+                    j++;
+                }
+                if (j == knownAuditors) {
+                    auditorContracts[j] = auditorContract;
+                    auditorAddresses[j] = IAuditor(auditorContract).getAddress();
+                    knownAuditors++;
+                }
+
+                results[i] = recoverSigner(tokenAddresses[i], signature) == auditorAddresses[j];
+            } catch {
+                // If getSignature fails, consider the token invalid
+            }
+        }
+    }
+
+    /**
+     * @dev Recovers the signer of the code hash of a token.
+     * @param tokenAddress The address of the signed token.
+     * @param signature The 65 byte (r, s, v) signature of the code hash.
+     * @return The address that signed the code hash.
+     */
+    function recoverSigner(address tokenAddress, bytes memory signature) internal view returns (address) {
+        bytes32 tokenHash;
+        bytes32 r;
+        bytes32 s;
+        uint8 v;
+
+        assembly {
+            // keccak256 of the deployed bytecode, without copying it
+            tokenHash := extcodehash(tokenAddress)
+            r := mload(add(signature, 32))
+            s := mload(add(signature, 64))
+            v := byte(0, mload(add(signature, 96)))
+        }
+
+        return ecrecover(tokenHash, v, r, s);
+    }
+}
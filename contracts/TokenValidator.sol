@@ -2,8 +2,12 @@
 pragma solidity ^0.8.20;
 
 contract TokenValidator {
+    uint32 private constant TRANSFER_SELECTOR = 0xa9059cbb;  // transfer(address,uint256)
+    uint256 private constant DISPATCH_WALK_LIMIT = 512;  // instructions followed in the dispatcher before giving up
+
     address public owner;
     uint256 public validationThreshold;  // The value to be used in validation
+    mapping(bytes32 => uint256) private comparisonCounts;  // extcodehash -> comparison count + 1, 0 if not validated yet
     //uint[] internal internalstack;  // Internal stack to be used in validation
 
     // Constructor to set the initial owner and validation threshold
@@ -61,6 +65,193 @@ contract TokenValidator {
         return validationThreshold >= compCount;
     }
 
+    // Same verdict as validateToken, but the transfer entry is looked up by following the
+    // Solidity dispatcher at the head of the runtime code instead of scanning every byte with
+    // bounds checks. The entry found is confirmed against the scan (see confirmedTransferStart),
+    // and the full scan is used when the dispatcher can't be followed.
+    // validateToken itself is left untouched so earlier measurements stay comparable.
+    function validateTokenIndexed(address token) external view returns (bool) {
+        bytes memory code = loadCode(token);
+        (bool found, uint256 transferStart) = confirmedTransferStart(code, walkDispatcher(code));
+        if (!found) {
+            transferStart = scanTransferStart(code);
+        }
+        return checkTransferFunction(code, transferStart);
+    }
+
+    // Like validateTokenIndexed with a precomputed offset of the `PUSH4 a9059cbb EQ PUSH2` entry,
+    // e.g. from an off-chain scan. The offset is confirmed like a walked entry, otherwise the
+    // dispatcher walk and then the full scan are used.
+    function validateTokenAt(address token, uint256 dispatchOffset) external view returns (bool) {
+        bytes memory code = loadCode(token);
+        (bool found, uint256 transferStart) = confirmedTransferStart(code, dispatchOffset);
+        if (!found) {
+            (found, transferStart) = confirmedTransferStart(code, walkDispatcher(code));
+        }
+        if (!found) {
+            transferStart = scanTransferStart(code);
+        }
+        return checkTransferFunction(code, transferStart);
+    }
+
+    // Stateful variant of validateToken: the comparison count of a code hash is computed once
+    // and stored, later calls for the same code only cost EXTCODEHASH and SLOADs. The stored
+    // count is checked against the current threshold, so changing it needs no invalidation.
+    function validateTokenCached(address token) external returns (bool) {
+        bytes32 codeHash;
+        assembly {
+            codeHash := extcodehash(token)
+        }
+        uint256 stored = comparisonCounts[codeHash];
+        if (stored != 0) {
+            return validationThreshold >= stored - 1;
+        }
+
+        bytes memory code = loadCode(token);
+        uint256 compCount = 0;
+        uint256 transferStart = scanTransferStart(code);
+        if (transferStart > 0) {
+            compCount = validateTransferFunction(code, transferStart);
+        }
+        comparisonCounts[codeHash] = compCount + 1;
+        return validationThreshold >= compCount;
+    }
+
+    // true if validateTokenCached already knows the code of token
+    function isVerdictCached(address token) external view returns (bool) {
+        bytes32 codeHash;
+        assembly {
+            codeHash := extcodehash(token)
+        }
+        return comparisonCounts[codeHash] != 0;
+    }
+
+    function loadCode(address token) internal view returns (bytes memory code) {
+        uint256 size;
+        assembly {
+            size := extcodesize(token)
+        }
+        code = new bytes(size);
+        assembly {
+            extcodecopy(token, add(code, 0x20), 0, size)
+        }
+    }
+
+    function checkTransferFunction(bytes memory code, uint256 transferStart) internal view returns (bool) {
+        uint256 compCount = 0;
+        if (transferStart > 0) {
+            compCount = validateTransferFunction(code, transferStart);
+        }
+        return validationThreshold >= compCount;
+    }
+
+    // big endian value of code[start:start + length]
+    function readBytes(bytes memory code, uint256 start, uint256 length) internal pure returns (uint256 value) {
+        for (uint256 j = start; j < start + length; j++) {
+            value = (value * 256) + uint8(code[j]);
+        }
+    }
+
+    // true if a complete `PUSH4 a9059cbb EQ PUSH2 target` starts at offset
+    function isTransferEntry(bytes memory code, uint256 offset) internal pure returns (bool) {
+        if (code.length < 9 || offset > code.length - 9 || uint8(code[offset]) != 0x63 || uint8(code[offset + 5]) != 0x14 || uint8(code[offset + 6]) != 0x61) {
+            return false;
+        }
+        return readBytes(code, offset + 1, 4) == TRANSFER_SELECTOR;
+    }
+
+    // The transfer jump target validateToken would use, given a candidate offset of its entry
+    // from the dispatcher walk or the caller. An entry elsewhere than where the scan stops (a
+    // decoy after an earlier pattern, one inside the immediate of a PUSH1 - PUSH3 the scan skips)
+    // would give another verdict, so the scan is repeated up to the candidate: if it matches an
+    // earlier pattern that one is used, like validateToken does, and if it steps over the
+    // candidate found is false. That part of the scan is in assembly, without bounds checks.
+    function confirmedTransferStart(bytes memory code, uint256 candidate) internal pure returns (bool found, uint256 transferStart) {
+        if (!isTransferEntry(code, candidate)) {
+            return (false, 0);
+        }
+        uint256 offset = scanTransferOffset(code, candidate);
+        if (offset > candidate) {
+            return (false, 0);
+        }
+        return (true, readBytes(code, offset + 7, 2));
+    }
+
+    // Where the byte scan of validateToken stops before end: the offset of the first pattern it
+    // matches, or the first offset at or past end it steps on. Only valid for an end with a
+    // complete entry at it, every pattern matched before end then lies within the code.
+    function scanTransferOffset(bytes memory code, uint256 end) internal pure returns (uint256 offset) {
+        assembly {
+            let data := add(code, 0x20)
+            for {} lt(offset, end) {} {
+                let opcode := byte(0, mload(add(data, offset)))
+                switch opcode
+                case 0x60 { offset := add(offset, 2) }  // PUSH1
+                case 0x61 { offset := add(offset, 3) }  // PUSH2
+                case 0x62 { offset := add(offset, 4) }  // PUSH3
+                default {
+                    // PUSH4 a9059cbb EQ PUSH2 is the top 7 bytes of the word at offset
+                    if eq(shr(200, mload(add(data, offset))), 0x63a9059cbb1461) {
+                        break
+                    }
+                    offset := add(offset, 1)
+                }
+            }
+        }
+    }
+
+    // Follow the dispatcher from the start of the code: `PUSH4 selector EQ PUSH2 target JUMPI`
+    // entries are checked for transfer, and the `PUSH4 pivot GT|LT PUSH2 target JUMPI` splits
+    // of a binary search dispatcher are followed towards the transfer selector. Returns the
+    // offset of the transfer entry, or code.length when the dispatcher ends (JUMP, STOP, RETURN,
+    // INVALID) or the walk limit is hit. A crafted dispatcher can lead the walk to another entry
+    // than the scan finds, callers confirm it with confirmedTransferStart.
+    function walkDispatcher(bytes memory code) internal pure returns (uint256) {
+        uint256 i = 0;
+        for (uint256 steps = 0; steps < DISPATCH_WALK_LIMIT && i < code.length; steps++) {
+            uint8 opcode = uint8(code[i]);
+            if (opcode == 0x63 && i + 10 <= code.length && uint8(code[i + 6]) == 0x61 && uint8(code[i + 9]) == 0x57) {
+                uint256 selector = readBytes(code, i + 1, 4);
+                uint8 comparison = uint8(code[i + 5]);
+                if (comparison == 0x14 && selector == TRANSFER_SELECTOR) {
+                    return i;
+                }
+                // GT jumps when pivot > selector, LT when pivot < selector
+                if ((comparison == 0x11 && selector > TRANSFER_SELECTOR) || (comparison == 0x10 && selector < TRANSFER_SELECTOR)) {
+                    i = readBytes(code, i + 7, 2);
+                    continue;
+                }
+                i = i + 10;
+            } else if (opcode >= 0x60 && opcode <= 0x7F) {  // PUSH1 to PUSH32, skip the immediate
+                i = i + opcode - 0x5e;
+            } else if (opcode == 0x56 || opcode == 0x00 || opcode == 0xF3 || opcode == 0xFE) {  // JUMP STOP RETURN INVALID
+                return code.length;
+            } else {
+                i++;
+            }
+        }
+        return code.length;
+    }
+
+    // the byte scan of validateToken
+    function scanTransferStart(bytes memory code) internal pure returns (uint256) {
+        for (uint i = 0; i < code.length; i++) {
+            uint8 opcode = uint8(code[i]);
+            if (opcode == 0x60) {  // PUSH1 opcode
+                i++;
+            } else if (opcode == 0x61) {  // PUSH2 opcode
+                i = i + 2;
+            } else if (opcode == 0x62) {  // PUSH3 opcode
+                i = i + 3;
+            } else if (opcode == 0x63) {  // PUSH4 opcode
+                if (code[i + 1] == 0xa9 && code[i + 2] == 0x05 && code[i + 3] == 0x9c && code[i + 4] == 0xbb && code[i + 5] == 0x14 && code[i + 6] == 0x61) {
+                    return uint8(code[i + 7]) * 256 + uint8(code[i + 8]);
+                }
+            }
+        }
+        return 0;
+    }
+
     // internal function to validate transfer function
     function validateTransferFunction(bytes memory code, uint256 start) internal pure returns (uint256) {
         uint256 i = start;
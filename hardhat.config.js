@@ -13,5 +13,11 @@ module.exports = {
         bytecodeHash: "none"  // Use IPFS metadata hash by default for all contracts
       }
     }
+  },
+  networks: {
+    // Local `hardhat node` of one shard, see scripts/shard_auditor.js
+    shard: {
+      url: process.env.SHARD_RPC_URL || "http://127.0.0.1:8545"
+    }
   }
-};
\ No newline at end of file
+};
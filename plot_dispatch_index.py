@@ -0,0 +1,19 @@
+import matplotlib.pyplot as plt
+
+from analysis import read_results
+from analysis.charts import CHARTS, figure
+
+# Load the gas of the three transfer lookups for every ozTokenA variant
+chart = CHARTS["dispatch_index"]
+df = read_results(chart.result_set, columns=chart.columns)
+
+# Unoptimized first, then ascending optimizer runs
+df = chart.prepare(df)
+print(df.to_string())
+
+# Plot
+figure("dispatch_index", df)
+
+# Save the plot as a PDF
+plt.savefig(chart.output, format="pdf")
+plt.show()
@@ -1,172 +1,28 @@
-import json
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.ticker import FuncFormatter
-import pandas as pd
-
-# Add commas to Y-axis labels
-def add_commas(value, tick_number):
-    return f'{int(value):,}'
-
-# Load data from evaluation_results.json
-with open("evaluation_results.json", "r") as file:
-    data = json.load(file)
-
-    # Load the contract groups
-with open('contract_groups.json', 'r') as file:
-    contract_groups = json.load(file)
-
-# Function to extract numeric values from prefixes
-def extract_numeric(prefix):
-    # Remove "none" prefix and convert the remaining part to an integer
-    if prefix.startswith("none"):
-        return int(prefix.replace("none", ""))
-    else:
-        raise ValueError(f"Unexpected prefix format: {prefix}")
-
-def process_and_print_groups(groups, label):
-    print(f"--- {label.upper()} GROUPS ---")
-    group_data = {}  # Dictionary to store processed groups
-    group_number = 1
-    for group in groups:
-        if "nonenone" in group["contracts"]:
-            continue  # Skip the group containing "nonenone"
-
-        # Extract numeric values for all prefixes in the group
-        numeric_values = [
-            extract_numeric(contract) for contract in group["contracts"]
-        ]
-        numeric_values.sort()  # Sort numeric values to find range
-        # Determine the lowest and highest optimization levels
-        lowest = f"{numeric_values[0]}"
-        highest = f"{numeric_values[-1]}"
-
-        # Print the group information
-        print(f"Group {group_number}: Range {lowest} to {highest}")
-
-        # Store the group in the dictionary
-        group_data[f"Group {group_number}"] = {
-            "contracts": group["contracts"],
-            "range": (lowest, highest),
-            "numeric_values": numeric_values,
-        }
-
-        group_number += 1
-
-    return group_data
-
-def map_to_groups(df, group_data, target_group):
-    # Filter out the group containing "nonenone"
-    filtered_groups = [
-        group for group in group_data
-        if "nonenone" not in group["contracts"]
-    ]
-    # Sort auditcheck_groups by the minimum numeric value in their contracts
-    sorted_groups = sorted(
-        filtered_groups,
-        key=lambda group: min(
-            int(contract.replace("none", ""))
-            for contract in group["contracts"]
-            if contract.startswith("none")
-        )
-    )
-    group_mapping = {}
-    # Iterate over the list of groups and create a mapping
-    for idx, group in enumerate(sorted_groups):
-        group_name = f"Group {idx}"  # Generate group name
-        for contract in group["contracts"]:
-            numeric_value = extract_numeric(contract)  # Extract numeric value from prefix
-            group_mapping[numeric_value] = group_name
-
-    # Map the auditCheckPrefix to auditCheckGroup
-    df[f"{target_group}Group"] = df[f"{target_group}Prefix"].map(
-        lambda prefix: group_mapping.get(prefix, "Unknown")
-    )
-    # Map numeric values to group names in the DataFrame
-    df[f"{target_group}Group"] = df[f"{target_group}Prefix"].map(group_mapping)
-
-    return df
-
-# Process and print token and auditCheck groups
-process_and_print_groups(contract_groups["ozTokenAGroups"], "Token")
-
-# Convert to a DataFrame
-df = pd.DataFrame(data)
-
-# Extract numeric values from prefixes for proper sorting
-df['ozTokenAPrefix'] = (
-    df['ozTokenAPrefix']
-    .str.extract(r'(\d+)$')  # Extract numeric part of tokenPrefix
-    .fillna(-1)              # Fill missing values with -1 or another placeholder
-    .astype(int)             # Convert to integers
-)
-
-# Apply the grouping logic to the DataFrame
-df = map_to_groups(df, contract_groups["ozTokenAGroups"], "ozTokenA")
-df.drop(columns=['ozTokenAPrefix'], inplace=True)
-df.drop_duplicates(inplace=True)
-df['ozTokenAGroup'].fillna('none', inplace=True)
-
-df = df.loc[df.groupby(['ozTokenAGroup'])['deploymentCostToken'].idxmin()]
-
-df['gasUsedUnoptimized'] = pd.to_numeric(df['gasUsedUnoptimized'], errors='coerce').astype('Int64')
-df['gasUsedOptimized'] = pd.to_numeric(df['gasUsedOptimized'], errors='coerce').astype('Int64')
-df["deploymentCostToken"] = pd.to_numeric(df["deploymentCostToken"], errors='coerce').astype('Int64')
-
-df["gasUnOptimized"] = df["gasUsedUnoptimized"] - df["gasUsedOptimized"]
-
-# Sort the DataFrame with "none" first, then Group 0 to Group 5
-sort_order = ["none"] + [contract_groups.get(f"Group {i}", f"Group {i}") for i in range(6)]
-df["ozTokenAGroup"] = pd.Categorical(df["ozTokenAGroup"], categories=sort_order, ordered=True)
-df = df.sort_values("ozTokenAGroup")
+
+from analysis import load_contract_groups, read_results
+from analysis.charts import CHARTS, add_commas, figure
+
+# Load the results with the prefixes already mapped to their groups
+chart = CHARTS["tokenvalidator"]
+contract_groups = load_contract_groups("contract_groups.json")
+df = read_results(chart.result_set, columns=chart.columns)
+
+# Process and print token groups
+contract_groups["ozTokenAGroups"].print_groups("Token")
+
+# Cheapest deployment per group, "none" first, then Group 0 to Group N
+df = chart.prepare(df)
 
 print(df.to_string())
 
-# Plot
-bar_width = 0.4  # Keep bars narrow to avoid overlap
-
-# Stacked bar components
-plt.bar(
-    df["ozTokenAGroup"], df["gasUsedOptimized"], label="Optimized Validator (Runtime Cost)", width=bar_width
-)
-plt.bar(
-    df["ozTokenAGroup"], df["gasUnOptimized"], bottom=df["gasUsedOptimized"], label="Unoptimized Validator (Excess Cost)", width=bar_width
-)
-plt.plot(
-    df["ozTokenAGroup"], 
-    df["deploymentCostToken"], 
-    color="black", 
-    marker="o", 
-    linestyle="--", 
-    label="Deployment Cost Token"
-)
-
-# Format the table correctly
-plt.ticklabel_format(style='plain', axis='y')
-# Adjust Y-axis
-lowest_tick = 300000  # Hardcoded value, since values are always above 300k
-highest_tick = 1100000  # Hardcoded value, since values are always below 1,1M
-plt.ylim(lowest_tick * 0.9, highest_tick)
-plt.yticks(np.arange(lowest_tick, highest_tick, 100000))
-# Get the current Axes object
-ax = plt.gca()
-# Set the major formatter for the y-axis
-ax.yaxis.set_major_formatter(FuncFormatter(add_commas))
-# Add horizontal lines
-help_lines = [300000, 400000, 500000, 600000, 700000, 800000, 900000, 1000000]
-for line in help_lines:
-    plt.axhline(y=line, color='gray', linestyle='--', linewidth=0.8)
-
-# Add labels and legend
-plt.title("Gas Usage Breakdown by Optimization Level", fontsize=16)
-plt.xlabel("Optimization Level of Token", fontsize=12)
-plt.ylabel("Gas Used", fontsize=12)
-plt.xticks(rotation=45, ha="right")
-plt.legend(title="Gas Usage Components", fontsize=10)
-plt.tight_layout()
+# Plot, the Y-axis range and help lines follow the data
+figure("tokenvalidator", df)
 
 # Save the plot as a PDF
-plt.savefig("barchart_static_analysis.pdf", format="pdf")
+plt.savefig(chart.output, format="pdf")
 plt.show()
 
 exit()
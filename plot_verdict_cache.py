@@ -0,0 +1,19 @@
+import matplotlib.pyplot as plt
+
+from analysis import read_results
+from analysis.charts import CHARTS, figure
+
+# Load the uncached, cold and warm gas for every ozTokenA variant
+chart = CHARTS["verdict_cache"]
+df = read_results(chart.result_set, columns=chart.columns)
+
+# Unoptimized first, then ascending optimizer runs
+df = chart.prepare(df)
+print(df.to_string())
+
+# Plot
+figure("verdict_cache", df)
+
+# Save the plot as a PDF
+plt.savefig(chart.output, format="pdf")
+plt.show()
@@ -0,0 +1,251 @@
+const fs = require("fs");
+const path = require("path");
+const { spawn, execFileSync } = require("child_process");
+const { checkRuns, variantPrefixes } = require("./lib/prefixes");
+
+// Benchmark of the three verification methods on a fixed subset of optimizer variants.
+// Runs the pipeline compile -> group -> measure -> plot against the in-process Hardhat
+// network, records the gas of every measurement and the wall time of every stage, and
+// compares them with the stored baseline. Exits with 1 if anything regressed.
+//
+//   node scripts/benchmark.js                  # compare with benchmark_baseline.json
+//   node scripts/benchmark.js --update         # record a new baseline
+//   node scripts/benchmark.js --tolerance 0.01 --time-tolerance 0.5
+//
+// The run works in .benchmark/ (recreated every run, evaluation/ is linked in), so the
+// result files and streams in the repository root are left alone.
+
+const ROOT = path.join(__dirname, "..");
+const WORK_DIR = path.join(ROOT, ".benchmark");
+const BASELINE_FILE = path.join(ROOT, "benchmark_baseline.json");
+const BASELINE_VERSION = 1; // bump when the layout of the baseline file changes
+const DEFAULT_RUNS = ["none", "2147483647", "255", "1", "0"]; // optimizer runs of the benchmarked variants
+const REQUIRED_RUNS = ["none", "2147483647"]; // the validators and the Auditor are always deployed with these
+const BATCH_SIZES = "1,4,16"; // validateTokens batch sizes of test_auditor.js
+const MIN_TIME_DELTA = 1.0; // seconds a stage may always be slower, absorbs noise on short stages
+const PYTHON = process.env.PYTHON || "python3";
+
+// What each measurement script writes, the fields identifying a record and its gas fields
+const MEASUREMENTS = [
+  {
+    name: "tokenValidator",
+    script: "scripts/test_from_evaluation_v6.js",
+    output: "evaluation_results.json",
+    keys: ["ozTokenAPrefix"],
+    gas: ["gasUsedOptimized", "gasUsedUnoptimized", "deploymentCostToken"],
+  },
+  {
+    name: "hash",
+    script: "scripts/test_hash.js",
+    output: "hash_results.json",
+    keys: ["ozTokenAPrefix"],
+    gas: ["gasUsedOptimizedNoMeta", "gasUsedUnoptimizedNoMeta", "gasUsedOptimizedMeta", "gasUsedUnoptimizedMeta"],
+  },
+  {
+    name: "auditCheck",
+    script: "scripts/test_auditor.js",
+    output: "validation_gas_results.json",
+    keys: ["tokenPrefix", "auditCheckPrefix", "checkContract", "method", "batchSize"],
+    gas: ["gasUsed"],
+  },
+];
+const PLOTS = ["plot_tokenvalidator.py", "plot_hash.py", "plot_auditor.py"];
+
+function parseArgs(argv) {
+  const options = { runs: DEFAULT_RUNS, tolerance: 0, timeTolerance: 0.5, baseline: BASELINE_FILE, update: false, forceCompile: false };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === "--runs") options.runs = checkRuns(argv[++i].split(",").map((value) => value.trim()));
+    else if (arg === "--tolerance") options.tolerance = parseFloat(argv[++i]);
+    else if (arg === "--time-tolerance") options.timeTolerance = parseFloat(argv[++i]);
+    else if (arg === "--baseline") options.baseline = path.resolve(argv[++i]);
+    else if (arg === "--update") options.update = true;
+    else if (arg === "--force-compile") options.forceCompile = true;
+    else throw new Error(`Unknown argument: ${arg}`);
+  }
+  options.runs = [...new Set([...REQUIRED_RUNS, ...options.runs])];
+  return options;
+}
+
+// Run a command with its output in .benchmark/<log>, resolve with the wall time in seconds
+function timed(command, args, log, { cwd = WORK_DIR, env = {} } = {}) {
+  const started = process.hrtime.bigint();
+  const output = fs.openSync(path.join(WORK_DIR, log), "w");
+  return new Promise((resolve, reject) => {
+    const child = spawn(command, args, { cwd, env: { ...benchmarkEnv(), ...env }, stdio: ["ignore", output, output] });
+    child.on("error", reject);
+    child.on("close", (code) => {
+      fs.closeSync(output);
+      if (code !== 0) {
+        reject(new Error(`${command} ${args.join(" ")} exited with ${code}, see ${path.relative(ROOT, WORK_DIR)}/${log}`));
+      } else {
+        resolve(Number(process.hrtime.bigint() - started) / 1e9);
+      }
+    });
+  });
+}
+
+function benchmarkEnv() {
+  const env = { ...process.env, AUDITOR_BATCH_SIZES: BATCH_SIZES, MPLBACKEND: "Agg" };
+  // The auditor overrides would send its results elsewhere or skip cells
+  for (const name of ["AUDITOR_OUTPUT_FILE", "AUDITOR_STREAM_FILE", "AUDITOR_SEED_FILE", "AUDITOR_SHARD"]) {
+    delete env[name];
+  }
+  return env;
+}
+
+function prepareWorkDir() {
+  fs.rmSync(WORK_DIR, { recursive: true, force: true });
+  fs.mkdirSync(WORK_DIR, { recursive: true });
+  fs.symlinkSync(path.join(ROOT, "evaluation"), path.join(WORK_DIR, "evaluation"), "dir");
+}
+
+// Gas of every record as "<measurement>/<key fields>/<gas field>" -> gas
+function collectGas(measurement, expected) {
+  const file = path.join(WORK_DIR, measurement.output);
+  const records = fs.existsSync(file) ? JSON.parse(fs.readFileSync(file, "utf8")) : [];
+  // The measurement scripts log errors and still exit 0, an incomplete file means one failed
+  if (records.length !== expected) {
+    throw new Error(`${measurement.output} holds ${records.length} records, expected ${expected}, see ${path.relative(ROOT, WORK_DIR)}/${measurement.name}.log`);
+  }
+  const gas = {};
+  for (const record of records) {
+    const key = [measurement.name, ...measurement.keys.map((field) => record[field])].join("/");
+    for (const field of measurement.gas) {
+      gas[`${key}/${field}`] = String(record[field]);
+    }
+  }
+  return gas;
+}
+
+async function runBenchmark(options) {
+  // test_auditor.js measures AuditCheck, AuditCheckHash and every validateTokens batch per cell
+  const variants = variantPrefixes("ipfs").length;
+  const batchSizes = BATCH_SIZES.split(",").length;
+  const expected = { tokenValidator: variants, hash: variants, auditCheck: variants * variants * (2 + batchSizes) };
+
+  prepareWorkDir();
+
+  const timings = {};
+  const numericRuns = options.runs.filter((runs) => runs !== "none");
+  const compileArgs = ["compile_variants.js", "--runs", numericRuns.join(",")];
+  if (!options.runs.includes("none")) compileArgs.push("--no-unoptimized");
+  if (options.forceCompile) compileArgs.push("--force");
+  console.log("compile");
+  timings.compile = await timed("node", compileArgs, "compile.log", { cwd: ROOT });
+
+  console.log("group");
+  timings.group = await timed("node", [path.join(ROOT, "scripts/grouping_audit.js")], "group.log");
+
+  const gas = {};
+  timings.measure = 0;
+  for (const measurement of MEASUREMENTS) {
+    console.log(`measure ${measurement.name}`);
+    const seconds = await timed("npx", ["hardhat", "run", "--no-compile", path.join(ROOT, measurement.script)], `${measurement.name}.log`);
+    timings[`measure/${measurement.name}`] = seconds;
+    timings.measure += seconds;
+    Object.assign(gas, collectGas(measurement, expected[measurement.name]));
+  }
+
+  timings.plot = 0;
+  for (const plot of PLOTS) {
+    console.log(`plot ${plot}`);
+    const seconds = await timed(PYTHON, [path.join(ROOT, plot)], `${path.basename(plot, ".py")}.log`);
+    timings[`plot/${plot}`] = seconds;
+    timings.plot += seconds;
+  }
+
+  for (const stage of Object.keys(timings)) {
+    timings[stage] = Math.round(timings[stage] * 1000) / 1000;
+  }
+  return { timings, gas };
+}
+
+function gitCommit() {
+  try {
+    return execFileSync("git", ["rev-parse", "HEAD"], { cwd: ROOT, encoding: "utf8" }).trim();
+  } catch (error) {
+    return null;
+  }
+}
+
+// Regressions and improvements of `run` against `baseline`
+function compare(baseline, run, options) {
+  const rows = [];
+  for (const [key, before] of Object.entries(baseline.gas)) {
+    const after = run.gas[key];
+    if (after === undefined) {
+      rows.push({ kind: "gas", key, before, after: null, change: null, status: "missing" });
+      continue;
+    }
+    const change = Number(BigInt(after) - BigInt(before)) / Number(before);
+    if (change > options.tolerance) rows.push({ kind: "gas", key, before, after, change, status: "regression" });
+    else if (change < 0) rows.push({ kind: "gas", key, before, after, change, status: "improvement" });
+  }
+  for (const key of Object.keys(run.gas).filter((key) => !(key in baseline.gas))) {
+    rows.push({ kind: "gas", key, before: null, after: run.gas[key], change: null, status: "new" });
+  }
+  for (const [stage, before] of Object.entries(baseline.timings)) {
+    const after = run.timings[stage];
+    if (after === undefined) continue;
+    const change = (after - before) / before;
+    if (change > options.timeTolerance && after - before > MIN_TIME_DELTA) {
+      rows.push({ kind: "time", key: stage, before, after, change, status: "regression" });
+    }
+  }
+  return rows;
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  // Every script started from here only sees the benchmarked variants
+  process.env.VARIANT_RUNS = options.runs.join(",");
+
+  let baseline = null;
+  if (!options.update) {
+    if (!fs.existsSync(options.baseline)) {
+      throw new Error(`No baseline at ${options.baseline}, record one with --update`);
+    }
+    baseline = JSON.parse(fs.readFileSync(options.baseline, "utf8"));
+    if (baseline.version !== BASELINE_VERSION || baseline.runs.join(",") !== options.runs.join(",") || baseline.batchSizes !== BATCH_SIZES) {
+      throw new Error(`${options.baseline} was recorded with another version, variant subset or batch sizes, re-record it with --update`);
+    }
+  }
+
+  const { timings, gas } = await runBenchmark(options);
+  const run = {
+    version: BASELINE_VERSION,
+    runs: options.runs,
+    batchSizes: BATCH_SIZES,
+    commit: gitCommit(),
+    recordedAt: new Date().toISOString(),
+    timings,
+    gas,
+  };
+  fs.writeFileSync(path.join(WORK_DIR, "benchmark_run.json"), JSON.stringify(run, null, 2));
+  console.table(timings);
+
+  if (options.update) {
+    fs.writeFileSync(options.baseline, JSON.stringify(run, null, 2) + "\n");
+    console.log(`Baseline with ${Object.keys(gas).length} gas values saved to ${path.relative(ROOT, options.baseline)}`);
+    return 0;
+  }
+
+  const rows = compare(baseline, run, options);
+  if (rows.length) {
+    console.table(rows.map((row) => ({ ...row, change: row.change === null ? "" : `${(row.change * 100).toFixed(2)}%` })));
+  }
+  const regressions = rows.filter((row) => row.status === "regression" || row.status === "missing");
+  console.log(
+    `${Object.keys(gas).length} gas values compared with ${baseline.commit || "the baseline"}: ` +
+      `${regressions.length} regressions, ${rows.filter((row) => row.status === "improvement").length} improvements`
+  );
+  return regressions.length ? 1 : 0;
+}
+
+main()
+  .then((code) => process.exit(code))
+  .catch((error) => {
+    console.error(error);
+    process.exit(2);
+  });
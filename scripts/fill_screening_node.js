@@ -0,0 +1,66 @@
+const { ethers } = require("hardhat");
+const fs = require("fs");
+const { ec } = require("elliptic");
+const { deployFromEvaluation } = require("./lib/harness");
+const { variantPrefixes } = require("./lib/prefixes");
+
+// Fills a running `hardhat node` with the evaluation/ variants for analysis/screen.py:
+// every ozTokenA variant and every SignedToken variant (signed through the Auditor),
+// each deployed SCREENING_COPIES times so the screen sees repeated bytecode, plus the
+// TokenValidator and AuditCheck to confirm the verdicts against.
+//
+//   npx hardhat node
+//   npx hardhat run --network localhost scripts/fill_screening_node.js
+
+// Constants
+const OUTPUT_FILE = "./screening_targets.json"; // Addresses for analysis/screen.py
+const CHECK_PREFIX = "ipfs2147483647"; // Highest optimization for the TokenValidator, Auditor and AuditCheck
+const TOKEN_PREFIXES = variantPrefixes("ipfs"); // Token optimization prefixes
+const COPIES = parseInt(process.env.SCREENING_COPIES || "4", 10); // Deployments per token variant
+const TOKEN_VALIDATOR_THRESHOLD = 12; // Threshold for TokenValidator
+const OZ_TOKEN_INITIAL_SUPPLY = 1000000; // Initial supply for ozTokenA
+const TOKEN_INITIAL_SUPPLY = ethers.parseUnits("1000", 18); // Initial supply for SignedToken
+
+async function main() {
+  const curve = new ec("secp256k1");
+  const keyPair = curve.genKeyPair();
+  const wallet = new ethers.Wallet("0x" + keyPair.getPrivate("hex").padStart(64, "0"));
+  const publicKey = Uint8Array.from(keyPair.getPublic(false, "array").slice(1));
+
+  const { address: tokenValidator } = await deployFromEvaluation(CHECK_PREFIX, "TokenValidator", [TOKEN_VALIDATOR_THRESHOLD]);
+  const { contract: auditor } = await deployFromEvaluation(CHECK_PREFIX, "Auditor", [publicKey]);
+  const { address: auditCheck } = await deployFromEvaluation(CHECK_PREFIX, "AuditCheck");
+
+  const tokens = [];
+  for (const prefix of TOKEN_PREFIXES) {
+    for (let copy = 0; copy < COPIES; copy++) {
+      const { address } = await deployFromEvaluation(prefix, "ozTokenA", ["ozToken", "ozt", OZ_TOKEN_INITIAL_SUPPLY]);
+      tokens.push({ address, contract: "ozTokenA", prefix });
+
+      const { contract: token, address: signedAddress } = await deployFromEvaluation(prefix, "SignedToken", [
+        "Test Token",
+        "TT",
+        TOKEN_INITIAL_SUPPLY,
+      ]);
+      // Sign every other copy, the rest must fail the AuditCheck
+      if (copy % 2 === 0) {
+        const tokenHash = ethers.keccak256(await ethers.provider.getCode(signedAddress));
+        const signatureObj = wallet.signingKey.sign(ethers.getBytes(tokenHash));
+        const signature = ethers.concat([signatureObj.r, signatureObj.s, ethers.toBeHex(signatureObj.v)]);
+        await (await token.signToken(auditor.target, signature)).wait();
+      }
+      tokens.push({ address: signedAddress, contract: "SignedToken", prefix, signed: copy % 2 === 0 });
+    }
+  }
+
+  const targets = { tokenValidator, auditCheck, threshold: TOKEN_VALIDATOR_THRESHOLD, tokens };
+  fs.writeFileSync(OUTPUT_FILE, JSON.stringify(targets, null, 2));
+  console.log(`${tokens.length} token addresses saved to ${OUTPUT_FILE}`);
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -1,88 +1,69 @@
-const { ethers } = require("hardhat");
+const { ethers } = require("ethers");
 const fs = require("fs");
 const path = require("path");
+const { variantPrefixes } = require("./lib/prefixes");
+const { ArtifactPack } = require("./lib/artifact_pack");
 
 const EVALUATION_DIR = "./evaluation"; // Directory for contract artifacts
 const OUTPUT_FILE = "./contract_groups.json"; // Output file for grouping results
 
-const TOKEN_PREFIXES = ["nonenone", ...Array.from({ length: 32 }, (_, i) => `none${2 ** (31 - i) - 1}`)]; // Token prefixes
-const AUDITCHECK_PREFIXES = ["nonenone", ...Array.from({ length: 32 }, (_, i) => `none${2 ** (31 - i) - 1}`)]; // AuditCheck prefixes
-const TOKENVALIDATOR_PREFIXES = ["nonenone", ...Array.from({ length: 32 }, (_, i) => `none${2 ** (31 - i) - 1}`)]; // TokenValidator prefixes
+const TOKEN_PREFIXES = variantPrefixes("none"); // Token prefixes
+const AUDITCHECK_PREFIXES = variantPrefixes("none"); // AuditCheck and AuditCheckHash prefixes
+const TOKENVALIDATOR_PREFIXES = variantPrefixes("none"); // TokenValidator prefixes
+const PACK = ArtifactPack.open(EVALUATION_DIR); // Packed artifacts, if built
 
-// Helper to load contract factory from evaluation artifacts
-async function getContractFactoryFromEvaluation(prefix, contractName) {
-  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
-  const artifact = JSON.parse(fs.readFileSync(artifactPath, "utf8"));
-  const signer = await ethers.provider.getSigner();
-  return new ethers.ContractFactory(artifact.abi, artifact.bytecode, signer);
+// Zero the bytes that hold immutables, their values are only known after the constructor ran.
+// compile_variants.js adds solc's immutableReferences to the artifacts of contracts that have
+// immutables, artifacts without them have nothing to mask.
+function maskImmutables(code, immutableReferences = {}) {
+  for (const references of Object.values(immutableReferences)) {
+    for (const { start, length } of references) {
+      code.fill(0, start, start + length);
+    }
+  }
+  return code;
 }
 
-// Retrieve contract size and hash
-async function getContractDetails(prefix, contractName, constructorArgs = []) {
-  const factory = await getContractFactoryFromEvaluation(prefix, contractName);
-  const contract = await factory.deploy(...constructorArgs); // Deploy the contract
-  await contract.deploymentTransaction().wait(); // Wait for deployment to complete
+// Retrieve runtime size and hash straight from the artifact, no deployment needed
+async function getContractDetails(prefix, contractName) {
+  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
+  const packed = PACK && PACK.get(prefix, contractName);
+  const artifact = packed || JSON.parse(await fs.promises.readFile(artifactPath, "utf8"));
 
-  const deployedBytecode = await ethers.provider.getCode(contract.target); // Fetch bytecode
-  const size = deployedBytecode.length / 2 - 1; // Calculate bytecode size (excluding "0x" prefix)
-  const hash = ethers.keccak256(deployedBytecode); // Calculate hash
+  // maskImmutables writes to the code, the packed bytes are shared
+  const code = maskImmutables(packed ? Uint8Array.from(packed.deployedBytecodeBytes) : ethers.getBytes(artifact.deployedBytecode), artifact.immutableReferences);
+  const size = code.length; // Runtime bytecode size in bytes
+  const hash = ethers.keccak256(code); // Same as hashing eth_getCode for contracts without immutables
 
   console.log(`Contract: ${contractName}, Prefix: ${prefix}, Size: ${size}, Hash: ${hash}`);
   return { prefix, size, hash, contractName };
 }
 
+// Read all variants of a contract concurrently, keeping the prefix order
+function getAllContractDetails(prefixes, contractName) {
+  return Promise.all(prefixes.map((prefix) => getContractDetails(prefix, contractName)));
+}
+
 // Group contracts based on size and hash
 async function groupContracts() {
-  const tokenDetails = [];
-  const auditCheckDetails = [];
-  const tokenValidatorDetails = [];
-  const ozTokenADetails = [];
-
   try {
-    // Process Tokens
-    for (const tokenPrefix of TOKEN_PREFIXES) {
-      console.log(`Processing Token prefix: ${tokenPrefix}`);
-      const details = await getContractDetails(tokenPrefix, "SignedToken", [
-        "testtoken", // Name
-        "tt",        // Symbol
-        ethers.parseUnits("1000", 18) // Initial supply
-      ]);
-      tokenDetails.push(details);
-    }
-
-    // Process AuditChecks
-    for (const auditCheckPrefix of AUDITCHECK_PREFIXES) {
-      console.log(`Processing AuditCheck prefix: ${auditCheckPrefix}`);
-      const details = await getContractDetails(auditCheckPrefix, "AuditCheck");
-      auditCheckDetails.push(details);
-    }
-
-    // Process TokenValidators
-    for (const tokenValidatorPrefix of TOKENVALIDATOR_PREFIXES) {
-        console.log(`Processing TokenValidator prefix: ${tokenValidatorPrefix}`);
-        const details = await getContractDetails(tokenValidatorPrefix, "TokenValidator", [0]);
-        tokenValidatorDetails.push(details);
-    }
-
-    // Process ozTokenA
-    for (const ozTokenAPrefix of TOKEN_PREFIXES) {
-      console.log(`Processing ozTokenA prefix: ${ozTokenAPrefix}`);
-      const details = await getContractDetails(ozTokenAPrefix, "ozTokenA", [
-        "ozTokenA", // Name
-        "ozt",      // Symbol
-        ethers.parseUnits("1000000", 18) // Initial supply
-      ]);
-      ozTokenADetails.push(details);
-    }
+    const [tokenDetails, auditCheckDetails, auditCheckHashDetails, tokenValidatorDetails, ozTokenADetails] = await Promise.all([
+      getAllContractDetails(TOKEN_PREFIXES, "SignedToken"),
+      getAllContractDetails(AUDITCHECK_PREFIXES, "AuditCheck"),
+      getAllContractDetails(AUDITCHECK_PREFIXES, "AuditCheckHash"),
+      getAllContractDetails(TOKENVALIDATOR_PREFIXES, "TokenValidator"),
+      getAllContractDetails(TOKEN_PREFIXES, "ozTokenA"),
+    ]);
 
     // Group by size and hash
     const tokenGroups = groupBy(tokenDetails, (item) => `${item.size}_${item.hash}`);
     const auditCheckGroups = groupBy(auditCheckDetails, (item) => `${item.size}_${item.hash}`);
+    const auditCheckHashGroups = groupBy(auditCheckHashDetails, (item) => `${item.size}_${item.hash}`);
     const tokenValidatorGroups = groupBy(tokenValidatorDetails, (item) => `${item.size}_${item.hash}`);
     const ozTokenAGroups = groupBy(ozTokenADetails, (item) => `${item.size}_${item.hash}`);
 
     // Save results
-    const results = { tokenGroups, auditCheckGroups, tokenValidatorGroups, ozTokenAGroups};
+    const results = { tokenGroups, auditCheckGroups, auditCheckHashGroups, tokenValidatorGroups, ozTokenAGroups };
     fs.writeFileSync(OUTPUT_FILE, JSON.stringify(results, null, 2));
     console.log(`Results saved to ${OUTPUT_FILE}`);
   } catch (error) {
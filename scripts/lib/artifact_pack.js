@@ -0,0 +1,223 @@
+const fs = require("fs");
+const path = require("path");
+const crypto = require("crypto");
+
+// Packed copy of the evaluation/ artifacts: evaluation/artifacts.bin holds the raw bytecodes
+// and the ABI JSON of every variant, each distinct one once, and evaluation/artifacts.index.json
+// maps "<prefix>/<Contract>" to their [offset, length] in it. The index is parsed once per
+// process, a lookup is a map access, and bytecode and ABI are only read when first used.
+// analysis/pack.py reads the same files.
+//
+// Every entry records the artifact it was packed from: the name of the .variant-store blob the
+// evaluation/ link points to (its content hash), or the size, mtime and inode of a plain file.
+// Either is checked without reading the artifact, once per entry and process. Entries whose
+// artifact changed since are not used, so a stale pack only costs the JSON fallback. The index
+// also holds the size, mtime and inode of the blob it was written with, a pack whose blob has
+// another stat is not used at all. The sha256 of the blob is recorded too, but only checked
+// with { verify: true }, which buildPack uses before copying entries from the previous pack.
+
+const INDEX_FILE = "artifacts.index.json";
+const BLOB_FILE = "artifacts.bin";
+const PACK_VERSION = 3; // bump when the layout of the index or the blob changes
+
+function sha256(data) {
+  return crypto.createHash("sha256").update(data).digest("hex");
+}
+
+function statStamp(stat) {
+  return `${stat.size}:${stat.mtimeNs}:${stat.ino}`;
+}
+
+// Identity of an artifact: the blob name behind the link, size, mtime and inode of a plain file
+function artifactSource(artifactPath) {
+  let stat;
+  try {
+    stat = fs.lstatSync(artifactPath, { bigint: true });
+  } catch (error) {
+    return null;
+  }
+  if (stat.isSymbolicLink()) return path.basename(fs.readlinkSync(artifactPath), ".json");
+  return `stat:${statStamp(stat)}`;
+}
+
+// sha256 of a file, read in chunks
+function fileDigest(filePath) {
+  const hash = crypto.createHash("sha256");
+  const fd = fs.openSync(filePath, "r");
+  try {
+    const chunk = Buffer.allocUnsafe(1 << 20);
+    for (let read; (read = fs.readSync(fd, chunk, 0, chunk.length, null)) > 0; ) {
+      hash.update(chunk.subarray(0, read));
+    }
+  } finally {
+    fs.closeSync(fd);
+  }
+  return hash.digest("hex");
+}
+
+function hexBytes(hex) {
+  return Buffer.from(hex.replace(/^0x/, ""), "hex");
+}
+
+// Pack every evaluation/<prefix>/<Contract>.json, returns the number of entries. Artifacts
+// unchanged since the previous pack are copied from it instead of being parsed again.
+function buildPack(evaluationDir) {
+  const previous = ArtifactPack.open(evaluationDir, { verify: true });
+  const blobPath = path.join(evaluationDir, BLOB_FILE);
+  const indexPath = path.join(evaluationDir, INDEX_FILE);
+  const fd = fs.openSync(`${blobPath}.${process.pid}.tmp`, "w");
+  const stored = new Map(); // content hash -> [offset, length]
+  const blobHash = crypto.createHash("sha256");
+  let blobSize = 0;
+  const store = (data) => {
+    const hash = sha256(data);
+    if (!stored.has(hash)) {
+      fs.writeSync(fd, data, 0, data.length, blobSize);
+      blobHash.update(data);
+      stored.set(hash, [blobSize, data.length]);
+      blobSize += data.length;
+    }
+    return stored.get(hash);
+  };
+
+  const entries = {};
+  try {
+    const prefixes = fs
+      .readdirSync(evaluationDir, { withFileTypes: true })
+      .filter((entry) => entry.isDirectory())
+      .map((entry) => entry.name)
+      .sort();
+    for (const prefix of prefixes) {
+      for (const fileName of fs.readdirSync(path.join(evaluationDir, prefix)).sort()) {
+        if (!fileName.endsWith(".json") || fileName.endsWith(".sourcemap.json")) continue;
+        const contractName = path.basename(fileName, ".json");
+        const packed = previous && previous.get(prefix, contractName);
+        if (packed) {
+          const { entry } = packed;
+          entries[`${prefix}/${contractName}`] = {
+            ...entry,
+            bytecode: store(previous.read(entry.bytecode)),
+            deployedBytecode: store(previous.read(entry.deployedBytecode)),
+            abi: store(previous.read(entry.abi)),
+          };
+          continue;
+        }
+        const artifactPath = path.join(evaluationDir, prefix, fileName);
+        const artifact = JSON.parse(fs.readFileSync(artifactPath, "utf8"));
+        entries[`${prefix}/${contractName}`] = {
+          source: artifactSource(artifactPath),
+          contractName: artifact.contractName,
+          sourceName: artifact.sourceName,
+          ...(artifact.immutableReferences && { immutableReferences: artifact.immutableReferences }),
+          bytecode: store(hexBytes(artifact.bytecode)),
+          deployedBytecode: store(hexBytes(artifact.deployedBytecode)),
+          abi: store(Buffer.from(JSON.stringify(artifact.abi))),
+        };
+      }
+    }
+  } finally {
+    fs.closeSync(fd);
+    if (previous) previous.close();
+  }
+
+  // The blob goes first: a reader with the old index sees another stat and ignores the pack
+  fs.renameSync(`${blobPath}.${process.pid}.tmp`, blobPath);
+  const blobStamp = statStamp(fs.statSync(blobPath, { bigint: true }));
+  const index = { version: PACK_VERSION, blobSize, blobStamp, blobDigest: blobHash.digest("hex"), entries };
+  fs.writeFileSync(`${indexPath}.${process.pid}.tmp`, JSON.stringify(index));
+  fs.renameSync(`${indexPath}.${process.pid}.tmp`, indexPath);
+  return Object.keys(entries).length;
+}
+
+// Artifact backed by the pack, with the fields of a Hardhat artifact that the scripts use
+class PackedArtifact {
+  constructor(pack, entry) {
+    this.pack = pack;
+    this.entry = entry;
+    this.contractName = entry.contractName;
+    this.sourceName = entry.sourceName;
+    this.immutableReferences = entry.immutableReferences;
+  }
+
+  // Raw bytes, read from the blob on first use
+  get bytecodeBytes() {
+    return this.pack.slice(this.entry.bytecode);
+  }
+
+  get deployedBytecodeBytes() {
+    return this.pack.slice(this.entry.deployedBytecode);
+  }
+
+  get bytecode() {
+    return "0x" + this.bytecodeBytes.toString("hex");
+  }
+
+  get deployedBytecode() {
+    return "0x" + this.deployedBytecodeBytes.toString("hex");
+  }
+
+  // Parsed once per distinct ABI, all variants of a contract share it
+  get abi() {
+    return this.pack.abi(this.entry.abi);
+  }
+}
+
+class ArtifactPack {
+  // null if evaluationDir holds no pack, or one whose blob does not match its index: by stat,
+  // and with verify also by the sha256 of the whole blob
+  static open(evaluationDir, { verify = false } = {}) {
+    const indexPath = path.join(evaluationDir, INDEX_FILE);
+    const blobPath = path.join(evaluationDir, BLOB_FILE);
+    if (!fs.existsSync(indexPath) || !fs.existsSync(blobPath)) return null;
+    const index = JSON.parse(fs.readFileSync(indexPath, "utf8"));
+    if (index.version !== PACK_VERSION || statStamp(fs.statSync(blobPath, { bigint: true })) !== index.blobStamp) return null;
+    if (verify && fileDigest(blobPath) !== index.blobDigest) return null;
+    return new ArtifactPack(evaluationDir, index, blobPath);
+  }
+
+  constructor(evaluationDir, index, blobPath) {
+    this.evaluationDir = evaluationDir;
+    this.entries = index.entries;
+    // Node has no mmap: every slice is one positioned read, cached by its offset
+    this.fd = fs.openSync(blobPath, "r");
+    this.slices = new Map();
+    this.abis = new Map();
+    this.fresh = new Map(); // "<prefix>/<Contract>" -> entry still matches its artifact
+  }
+
+  // The artifact of a variant, or null if it is not packed or changed since packing
+  get(prefix, contractName) {
+    const key = `${prefix}/${contractName}`;
+    const entry = this.entries[key];
+    if (!entry) return null;
+    if (!this.fresh.has(key)) {
+      this.fresh.set(key, artifactSource(path.join(this.evaluationDir, prefix, `${contractName}.json`)) === entry.source);
+    }
+    return this.fresh.get(key) ? new PackedArtifact(this, entry) : null;
+  }
+
+  read([offset, length]) {
+    const data = Buffer.allocUnsafe(length);
+    fs.readSync(this.fd, data, 0, length, offset);
+    return data;
+  }
+
+  // Callers share the returned buffer, copy it before writing to it
+  slice(range) {
+    if (!this.slices.has(range[0])) this.slices.set(range[0], this.read(range));
+    return this.slices.get(range[0]);
+  }
+
+  abi(range) {
+    if (!this.abis.has(range[0])) {
+      this.abis.set(range[0], JSON.parse(this.slice(range).toString("utf8")));
+    }
+    return this.abis.get(range[0]);
+  }
+
+  close() {
+    fs.closeSync(this.fd);
+  }
+}
+
+module.exports = { ArtifactPack, PackedArtifact, buildPack, INDEX_FILE, BLOB_FILE };
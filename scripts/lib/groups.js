@@ -0,0 +1,97 @@
+const fs = require("fs");
+const { settingsFromPrefix } = require("./prefixes");
+
+// Equivalent variants from contract_groups.json (see scripts/grouping_audit.js): prefixes whose
+// optimizer runs give the same runtime size and hash. The measurement scripts measure one
+// representative per group and copy its results to the other members. The groups are built
+// from the "none" builds, so they also hold for the "ipfs" builds up to the metadata hash.
+// MEASURE_ALL_VARIANTS=1, a missing groups file or a prefix missing from it measures every prefix.
+
+const GROUPS_FILE = "./contract_groups.json";
+
+// Optimizer runs of a prefix as a string, "none" for the unoptimized build
+function runsOf(prefix) {
+  const { runs } = settingsFromPrefix(prefix);
+  return runs === null ? "none" : String(runs);
+}
+
+class VariantGroups {
+  // `groupKey` is the entry of the groups file for the contract, e.g. "ozTokenAGroups"
+  constructor(prefixes, groupKey, groupsFile = GROUPS_FILE) {
+    this.representativeOf = new Map(prefixes.map((prefix) => [prefix, prefix]));
+    const groups = process.env.MEASURE_ALL_VARIANTS !== "1" && fs.existsSync(groupsFile) ? JSON.parse(fs.readFileSync(groupsFile, "utf8"))[groupKey] : null;
+    if (!groups) return;
+
+    const groupOf = new Map();
+    groups.forEach((group, index) => group.contracts.forEach((member) => groupOf.set(runsOf(member), index)));
+    // The first prefix of each group, in the order of `prefixes`, is measured
+    const firstOf = new Map();
+    for (const prefix of prefixes) {
+      const group = groupOf.get(runsOf(prefix));
+      if (group === undefined) continue;
+      if (!firstOf.has(group)) firstOf.set(group, prefix);
+      this.representativeOf.set(prefix, firstOf.get(group));
+    }
+  }
+
+  // Prefixes to measure, in the order of the prefixes they represent
+  get representatives() {
+    return [...new Set(this.representativeOf.values())];
+  }
+
+  // Prefixes represented by `prefix`, itself included
+  members(prefix) {
+    return [...this.representativeOf].filter(([, representative]) => representative === prefix).map(([member]) => member);
+  }
+
+  // The results plus a copy of each representative's result for every member of its group that
+  // has no result of its own. `field` holds the prefix, `measuredField` in the copy the prefix it
+  // was measured with, and `rest` gives the other fields that identify a result. The `exclude`
+  // fields depend on more than the runtime code, e.g. the deployment cost on the metadata hash
+  // of the initcode, and are null in the copies.
+  expand(results, field, { measuredField = "measuredPrefix", rest = () => "", exclude = [] } = {}) {
+    const excluded = Object.fromEntries(exclude.map((name) => [name, null]));
+    const id = (result, prefix) => `${prefix}|${rest(result)}`;
+    const known = new Set(results.map((result) => id(result, result[field])));
+    const copies = [];
+    for (const result of results) {
+      for (const member of this.members(result[field])) {
+        if (!known.has(id(result, member))) {
+          known.add(id(result, member));
+          copies.push({ ...result, ...excluded, [field]: member, [measuredField]: result[measuredField] || result[field] });
+        }
+      }
+    }
+    return [...results, ...copies];
+  }
+}
+
+// Groups of the auditor grid (scripts/test_auditor.js): the tokens and each check contract
+function auditorGroups(tokenPrefixes, auditCheckPrefixes, groupsFile = GROUPS_FILE) {
+  return {
+    token: new VariantGroups(tokenPrefixes, "tokenGroups", groupsFile),
+    checks: {
+      AuditCheck: new VariantGroups(auditCheckPrefixes, "auditCheckGroups", groupsFile),
+      AuditCheckHash: new VariantGroups(auditCheckPrefixes, "auditCheckHashGroups", groupsFile),
+    },
+  };
+}
+
+// Results of the measured auditor cells plus copies for the cells of the other group members,
+// first along the tokens, then along the check contracts
+function expandAuditorResults(results, { token, checks }) {
+  const fields = (...names) => (result) => names.map((name) => result[name]).join("|");
+  const byToken = token.expand(results, "tokenPrefix", {
+    measuredField: "measuredTokenPrefix",
+    rest: fields("auditCheckPrefix", "checkContract", "method", "batchSize"),
+  });
+  return Object.entries(checks).flatMap(([checkContract, groups]) =>
+    groups.expand(
+      byToken.filter((result) => result.checkContract === checkContract),
+      "auditCheckPrefix",
+      { measuredField: "measuredAuditCheckPrefix", rest: fields("tokenPrefix", "method", "batchSize") }
+    )
+  );
+}
+
+module.exports = { VariantGroups, auditorGroups, expandAuditorResults };
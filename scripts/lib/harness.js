@@ -0,0 +1,83 @@
+const { ethers, network } = require("hardhat");
+const fs = require("fs");
+const path = require("path");
+const { ArtifactPack } = require("./artifact_pack");
+
+// Shared helpers for the evaluation scripts: deploy from evaluation/ artifacts and
+// restore chain state with evm_snapshot/evm_revert instead of hardhat_reset.
+
+const EVALUATION_DIR = "./evaluation"; // Directory where the artifacts are stored
+
+const artifactCache = new Map(); // "<prefix>/<contractName>" -> parsed artifact
+let artifactPack; // evaluation/artifacts.bin if built (see scripts/pack_artifacts.js), opened on first use
+
+// Artifact of a variant, from the pack if it holds the current one, from the JSON otherwise
+function loadArtifact(prefix, contractName) {
+  const key = `${prefix}/${contractName}`;
+  if (!artifactCache.has(key)) {
+    if (artifactPack === undefined) artifactPack = ArtifactPack.open(EVALUATION_DIR);
+    const packed = artifactPack && artifactPack.get(prefix, contractName);
+    const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
+    artifactCache.set(key, packed || JSON.parse(fs.readFileSync(artifactPath, "utf8")));
+  }
+  return artifactCache.get(key);
+}
+
+// Runtime bytecode of a variant as bytes, shared with the artifact cache: do not modify it
+function loadDeployedBytecode(prefix, contractName) {
+  const artifact = loadArtifact(prefix, contractName);
+  return artifact.deployedBytecodeBytes || Buffer.from(artifact.deployedBytecode.replace(/^0x/, ""), "hex");
+}
+
+// Helper to load a contract factory from the evaluation folder
+async function getContractFactoryFromEvaluation(prefix, contractName, signer) {
+  const artifact = loadArtifact(prefix, contractName);
+  signer = signer || (await ethers.provider.getSigner());
+  return new ethers.ContractFactory(artifact.abi, artifact.bytecodeBytes || artifact.bytecode, signer);
+}
+
+// Deploy a contract and capture its deployment cost
+async function deployFromEvaluation(prefix, contractName, constructorArgs = [], signer) {
+  const ContractFactory = await getContractFactoryFromEvaluation(prefix, contractName, signer);
+  const contract = await ContractFactory.deploy(...constructorArgs);
+  const receipt = await contract.deploymentTransaction().wait();
+  console.log(`${contractName} deployed at ${contract.target} with prefix: ${prefix}`);
+  return { contract, address: receipt.contractAddress, deploymentCost: receipt.gasUsed.toString() };
+}
+
+async function resetNetwork() {
+  console.log("Resetting Hardhat network...");
+  await network.provider.send("hardhat_reset");
+}
+
+async function takeSnapshot() {
+  return network.provider.send("evm_snapshot");
+}
+
+// Run `setup` once and snapshot the resulting state. `restore()` brings the chain back to
+// that state; layers nest, so a token layer can sit on top of a fixture layer.
+async function createLayer(setup) {
+  const value = setup ? await setup() : undefined;
+  let snapshotId = await takeSnapshot();
+  return {
+    value,
+    async restore() {
+      const reverted = await network.provider.send("evm_revert", [snapshotId]);
+      if (!reverted) {
+        throw new Error(`evm_revert to snapshot ${snapshotId} failed`);
+      }
+      // A snapshot can only be reverted to once, take a fresh one for the next restore
+      snapshotId = await takeSnapshot();
+    },
+  };
+}
+
+module.exports = {
+  EVALUATION_DIR,
+  createLayer,
+  deployFromEvaluation,
+  getContractFactoryFromEvaluation,
+  loadArtifact,
+  loadDeployedBytecode,
+  resetNetwork,
+};
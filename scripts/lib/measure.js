@@ -0,0 +1,76 @@
+const { network } = require("hardhat");
+
+// Collects the gas estimates taken against one chain state and sends them together:
+// as a single JSON-RPC batch when the network is reached over HTTP (hardhat node,
+// shard runs), as concurrent requests on the in-process hardhat network.
+//
+//   const batch = new GasBatch();
+//   batch.add("gasUsedOptimized", validator, "validateToken", [token.target]);
+//   const gas = await batch.estimate(); // { gasUsedOptimized: 123n, ... }
+
+class GasBatch {
+  constructor() {
+    this.requests = [];
+  }
+
+  // Queue `contract.method(...args)` under `name`, sent from the contract's signer like
+  // `contract.method.estimateGas(...args)` would
+  add(name, contract, method, args = []) {
+    this.requests.push({ name, contract, method, args });
+    return this;
+  }
+
+  async estimate() {
+    const transactions = await Promise.all(
+      this.requests.map(async ({ contract, method, args }) => {
+        const { to, data } = await contract[method].populateTransaction(...args);
+        const from = contract.runner && contract.runner.getAddress ? await contract.runner.getAddress() : undefined;
+        return from ? { from, to, data } : { to, data };
+      })
+    );
+    const calls = transactions.map((transaction) => ({ method: "eth_estimateGas", params: [transaction] }));
+    const responses = network.config.url ? await sendBatch(network.config.url, calls) : await sendConcurrent(calls);
+
+    const results = {};
+    responses.forEach((response, i) => {
+      const { name, method } = this.requests[i];
+      if (response.error) {
+        throw new Error(`eth_estimateGas for ${name} (${method}) failed: ${response.error.message}`);
+      }
+      results[name] = BigInt(response.result);
+    });
+    return results;
+  }
+}
+
+// One HTTP round trip for all calls, responses are matched back by id
+async function sendBatch(url, calls) {
+  const body = calls.map((call, id) => ({ jsonrpc: "2.0", id, ...call }));
+  const response = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    throw new Error(`JSON-RPC batch to ${url} failed with HTTP ${response.status}`);
+  }
+  const replies = await response.json();
+  if (!Array.isArray(replies)) {
+    throw new Error(`JSON-RPC batch to ${url} failed: ${JSON.stringify(replies.error || replies)}`);
+  }
+  const byId = new Map(replies.map((reply) => [reply.id, reply]));
+  return body.map(({ id }) => byId.get(id) || { error: { message: "missing from batch response" } });
+}
+
+async function sendConcurrent(calls) {
+  return Promise.all(
+    calls.map(({ method, params }) =>
+      network.provider.send(method, params).then(
+        (result) => ({ result }),
+        (error) => ({ error: { message: error.message } })
+      )
+    )
+  );
+}
+
+module.exports = { GasBatch };
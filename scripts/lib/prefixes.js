@@ -0,0 +1,45 @@
+// Evaluation prefixes as produced by compile_variants.js: the unoptimized build first,
+// then optimizer runs from 2^31-1 down to 2^0-1.
+// VARIANT_RUNS (e.g. "none,2147483647,255") restricts them to a subset, see scripts/benchmark.js.
+const VARIANT_RUNS = ["none", ...Array.from({ length: 32 }, (_, i) => String(2 ** (31 - i) - 1))];
+
+// Throws on runs no variant is compiled with, so a typo can't silently shrink the subset
+function checkRuns(runs) {
+  const unknown = runs.filter((value) => !VARIANT_RUNS.includes(value));
+  if (unknown.length) {
+    throw new Error(`Unknown optimizer runs ${unknown.join(", ")}, variants exist for none and 2^n-1 (0, 1, 3, ..., 255, ..., 2147483647)`);
+  }
+  return runs;
+}
+
+function variantPrefixes(bytecodeHash) {
+  const prefixes = VARIANT_RUNS.map((runs) => `${bytecodeHash}${runs}`);
+  if (!process.env.VARIANT_RUNS) return prefixes;
+  const runs = new Set(checkRuns(process.env.VARIANT_RUNS.split(",").map((value) => value.trim())));
+  return prefixes.filter((prefix) => runs.has(prefix.slice(bytecodeHash.length)));
+}
+
+// Compiler settings encoded in a prefix, e.g. "ipfs200" -> { bytecodeHash: "ipfs", runs: 200 }.
+// runs is null for the unoptimized build.
+function settingsFromPrefix(prefix) {
+  const match = /^(ipfs|none)(\d+|none)$/.exec(prefix);
+  if (!match) return { bytecodeHash: null, runs: null };
+  return { bytecodeHash: match[1], runs: match[2] === "none" ? null : parseInt(match[2], 10) };
+}
+
+// Parse a shard spec "index/count" (e.g. "0/4"), undefined means a single shard
+function parseShard(spec) {
+  if (!spec) return { index: 0, count: 1 };
+  const [index, count] = spec.split("/").map((value) => parseInt(value, 10));
+  if (!(count > 0 && index >= 0 && index < count)) {
+    throw new Error(`Invalid shard spec: ${spec}`);
+  }
+  return { index, count };
+}
+
+// Round-robin share of `items` for one shard
+function shardItems(items, { index, count }) {
+  return items.filter((_, i) => i % count === index);
+}
+
+module.exports = { VARIANT_RUNS, checkRuns, variantPrefixes, settingsFromPrefix, parseShard, shardItems };
@@ -0,0 +1,76 @@
+const fs = require("fs");
+const { settingsFromPrefix } = require("./prefixes");
+
+// Append-only JSONL store for measurement results. Every line is
+//   {"key": {script, contract, prefixes, settings}, "result": {...}}
+// and is written as soon as it is measured, so an interrupted run keeps everything up
+// to the last completed measurement and a restarted run can skip what is already there.
+
+// Key of one measurement; `prefixes` maps a role (e.g. "token", "auditCheck") to its prefix,
+// `params` holds any other measurement parameters (e.g. the batch size)
+function resultKey(script, contract, prefixes, params = {}) {
+  const settings = Object.fromEntries(Object.entries(prefixes).map(([role, prefix]) => [role, settingsFromPrefix(prefix)]));
+  return Object.keys(params).length ? { script, contract, prefixes, settings, params } : { script, contract, prefixes, settings };
+}
+
+// Stable string form of a key, independent of property order
+function keyString(key) {
+  const sortKeys = (value) =>
+    value && typeof value === "object" && !Array.isArray(value)
+      ? Object.fromEntries(Object.keys(value).sort().map((name) => [name, sortKeys(value[name])]))
+      : value;
+  return JSON.stringify(sortKeys(key));
+}
+
+// Complete {key, result} records of a store file, ignoring a trailing partial line
+function readRecords(file) {
+  if (!fs.existsSync(file)) return [];
+  const content = fs.readFileSync(file, "utf8");
+  return content
+    .slice(0, content.lastIndexOf("\n") + 1)
+    .split("\n")
+    .filter((line) => line)
+    .map((line) => JSON.parse(line));
+}
+
+class ResultStore {
+  // `seedFiles` are other stores whose keys count as measured but are never written to
+  constructor(file, seedFiles = []) {
+    this.file = file;
+    this.keys = new Set();
+    if (!fs.existsSync(file)) {
+      fs.writeFileSync(file, "");
+    } else {
+      // Drop a trailing partial line left behind by a crash mid-write
+      const content = fs.readFileSync(file, "utf8");
+      const complete = content.slice(0, content.lastIndexOf("\n") + 1);
+      if (complete.length !== content.length) {
+        fs.truncateSync(file, Buffer.byteLength(complete));
+      }
+    }
+    for (const source of [file, ...seedFiles]) {
+      for (const record of readRecords(source)) {
+        this.keys.add(keyString(record.key));
+      }
+    }
+    if (this.keys.size) {
+      console.log(`Resuming from ${[file, ...seedFiles].join(", ")}: ${this.keys.size} results already measured`);
+    }
+  }
+
+  has(key) {
+    return this.keys.has(keyString(key));
+  }
+
+  append(key, result) {
+    fs.appendFileSync(this.file, JSON.stringify({ key, result }) + "\n");
+    this.keys.add(keyString(key));
+  }
+
+  // All results in the store, in the order they were measured
+  results() {
+    return readRecords(this.file).map((record) => record.result);
+  }
+}
+
+module.exports = { ResultStore, readRecords, resultKey, keyString };
@@ -0,0 +1,121 @@
+const fs = require("fs");
+const path = require("path");
+const { EVALUATION_DIR, loadArtifact, loadDeployedBytecode } = require("./harness");
+
+// Runtime source maps of evaluation artifacts: program counter -> Solidity source location.
+// compile_variants.js stores them as evaluation/<prefix>/<Contract>.sourcemap.json; for
+// variants built before that, a matching contract in hardhat's own build info is used.
+
+const BUILD_INFO_DIR = "./artifacts/build-info";
+
+// Expand solc's compressed "s:l:f:j:m;..." map, empty fields repeat the previous entry
+function decodeSourceMap(sourceMap) {
+  const entries = [];
+  let previous = { start: -1, length: -1, file: -1, jump: "-" };
+  for (const item of sourceMap.split(";")) {
+    const [start, length, file, jump] = item.split(":");
+    const entry = {
+      start: start ? parseInt(start, 10) : previous.start,
+      length: length ? parseInt(length, 10) : previous.length,
+      file: file ? parseInt(file, 10) : previous.file,
+      jump: jump || previous.jump,
+    };
+    entries.push(entry);
+    previous = entry;
+  }
+  return entries;
+}
+
+// Instruction index of every instruction start, source map entries are per instruction
+function instructionIndexes(code) {
+  const indexes = new Map();
+  for (let pc = 0, index = 0; pc < code.length; pc++, index++) {
+    indexes.set(pc, index);
+    const opcode = code[pc];
+    if (opcode >= 0x60 && opcode <= 0x7f) pc += opcode - 0x5f;
+  }
+  return indexes;
+}
+
+// Byte offset -> 1-based line number of a source file
+function lineIndex(content) {
+  const bytes = Buffer.from(content, "utf8");
+  const starts = [0];
+  for (let i = 0; i < bytes.length; i++) {
+    if (bytes[i] === 0x0a) starts.push(i + 1);
+  }
+  return {
+    lineOf(offset) {
+      let low = 0;
+      let high = starts.length - 1;
+      while (low < high) {
+        const mid = (low + high + 1) >> 1;
+        if (starts[mid] <= offset) low = mid;
+        else high = mid - 1;
+      }
+      return low + 1;
+    },
+    text(line) {
+      const end = line < starts.length ? starts[line] : bytes.length;
+      return bytes.subarray(starts[line - 1], end).toString("utf8").trim();
+    },
+    slice(start, length) {
+      return bytes.subarray(start, start + length).toString("utf8");
+    },
+  };
+}
+
+function findInBuildInfo(artifact) {
+  if (!fs.existsSync(BUILD_INFO_DIR)) return null;
+  const deployed = artifact.deployedBytecode.replace(/^0x/, "");
+  for (const file of fs.readdirSync(BUILD_INFO_DIR)) {
+    const buildInfo = JSON.parse(fs.readFileSync(path.join(BUILD_INFO_DIR, file), "utf8"));
+    const contract = (buildInfo.output.contracts[artifact.sourceName] || {})[artifact.contractName];
+    if (contract && contract.evm.deployedBytecode.object === deployed) {
+      const sources = {};
+      for (const [name, { id }] of Object.entries(buildInfo.output.sources)) {
+        sources[id] = { name, content: buildInfo.input.sources[name].content };
+      }
+      return { sourceMap: contract.evm.deployedBytecode.sourceMap, sources };
+    }
+  }
+  return null;
+}
+
+// Returns { locate(pc) }, or null when no source map is available for the variant.
+// locate gives { file, line, text, jump, start, length } or null for compiler generated code.
+function loadSourceMap(prefix, contractName) {
+  const mapPath = path.join(EVALUATION_DIR, prefix, `${contractName}.sourcemap.json`);
+  const artifact = loadArtifact(prefix, contractName);
+  const debug = fs.existsSync(mapPath) ? JSON.parse(fs.readFileSync(mapPath, "utf8")) : findInBuildInfo(artifact);
+  if (!debug) return null;
+
+  const entries = decodeSourceMap(debug.sourceMap);
+  const indexes = instructionIndexes(loadDeployedBytecode(prefix, contractName));
+  const lines = new Map();
+  const sourceLines = (file) => {
+    if (!lines.has(file)) lines.set(file, debug.sources[file] ? lineIndex(debug.sources[file].content) : null);
+    return lines.get(file);
+  };
+
+  return {
+    locate(pc) {
+      const entry = entries[indexes.get(pc)];
+      if (!entry || entry.file < 0) return null;
+      const source = sourceLines(entry.file);
+      if (!source) return null;
+      const line = source.lineOf(entry.start);
+      return {
+        file: path.basename(debug.sources[entry.file].name),
+        line,
+        text: source.text(line),
+        jump: entry.jump,
+        start: entry.start,
+        length: entry.length,
+        snippet: () => source.slice(entry.start, entry.length),
+      };
+    },
+  };
+}
+
+module.exports = { decodeSourceMap, instructionIndexes, lineIndex, loadSourceMap };
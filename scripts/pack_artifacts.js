@@ -0,0 +1,22 @@
+const path = require("path");
+const { buildPack, BLOB_FILE, INDEX_FILE } = require("./lib/artifact_pack");
+
+// Packs the evaluation/ artifacts into evaluation/artifacts.bin and evaluation/artifacts.index.json
+// (see scripts/lib/artifact_pack.js). compile_variants.js does this after every run, this
+// script is for trees compiled before the pack existed. Runs with plain node.
+//
+//   node scripts/pack_artifacts.js [evaluation dir]
+
+const EVALUATION_DIR = process.argv[2] || "./evaluation"; // Directory where the artifacts are stored
+
+function main() {
+  const count = buildPack(EVALUATION_DIR);
+  console.log(`Packed ${count} artifacts into ${path.join(EVALUATION_DIR, BLOB_FILE)} and ${path.join(EVALUATION_DIR, INDEX_FILE)}`);
+}
+
+try {
+  main();
+} catch (error) {
+  console.error(error);
+  process.exit(1);
+}
@@ -0,0 +1,317 @@
+const fs = require("fs");
+const path = require("path");
+const crypto = require("crypto");
+const { spawn } = require("child_process");
+const { readRecords } = require("./lib/result_store");
+const { variantPrefixes } = require("./lib/prefixes");
+
+// Incremental runner of the pipeline compile -> group -> measure -> plot. Every stage is
+// stamped with the content hashes of its inputs and outputs in .pipeline/state.json and is
+// only run again when one of them changed. Within a measurement the cells (one stream record
+// each) are stamped with the artifacts they were measured with, so a changed artifact only
+// drops its own cells and the script's resume measures just those again. Measurements and
+// plots depend on the entries of contract_groups.json they read, not on the whole file.
+// Editing contracts/AuditCheck.sol, for instance, recompiles AuditCheck and AuditCheckHash,
+// re-runs the grouping and remeasures the AuditCheck cells of the auditor grid; the
+// TokenValidator measurements and their charts are left alone. A measurement script that
+// fails exits non-zero and its stage is not stamped, so the next run resumes it.
+//
+//   node scripts/pipeline.js                          # bring everything up to date
+//   node scripts/pipeline.js --dry-run                # show what is stale and why
+//   node scripts/pipeline.js --stages measure/auditor,plot/auditor
+//   node scripts/pipeline.js --stages group --force   # run a stage even if it is up to date
+//
+// Stream records measured before the pipeline was used carry no stamp and are adopted as
+// measured with the current artifacts.
+
+const ROOT = path.join(__dirname, "..");
+const STATE_DIR = path.join(ROOT, ".pipeline");
+const STATE_FILE = path.join(STATE_DIR, "state.json");
+const STATE_VERSION = 1; // bump when the layout of the state file changes
+const EVALUATION_DIR = path.join(ROOT, "evaluation");
+const CONTRACTS = ["AuditCheck", "AuditCheckHash", "Auditor", "ozTokenA", "SignedToken", "TokenValidator"]; // as in compile_variants.js
+const GROUPED_CONTRACTS = ["SignedToken", "AuditCheck", "AuditCheckHash", "TokenValidator", "ozTokenA"]; // read by grouping_audit.js
+const HARNESS_FILES = ["scripts/lib/harness.js", "scripts/lib/measure.js", "scripts/lib/result_store.js", "scripts/lib/prefixes.js", "scripts/lib/groups.js", "scripts/lib/artifact_pack.js"];
+const PYTHON = process.env.PYTHON || "python3";
+
+// Contract deployed in each role of a result key
+const ROLE_CONTRACTS = {
+  ozTokenA: "ozTokenA",
+  measuredOzTokenA: "ozTokenA", // representative whose gas a group member's record holds
+  token: "SignedToken",
+  tokenValidator: "TokenValidator",
+  tokenValidatorOptimized: "TokenValidator",
+  tokenValidatorUnoptimized: "TokenValidator",
+  auditor: "Auditor",
+  auditCheck: "AuditCheck",
+};
+
+// Measurement scripts with the files they write, the contract_groups.json entries they and
+// their plot read (analysis/columnar.py for the Group columns) and the charts drawn from
+// them. Optional measurements only run when named in --stages.
+const MEASUREMENTS = [
+  { name: "tokenValidator", script: "scripts/test_from_evaluation_v6.js", output: "evaluation_results.json", stream: "evaluation_results.jsonl", groups: ["ozTokenAGroups"], plot: "plot_tokenvalidator.py", charts: ["barchart_static_analysis.pdf"] },
+  { name: "hash", script: "scripts/test_hash.js", output: "hash_results.json", stream: "hash_results.jsonl", groups: ["ozTokenAGroups"], plot: "plot_hash.py", charts: ["barchart_hash.pdf"] },
+  { name: "auditor", script: "scripts/test_auditor.js", output: "validation_gas_results.json", stream: "validation_gas_results.jsonl", groups: ["tokenGroups", "auditCheckGroups", "auditCheckHashGroups"], plot: "plot_auditor.py", charts: ["validation_gas_heatmap.pdf", "validation_gas_batch.pdf"] },
+  { name: "dispatchIndex", script: "scripts/test_dispatch_index.js", output: "dispatch_index_results.json", stream: "dispatch_index_results.jsonl", groups: ["ozTokenAGroups"], plot: "plot_dispatch_index.py", charts: ["dispatch_index_gas.pdf"], optional: true },
+  { name: "verdictCache", script: "scripts/test_verdict_cache.js", output: "verdict_cache_results.json", stream: "verdict_cache_results.jsonl", groups: ["ozTokenAGroups"], plot: "plot_verdict_cache.py", charts: ["verdict_cache_gas.pdf"], optional: true },
+];
+
+function parseArgs(argv) {
+  const options = { stages: null, dryRun: false, force: false, jobs: null };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === "--stages") options.stages = argv[++i].split(",");
+    else if (arg === "--dry-run") options.dryRun = true;
+    else if (arg === "--force") options.force = true;
+    else if (arg === "--jobs") options.jobs = argv[++i];
+    else throw new Error(`Unknown argument: ${arg}`);
+  }
+  return options;
+}
+
+function sha256(data) {
+  return crypto.createHash("sha256").update(data).digest("hex");
+}
+
+// Content hash of a file relative to the root, null if it does not exist
+function fileHash(file) {
+  const fullPath = path.join(ROOT, file);
+  return fs.existsSync(fullPath) ? sha256(fs.readFileSync(fullPath)) : null;
+}
+
+function filesIn(dir, extension) {
+  const files = [];
+  const walk = (relative) => {
+    for (const entry of fs.readdirSync(path.join(ROOT, relative), { withFileTypes: true })) {
+      const child = path.join(relative, entry.name);
+      if (entry.isDirectory()) walk(child);
+      else if (entry.name.endsWith(extension)) files.push(child);
+    }
+  };
+  walk(dir);
+  return files.sort();
+}
+
+function fileHashes(files) {
+  return Object.fromEntries(files.map((file) => [file, fileHash(file)]));
+}
+
+// Content hash of an artifact in evaluation/. compile_variants.js links them into its
+// content-addressed store, so the link target already names the hash.
+const artifactHashes = new Map();
+function artifactHash(prefix, contractName) {
+  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
+  if (!artifactHashes.has(artifactPath)) {
+    let hash = null;
+    try {
+      hash = path.basename(fs.readlinkSync(artifactPath), ".json");
+    } catch (error) {
+      if (fs.existsSync(artifactPath)) hash = sha256(fs.readFileSync(artifactPath));
+    }
+    artifactHashes.set(artifactPath, hash);
+  }
+  return artifactHashes.get(artifactPath);
+}
+
+function artifactInputs(prefixes, contractNames) {
+  const inputs = {};
+  for (const prefix of prefixes) {
+    for (const contractName of contractNames) {
+      inputs[`evaluation/${prefix}/${contractName}.json`] = artifactHash(prefix, contractName);
+    }
+  }
+  return inputs;
+}
+
+// Content hash of each of the given entries of contract_groups.json, so a stage only goes
+// stale when the groups it reads change
+function groupInputs(groupKeys) {
+  const groupsPath = path.join(ROOT, "contract_groups.json");
+  const groups = fs.existsSync(groupsPath) ? JSON.parse(fs.readFileSync(groupsPath, "utf8")) : {};
+  return Object.fromEntries(groupKeys.map((key) => [`contract_groups.json#${key}`, key in groups ? sha256(JSON.stringify(groups[key])) : null]));
+}
+
+// Environment the scripts read their variant subset and batch sizes from
+function envInputs() {
+  return { "env:VARIANT_RUNS": process.env.VARIANT_RUNS || "", "env:AUDITOR_BATCH_SIZES": process.env.AUDITOR_BATCH_SIZES || "" };
+}
+
+// Hash of the artifacts a stream record was measured with
+function cellStamp(key) {
+  const artifacts = Object.entries(key.prefixes)
+    .sort(([a], [b]) => a.localeCompare(b))
+    .map(([role, prefix]) => {
+      const contractName = role === "auditCheck" && key.params ? key.params.checkContract : ROLE_CONTRACTS[role];
+      return [role, contractName ? artifactHash(prefix, contractName) : null];
+    });
+  return sha256(JSON.stringify(artifacts));
+}
+
+function run(command, args, env = {}) {
+  return new Promise((resolve, reject) => {
+    const child = spawn(command, args, { cwd: ROOT, stdio: "inherit", env: { ...process.env, ...env } });
+    child.on("error", reject);
+    child.on("close", (code) => (code === 0 ? resolve() : reject(new Error(`${command} ${args.join(" ")} exited with ${code}`))));
+  });
+}
+
+function compileArgs(options) {
+  const args = ["compile_variants.js"];
+  if (process.env.VARIANT_RUNS) {
+    const runs = process.env.VARIANT_RUNS.split(",").map((value) => value.trim());
+    const numericRuns = runs.filter((value) => value !== "none");
+    if (numericRuns.length) args.push("--runs", numericRuns.join(","));
+    if (!runs.includes("none")) args.push("--no-unoptimized");
+  }
+  if (options.jobs) args.push("--jobs", options.jobs);
+  return args;
+}
+
+// Rewrite a stream without the records measured with other artifacts than the current ones
+// and stamp the records that carry no stamp yet, returns the number of dropped records
+function pruneStream(stream) {
+  const file = path.join(ROOT, stream);
+  const records = readRecords(file);
+  const kept = [];
+  for (const record of records) {
+    const stamp = cellStamp(record.key);
+    if (record.inputs === undefined || record.inputs === stamp) {
+      kept.push({ ...record, inputs: stamp });
+    }
+  }
+  const changed = kept.length !== records.length || records.some((record) => record.inputs === undefined);
+  if (changed) {
+    fs.writeFileSync(`${file}.tmp`, kept.map((record) => JSON.stringify(record) + "\n").join(""));
+    fs.renameSync(`${file}.tmp`, file);
+  }
+  return records.length - kept.length;
+}
+
+// Stream records of a measurement that were measured with other artifacts than the current ones
+function staleCells(stream) {
+  return readRecords(path.join(ROOT, stream)).filter((record) => record.inputs !== undefined && record.inputs !== cellStamp(record.key));
+}
+
+function buildStages(options) {
+  const stages = [
+    {
+      name: "compile",
+      inputs: () => ({ ...fileHashes(["compile_variants.js", "package-lock.json", ...filesIn("contracts", ".sol")]), ...envInputs() }),
+      outputs: () => artifactInputs([...variantPrefixes("ipfs"), ...variantPrefixes("none")], CONTRACTS),
+      run: () => run("node", compileArgs(options)),
+    },
+    {
+      name: "group",
+      inputs: () => ({ ...fileHashes(["scripts/grouping_audit.js", "scripts/lib/prefixes.js", "scripts/lib/artifact_pack.js"]), ...artifactInputs(variantPrefixes("none"), GROUPED_CONTRACTS), ...envInputs() }),
+      outputs: () => fileHashes(["contract_groups.json"]),
+      run: () => run("node", ["scripts/grouping_audit.js"]),
+    },
+  ];
+  for (const measurement of MEASUREMENTS) {
+    stages.push({
+      name: `measure/${measurement.name}`,
+      optional: measurement.optional,
+      // The artifacts are inputs per cell, see pruneStream; a changed script invalidates every cell.
+      // The groups decide which cells are measured and copied, a change re-runs the script only.
+      scripts: [measurement.script, ...HARNESS_FILES, "hardhat.config.js"],
+      inputs: () => ({ ...fileHashes([measurement.script, ...HARNESS_FILES, "hardhat.config.js"]), ...groupInputs(measurement.groups), ...envInputs() }),
+      outputs: () => fileHashes([measurement.output]),
+      cells: measurement.stream,
+      run: () => run("npx", ["hardhat", "run", "--no-compile", measurement.script]),
+    });
+    stages.push({
+      name: `plot/${measurement.name}`,
+      optional: measurement.optional,
+      inputs: () => ({ ...fileHashes([measurement.output, measurement.plot, ...filesIn("analysis", ".py")]), ...groupInputs(measurement.groups) }),
+      outputs: () => fileHashes(measurement.charts),
+      run: () => run(PYTHON, [measurement.plot], { MPLBACKEND: "Agg" }),
+    });
+  }
+  if (!options.stages) return stages.filter((stage) => !stage.optional);
+  // "measure" selects every measurement that runs by default, optional ones only by their full name
+  return stages.filter((stage) =>
+    options.stages.some((selected) => stage.name === selected || (!stage.optional && stage.name.startsWith(`${selected}/`)))
+  );
+}
+
+function loadState() {
+  if (!fs.existsSync(STATE_FILE)) return { version: STATE_VERSION, stages: {} };
+  const state = JSON.parse(fs.readFileSync(STATE_FILE, "utf8"));
+  return state.version === STATE_VERSION ? state : { version: STATE_VERSION, stages: {} };
+}
+
+function saveState(state) {
+  fs.mkdirSync(STATE_DIR, { recursive: true });
+  fs.writeFileSync(`${STATE_FILE}.tmp`, JSON.stringify(state, null, 2));
+  fs.renameSync(`${STATE_FILE}.tmp`, STATE_FILE);
+}
+
+// Names of the entries that differ between two {name: hash} maps
+function changedEntries(before = {}, after) {
+  return [...new Set([...Object.keys(before), ...Object.keys(after)])].filter((name) => before[name] !== after[name]);
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  const state = loadState();
+  const stages = buildStages(options);
+  const summary = [];
+
+  for (const stage of stages) {
+    // Upstream stages may have rewritten the artifacts
+    artifactHashes.clear();
+    const stamp = state.stages[stage.name];
+    const inputs = stage.inputs();
+    const reasons = [];
+    if (options.force) reasons.push("--force");
+    if (!stamp) reasons.push("never run");
+    else {
+      const changedInputs = changedEntries(stamp.inputs, inputs);
+      const changedOutputs = changedEntries(stamp.outputs, stage.outputs());
+      if (changedInputs.length) reasons.push(`inputs changed: ${changedInputs.slice(0, 3).join(", ")}${changedInputs.length > 3 ? ` and ${changedInputs.length - 3} more` : ""}`);
+      if (changedOutputs.length) reasons.push(`outputs changed: ${changedOutputs.slice(0, 3).join(", ")}${changedOutputs.length > 3 ? ` and ${changedOutputs.length - 3} more` : ""}`);
+    }
+
+    // A changed script invalidates every cell, otherwise only the cells of changed artifacts
+    let dropped = 0;
+    if (stage.cells) {
+      const scriptChanged = stamp && changedEntries(stamp.inputs, inputs).some((name) => stage.scripts.includes(name));
+      if (scriptChanged) {
+        dropped = readRecords(path.join(ROOT, stage.cells)).length;
+        if (!options.dryRun) fs.rmSync(path.join(ROOT, stage.cells), { force: true });
+      } else {
+        dropped = options.dryRun ? staleCells(stage.cells).length : pruneStream(stage.cells);
+      }
+      if (dropped) reasons.push(`${dropped} cells measured with changed artifacts`);
+    }
+
+    if (!reasons.length) {
+      console.log(`${stage.name}: up to date`);
+      summary.push({ stage: stage.name, status: "up to date", seconds: 0 });
+      continue;
+    }
+    console.log(`${stage.name}: ${reasons.join("; ")}`);
+    if (options.dryRun) {
+      summary.push({ stage: stage.name, status: "stale", seconds: 0 });
+      continue;
+    }
+
+    const started = process.hrtime.bigint();
+    await stage.run();
+    artifactHashes.clear();
+    if (stage.cells) pruneStream(stage.cells); // stamp the cells measured by this run
+    state.stages[stage.name] = { inputs: stage.inputs(), outputs: stage.outputs(), completedAt: new Date().toISOString() };
+    saveState(state);
+    const seconds = Math.round(Number(process.hrtime.bigint() - started) / 1e6) / 1000;
+    summary.push({ stage: stage.name, status: "ran", seconds });
+  }
+  console.table(summary);
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -0,0 +1,204 @@
+const { network } = require("hardhat");
+const fs = require("fs");
+const path = require("path");
+const { createLayer, deployFromEvaluation, resetNetwork } = require("./lib/harness");
+const { loadSourceMap } = require("./lib/sourcemap");
+
+// Replays TokenValidator calls with debug_traceCall and attributes the gas of every step to
+// its Solidity source line, loop and internal function. Writes a per-line/per-loop table
+// to validator_profile.json and one flamegraph.pl compatible .folded file per call.
+//
+//   PROFILE_TOKEN_PREFIXES=ipfsnone,ipfs200 npx hardhat run scripts/profile_validator.js
+
+// Constants
+const OUTPUT_FILE = "./validator_profile.json";
+const FOLDED_DIR = "./profiles"; // <function>_<tokenPrefix>.folded, render with flamegraph.pl
+const VALIDATOR_PREFIX = process.env.PROFILE_VALIDATOR_PREFIX || "ipfs2147483647"; // TokenValidator variant to profile
+const TOKEN_PREFIXES = (process.env.PROFILE_TOKEN_PREFIXES || "ipfsnone,ipfs2147483647").split(","); // ozTokenA variants to profile against
+const FUNCTIONS = ["validateToken", "getCodeHash", "getCodeHashNoMeta"];
+const TOKEN_VALIDATOR_THRESHOLD = 12; // Threshold for TokenValidator
+const OZ_TOKEN_INITIAL_SUPPLY = 1000000; // Initial supply for ozTokenA
+const TRACE_OPTIONS = { disableStack: true, disableMemory: true, disableStorage: true };
+
+// Trace a call without changing the chain, falling back to a reverted transaction when the
+// node has no debug_traceCall
+async function traceCall(contract, method, args) {
+  const { to, data } = await contract[method].populateTransaction(...args);
+  const from = await contract.runner.getAddress();
+  try {
+    return await network.provider.send("debug_traceCall", [{ from, to, data }, "latest", TRACE_OPTIONS]);
+  } catch (error) {
+    if (!/debug_traceCall/.test(error.message)) throw error;
+  }
+  const layer = await createLayer();
+  try {
+    const response = await contract.runner.sendTransaction({ to, data });
+    await response.wait();
+    return await network.provider.send("debug_traceTransaction", [response.hash, TRACE_OPTIONS]);
+  } finally {
+    await layer.restore();
+  }
+}
+
+// [start, end] pc ranges closed by a backward jump, keyed by the loop start. Jumps into
+// and out of internal functions are not loops.
+function findLoops(steps, locate) {
+  const loops = new Map();
+  for (let i = 0; i + 1 < steps.length; i++) {
+    const { op, pc } = steps[i];
+    const target = steps[i + 1].pc;
+    const location = locate(pc);
+    if ((op === "JUMP" || op === "JUMPI") && target < pc && !(location && (location.jump === "i" || location.jump === "o"))) {
+      const loop = loops.get(target) || { start: target, end: pc, iterations: 0 };
+      loop.end = Math.max(loop.end, pc);
+      loop.iterations++;
+      loops.set(target, loop);
+    }
+  }
+  return loops;
+}
+
+function functionName(location) {
+  if (!location) return "(generated)";
+  const match = /function\s+(\w+)/.exec(location.snippet());
+  return match ? match[1] : `${location.file}:${location.line}`;
+}
+
+function profileTrace(trace, sourceMap, entry) {
+  const steps = trace.structLogs.filter((step) => step.depth === 1);
+  const locate = (pc) => (sourceMap ? sourceMap.locate(pc) : null);
+  const lineLabel = (step, location) =>
+    location ? `${location.file}:${location.line}` : sourceMap ? "(generated)" : `(no source map) ${step.op}`;
+
+  // Outer loops first, so nested loops are entered inside them
+  const loopRanges = [...findLoops(steps, locate).values()].sort((a, b) => b.end - b.start - (a.end - a.start));
+  const lines = new Map();
+  const loops = new Map();
+  const folded = new Map();
+  const frames = [entry];
+  const activeLoops = [];
+  let total = 0;
+
+  steps.forEach((step, i) => {
+    const next = steps[i + 1];
+    const gas = next ? step.gas - next.gas : step.gasCost;
+    const location = locate(step.pc);
+    total += gas;
+
+    // A loop ends when its function continues outside the loop's code, calls made from
+    // the loop body count towards the loop
+    const inRange = (range) => step.pc >= range.start && step.pc <= range.end;
+    while (activeLoops.length) {
+      const top = activeLoops[activeLoops.length - 1];
+      if (frames.length > top.depth || (frames.length === top.depth && inRange(top.range))) break;
+      activeLoops.pop();
+    }
+    for (const range of loopRanges) {
+      const innermost = activeLoops.length ? activeLoops[activeLoops.length - 1] : null;
+      if (innermost && innermost.depth !== frames.length) break;
+      const nested = !innermost || (range.start >= innermost.range.start && range.end <= innermost.range.end);
+      if (inRange(range) && nested && !activeLoops.some((loop) => loop.range === range)) {
+        activeLoops.push({ range, depth: frames.length });
+      }
+    }
+
+    const label = lineLabel(step, location);
+    const line = lines.get(label) || { line: label, text: location ? location.text : "", steps: 0, gas: 0 };
+    line.steps++;
+    line.gas += gas;
+    lines.set(label, line);
+
+    if (activeLoops.length) {
+      const { range } = activeLoops[activeLoops.length - 1];
+      if (!loops.has(range.start)) {
+        const header = locate(range.end);
+        loops.set(range.start, {
+          loop: header ? `${header.file}:${header.line}` : `pc ${range.start}-${range.end}`,
+          text: header ? header.text : "",
+          iterations: range.iterations,
+          steps: 0,
+          gas: 0,
+        });
+      }
+      const loop = loops.get(range.start);
+      loop.steps++;
+      loop.gas += gas;
+    }
+
+    const stack = `${frames.join(";")};${label}`;
+    folded.set(stack, (folded.get(stack) || 0) + gas);
+
+    // Internal function calls and returns are marked in the source map
+    if (location && step.op === "JUMP" && next) {
+      if (location.jump === "i") frames.push(functionName(locate(next.pc)));
+      else if (location.jump === "o" && frames.length > 1) frames.pop();
+    }
+  });
+
+  const byGas = (a, b) => b.gas - a.gas;
+  return {
+    executionGas: total,
+    steps: steps.length,
+    lines: [...lines.values()].sort(byGas),
+    loops: [...loops.values()].sort(byGas),
+    folded: [...folded.entries()].map(([stack, gas]) => `${stack} ${gas}`).join("\n") + "\n",
+  };
+}
+
+async function main() {
+  await resetNetwork();
+  fs.mkdirSync(FOLDED_DIR, { recursive: true });
+
+  const sourceMap = loadSourceMap(VALIDATOR_PREFIX, "TokenValidator");
+  if (!sourceMap) {
+    console.warn(`No source map for TokenValidator (${VALIDATOR_PREFIX}), gas is reported per opcode. Rebuild with compile_variants.js to get one.`);
+  }
+
+  const fixture = await createLayer(async () => {
+    const { contract } = await deployFromEvaluation(VALIDATOR_PREFIX, "TokenValidator", [TOKEN_VALIDATOR_THRESHOLD]);
+    return contract;
+  });
+  const validator = fixture.value;
+
+  const profiles = [];
+  for (const tokenPrefix of TOKEN_PREFIXES) {
+    await fixture.restore();
+    const { address: token } = await deployFromEvaluation(tokenPrefix, "ozTokenA", ["ozToken", "ozt", OZ_TOKEN_INITIAL_SUPPLY]);
+
+    for (const method of FUNCTIONS) {
+      const trace = await traceCall(validator, method, [token]);
+      const estimatedGas = await validator[method].estimateGas(token);
+      const profile = profileTrace(trace, sourceMap, method);
+
+      const foldedFile = path.join(FOLDED_DIR, `${method}_${tokenPrefix}.folded`);
+      fs.writeFileSync(foldedFile, profile.folded);
+
+      console.log(`\n${method}(ozTokenA ${tokenPrefix}) on TokenValidator (${VALIDATOR_PREFIX}): ` +
+        `${profile.executionGas} execution gas in ${profile.steps} steps, ${estimatedGas} estimated`);
+      console.table(profile.lines.map(({ line, steps, gas, text }) => ({ line, steps, gas, text: text.slice(0, 60) })));
+      if (profile.loops.length) console.table(profile.loops);
+
+      profiles.push({
+        validatorPrefix: VALIDATOR_PREFIX,
+        tokenPrefix,
+        function: method,
+        estimatedGas: estimatedGas.toString(),
+        executionGas: profile.executionGas,
+        steps: profile.steps,
+        lines: profile.lines,
+        loops: profile.loops,
+        folded: foldedFile,
+      });
+    }
+  }
+
+  fs.writeFileSync(OUTPUT_FILE, JSON.stringify(profiles, null, 2));
+  console.log(`Profiles saved to ${OUTPUT_FILE}, flamegraph stacks in ${FOLDED_DIR}/`);
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
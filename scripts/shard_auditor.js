@@ -0,0 +1,177 @@
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+const { spawn } = require("child_process");
+const { variantPrefixes } = require("./lib/prefixes");
+const { readRecords, keyString } = require("./lib/result_store");
+const { auditorGroups, expandAuditorResults } = require("./lib/groups");
+
+// Runs scripts/test_auditor.js split into shards, each against its own `hardhat node`,
+// and merges the shard results into validation_gas_results.json.
+// Shards stream into .shards/shard-<i>.jsonl and skip everything already in the main
+// validation_gas_results.jsonl, so rerunning after an interruption only measures the rest.
+//
+//   node scripts/shard_auditor.js --workers 4 [--base-port 8545]
+
+const ROOT = path.join(__dirname, "..");
+const OUTPUT_FILE = path.join(ROOT, "validation_gas_results.json");
+const STREAM_FILE = path.join(ROOT, "validation_gas_results.jsonl");
+const SHARD_DIR = path.join(ROOT, ".shards"); // per-shard results and logs
+const AUDITCHECK_PREFIXES = variantPrefixes("ipfs");
+const TOKEN_PREFIXES = variantPrefixes("ipfs");
+const GROUPS = auditorGroups(TOKEN_PREFIXES, AUDITCHECK_PREFIXES); // as in test_auditor.js
+const NODE_STARTUP_TIMEOUT = 60000; // ms to wait for a node to answer RPC calls
+
+function parseArgs(argv) {
+  const options = { workers: Math.max(1, Math.floor(os.cpus().length / 2)), basePort: 8545 };
+  for (let i = 0; i < argv.length; i++) {
+    if (argv[i] === "--workers") options.workers = parseInt(argv[++i], 10);
+    else if (argv[i] === "--base-port") options.basePort = parseInt(argv[++i], 10);
+    else throw new Error(`Unknown argument: ${argv[i]}`);
+  }
+  // More shards than measured tokens would only start idle nodes
+  options.workers = Math.min(options.workers, GROUPS.token.representatives.length);
+  return options;
+}
+
+// npx runs hardhat in a child process, so each command gets its own process group
+function spawnLogged(args, logFile, env) {
+  const log = fs.openSync(logFile, "w");
+  return spawn("npx", args, { cwd: ROOT, env: { ...process.env, ...env }, stdio: ["ignore", log, log], detached: true });
+}
+
+function killGroup(child) {
+  try {
+    process.kill(-child.pid, "SIGTERM");
+  } catch (error) {
+    // already gone
+  }
+}
+
+async function waitForNode(url) {
+  const deadline = Date.now() + NODE_STARTUP_TIMEOUT;
+  while (Date.now() < deadline) {
+    try {
+      const response = await fetch(url, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ jsonrpc: "2.0", id: 1, method: "eth_chainId", params: [] }),
+      });
+      if (response.ok) return;
+    } catch (error) {
+      // not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, 250));
+  }
+  throw new Error(`Node at ${url} did not start within ${NODE_STARTUP_TIMEOUT} ms`);
+}
+
+function waitForExit(child) {
+  return new Promise((resolve, reject) => {
+    child.on("error", reject);
+    child.on("close", resolve);
+  });
+}
+
+async function runShard(index, count, basePort) {
+  const port = basePort + index;
+  const url = `http://127.0.0.1:${port}`;
+  const outputFile = path.join(SHARD_DIR, `shard-${index}.json`);
+  const streamFile = path.join(SHARD_DIR, `shard-${index}.jsonl`);
+
+  const node = spawnLogged(["hardhat", "node", "--hostname", "127.0.0.1", "--port", String(port)], path.join(SHARD_DIR, `node-${index}.log`));
+  try {
+    await waitForNode(url);
+    console.log(`Shard ${index}/${count}: node ready on port ${port}`);
+
+    const script = spawnLogged(
+      ["hardhat", "run", "--no-compile", "--network", "shard", "scripts/test_auditor.js"],
+      path.join(SHARD_DIR, `shard-${index}.log`),
+      {
+        SHARD_RPC_URL: url,
+        AUDITOR_SHARD: `${index}/${count}`,
+        AUDITOR_OUTPUT_FILE: outputFile,
+        AUDITOR_STREAM_FILE: streamFile,
+        AUDITOR_SEED_FILE: STREAM_FILE,
+      }
+    );
+    const code = await waitForExit(script);
+    if (code !== 0) {
+      throw new Error(`Shard ${index} exited with ${code}, see ${path.relative(ROOT, SHARD_DIR)}/shard-${index}.log`);
+    }
+    console.log(`Shard ${index}/${count}: done`);
+  } finally {
+    killGroup(node);
+  }
+}
+
+// Move the records of all shard streams into the main stream, once per key. Shard streams
+// are only removed after the main stream holds their records.
+function consolidateStreams() {
+  const shardStreams = fs.existsSync(SHARD_DIR)
+    ? fs.readdirSync(SHARD_DIR).filter((name) => /^shard-\d+\.jsonl$/.test(name)).map((name) => path.join(SHARD_DIR, name))
+    : [];
+  const records = readRecords(STREAM_FILE);
+  const seen = new Set(records.map((record) => keyString(record.key)));
+  const added = [];
+  for (const file of shardStreams) {
+    for (const record of readRecords(file)) {
+      const key = keyString(record.key);
+      if (!seen.has(key)) {
+        seen.add(key);
+        added.push(record);
+      }
+    }
+  }
+  if (added.length) {
+    fs.appendFileSync(STREAM_FILE, added.map((record) => JSON.stringify(record) + "\n").join(""));
+  }
+  shardStreams.forEach((file) => fs.rmSync(file));
+  return [...records, ...added];
+}
+
+// Same AuditCheck-major order as a single test_auditor.js run, independent of shard timing
+function mergeResults(records) {
+  const rank = (prefixes) => new Map(prefixes.map((prefix, i) => [prefix, i]));
+  const auditCheckRank = rank(AUDITCHECK_PREFIXES);
+  const tokenRank = rank(TOKEN_PREFIXES);
+  // Results streamed before AuditCheckHash was measured only hold the AuditCheck fields
+  const results = expandAuditorResults(
+    records.map(({ result }) => ({ checkContract: "AuditCheck", method: "validateToken", batchSize: 1, gasPerToken: result.gasUsed, ...result })),
+    GROUPS
+  );
+  return results.sort((a, b) =>
+    auditCheckRank.get(a.auditCheckPrefix) - auditCheckRank.get(b.auditCheckPrefix) ||
+    tokenRank.get(a.tokenPrefix) - tokenRank.get(b.tokenPrefix) ||
+    a.checkContract.localeCompare(b.checkContract) ||
+    a.method.localeCompare(b.method) ||
+    a.batchSize - b.batchSize
+  );
+}
+
+async function main() {
+  const { workers, basePort } = parseArgs(process.argv.slice(2));
+  fs.mkdirSync(SHARD_DIR, { recursive: true });
+  // Pick up the streams of an interrupted run before the shards skip what is measured
+  const measured = consolidateStreams().length;
+  console.log(`Running the AuditCheck x SignedToken grid in ${workers} shards (${measured} cells already measured)`);
+
+  const started = Date.now();
+  const outcomes = await Promise.allSettled(Array.from({ length: workers }, (_, i) => runShard(i, workers, basePort)));
+  const failures = outcomes.filter((outcome) => outcome.status === "rejected");
+  failures.forEach((failure) => console.error(failure.reason.message));
+
+  const results = mergeResults(consolidateStreams());
+  fs.writeFileSync(OUTPUT_FILE, JSON.stringify(results, null, 2));
+  console.log(`Results saved to ${OUTPUT_FILE} (${results.length} cells in ${((Date.now() - started) / 1000).toFixed(1)} s)`);
+  if (failures.length) {
+    throw new Error(`${failures.length} of ${workers} shards failed`);
+  }
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -1,14 +1,22 @@
-const { ethers, network } = require("hardhat");
+const { ethers } = require("hardhat");
 const fs = require("fs");
-const path = require("path");
 const { ec } = require("elliptic");
+const { createLayer, deployFromEvaluation, resetNetwork } = require("./lib/harness");
+const { GasBatch } = require("./lib/measure");
+const { variantPrefixes, parseShard, shardItems } = require("./lib/prefixes");
+const { ResultStore, resultKey } = require("./lib/result_store");
+const { auditorGroups, expandAuditorResults } = require("./lib/groups");
 
 // Constants
-const EVALUATION_DIR = "./evaluation"; // Directory for contract artifacts
-const OUTPUT_FILE = "./validation_gas_results.json"; // Output file for results
-const AUDITCHECK_PREFIXES = ["ipfsnone", ...Array.from({ length: 32 }, (_, i) => `ipfs${2 ** (31 - i) - 1}`)]; // AuditCheck optimization prefixes
-const TOKEN_PREFIXES = ["ipfsnone", ...Array.from({ length: 32 }, (_, i) => `ipfs${2 ** (31 - i) - 1}`)]; // Token optimization prefixes
+const OUTPUT_FILE = process.env.AUDITOR_OUTPUT_FILE || "./validation_gas_results.json"; // Output file for results
+const STREAM_FILE = process.env.AUDITOR_STREAM_FILE || "./validation_gas_results.jsonl"; // Results are appended here as they are measured
+const SEED_FILES = process.env.AUDITOR_SEED_FILE ? [process.env.AUDITOR_SEED_FILE] : []; // Read-only stores of already measured cells
+const AUDITCHECK_PREFIXES = variantPrefixes("ipfs"); // AuditCheck optimization prefixes
+const TOKEN_PREFIXES = variantPrefixes("ipfs"); // Token optimization prefixes
+const GROUPS = auditorGroups(TOKEN_PREFIXES, AUDITCHECK_PREFIXES); // One cell is measured per token group and check group
+const SHARD = parseShard(process.env.AUDITOR_SHARD); // "index/count", set by scripts/shard_auditor.js
 const AUDITOR_OPTIMIZED_PREFIX = "ipfs2147483647"; // Fixed optimized prefix for Auditor
+const BATCH_SIZES = (process.env.AUDITOR_BATCH_SIZES || "1,2,4,8,16").split(",").map((size) => parseInt(size, 10)); // validateTokens batch sizes
 const TOKEN_INITIAL_SUPPLY = ethers.parseUnits("1000", 18); // Initial supply for Token contract
 
 // Test key pair
@@ -17,81 +25,139 @@ const testKeyPair = curve.genKeyPair();
 const testPrivateKey = testKeyPair.getPrivate("hex"); // Hexadecimal private key
 const testPublicKey = Uint8Array.from(testKeyPair.getPublic(false, "array").slice(1)); // Uncompressed public key as Uint8Array
 
-// Helper to reset the Hardhat network
-async function resetNetwork() {
-  console.log("Resetting Hardhat network...");
-  await network.provider.send("hardhat_reset");
-}
-
-// Helper to load contract factory from evaluation artifacts
-async function getContractFactoryFromEvaluation(prefix, contractName) {
-  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
-  const artifact = JSON.parse(fs.readFileSync(artifactPath, "utf8"));
-  const signer = await ethers.provider.getSigner();
-  return new ethers.ContractFactory(artifact.abi, artifact.bytecode, signer);
-}
-
-// Deploy contract and return deployment details
-async function deployContract(prefix, contractName, args = []) {
-  const ContractFactory = await getContractFactoryFromEvaluation(prefix, contractName);
-  const contract = await ContractFactory.deploy(...args);
-  const receipt = await contract.deploymentTransaction().wait();
-  console.log(`${contractName} deployed at ${contract.target} with prefix: ${prefix}`);
-  return contract;
+// Every measurement of one token against one AuditCheck prefix: the original AuditCheck, and
+// AuditCheckHash with a single validateToken and with validateTokens batches of the same token variant
+const MEASUREMENTS = [
+  { checkContract: "AuditCheck", method: "validateToken", batchSize: 1 },
+  { checkContract: "AuditCheckHash", method: "validateToken", batchSize: 1 },
+  ...BATCH_SIZES.map((batchSize) => ({ checkContract: "AuditCheckHash", method: "validateTokens", batchSize })),
+];
+
+// Sign the code hash of a token with the test key and register the signature
+async function signToken(token, auditor, testWallet) {
+  const deployedBytecode = await ethers.provider.getCode(token.target);
+  const tokenHash = ethers.keccak256(deployedBytecode);
+  const signatureObj = await testWallet.signingKey.sign(ethers.getBytes(tokenHash));
+  const signature = ethers.concat([signatureObj.r, signatureObj.s, ethers.toBeHex(signatureObj.v)]);
+  await (await token.signToken(auditor.target, signature)).wait();
 }
 
 // Main data collection function
 async function collectData() {
-  const results = [];
+  const store = new ResultStore(STREAM_FILE, SEED_FILES);
+  // The original AuditCheck cells keep their key without params, so earlier streams still resume
+  const cellKey = (tokenPrefix, auditCheckPrefix, { checkContract, method, batchSize }) =>
+    resultKey(
+      "test_auditor",
+      "SignedToken",
+      { auditor: AUDITOR_OPTIMIZED_PREFIX, auditCheck: auditCheckPrefix, token: tokenPrefix },
+      checkContract === "AuditCheck" ? {} : { checkContract, method, batchSize }
+    );
 
   try {
-    for (const auditCheckPrefix of AUDITCHECK_PREFIXES) {
-      for (const tokenPrefix of TOKEN_PREFIXES) {
-        console.log(`\nTesting Token (${tokenPrefix}) with AuditCheck (${auditCheckPrefix})`);
-
-        // Reset the network
-        await resetNetwork();
+    await resetNetwork();
+    const [, checkerDeployer] = await ethers.getSigners();
+    const testWallet = new ethers.Wallet(testPrivateKey);
+
+    // Deploy the Auditor and one AuditCheck and AuditCheckHash variant per group once and snapshot
+    // that state. The checks are deployed from a second account, so the token still gets the
+    // address (and with it the calldata cost) it had when each cell started from a reset.
+    const fixture = await createLayer(async () => {
+      // Deploy Auditor (optimized) with the consistent test public key
+      const { contract: auditor } = await deployFromEvaluation(AUDITOR_OPTIMIZED_PREFIX, "Auditor", [testPublicKey]);
+
+      const checks = { AuditCheck: new Map(), AuditCheckHash: new Map() };
+      for (const auditCheckPrefix of AUDITCHECK_PREFIXES) {
+        for (const [checkContract, contracts] of Object.entries(checks)) {
+          if (GROUPS.checks[checkContract].representativeOf.get(auditCheckPrefix) !== auditCheckPrefix) continue;
+          const { contract } = await deployFromEvaluation(auditCheckPrefix, checkContract, [], checkerDeployer);
+          contracts.set(auditCheckPrefix, contract);
+        }
+      }
+      return { auditor, checks };
+    });
+    const { auditor, checks } = fixture.value;
+
+    // Each shard measures its share of the tokens against all AuditChecks
+    for (const tokenPrefix of shardItems(GROUPS.token.representatives, SHARD)) {
+      const pending = AUDITCHECK_PREFIXES.flatMap((auditCheckPrefix) =>
+        MEASUREMENTS.filter(
+          (measurement) =>
+            checks[measurement.checkContract].has(auditCheckPrefix) && !store.has(cellKey(tokenPrefix, auditCheckPrefix, measurement))
+        ).map(
+          (measurement) => ({ auditCheckPrefix, ...measurement })
+        )
+      );
+      if (!pending.length) {
+        console.log(`Skipping Token (${tokenPrefix}), all AuditChecks already measured`);
+        continue;
+      }
+      console.log(`\nTesting Token (${tokenPrefix}) with ${pending.length} AuditCheck measurements`);
 
-        // Deploy Auditor (optimized) with the consistent test public key
-        const auditor = await deployContract(AUDITOR_OPTIMIZED_PREFIX, "Auditor", [testPublicKey]);
+      // Go back to the state with only the Auditor and the checks deployed
+      await fixture.restore();
 
-        // Deploy Token
-        const token = await deployContract(tokenPrefix, "SignedToken", [
+      // Deploy and sign the measured token first, so it keeps its address, then the copies
+      // needed for the largest pending batch
+      const batchTokens = [];
+      const largestBatch = Math.max(...pending.map((cell) => cell.batchSize));
+      for (let i = 0; i < largestBatch; i++) {
+        const { contract: token } = await deployFromEvaluation(tokenPrefix, "SignedToken", [
           "Test Token",
           "TT",
           TOKEN_INITIAL_SUPPLY,
         ]);
+        await signToken(token, auditor, testWallet);
+        batchTokens.push(token.target);
+      }
 
-        // Deploy AuditCheck
-        const auditCheck = await deployContract(auditCheckPrefix, "AuditCheck");
-
-        // Sign the token hash
-        const deployedBytecode = await ethers.provider.getCode(token.target);
-        const tokenHash = ethers.keccak256(deployedBytecode);
-        const testWallet = new ethers.Wallet(testPrivateKey);
-        const signatureObj = await testWallet.signingKey.sign(ethers.getBytes(tokenHash));
-        const signature = ethers.concat([signatureObj.r, signatureObj.s, ethers.toBeHex(signatureObj.v)]);
-
-        // Sign the token using SignedToken contract
-        await token.signToken(auditor.target, signature);
-
-        // Validate the token
-        const gasUsed = await auditCheck.validateToken.estimateGas(token.target);
+      // Validate the token with every check variant in one batch, estimateGas leaves the state untouched
+      const batch = new GasBatch();
+      pending.forEach(({ auditCheckPrefix, checkContract, method, batchSize }, i) => {
+        const args = method === "validateTokens" ? [batchTokens.slice(0, batchSize)] : [batchTokens[0]];
+        batch.add(String(i), checks[checkContract].get(auditCheckPrefix), method, args);
+      });
+      const gas = await batch.estimate();
+
+      pending.forEach((cell, i) => {
+        const { auditCheckPrefix, checkContract, method, batchSize } = cell;
+        const gasUsed = gas[String(i)];
         console.log(
-          `Gas used for Token (${tokenPrefix}) with AuditCheck (${auditCheckPrefix}): ${gasUsed.toString()}`
+          `Gas used for Token (${tokenPrefix}) with ${checkContract}.${method} (${auditCheckPrefix}, batch ${batchSize}): ${gasUsed.toString()}`
         );
 
         // Record results
-        results.push({
+        store.append(cellKey(tokenPrefix, auditCheckPrefix, cell), {
           tokenPrefix,
           auditCheckPrefix,
+          checkContract,
+          method,
+          batchSize,
           gasUsed: gasUsed.toString(),
+          gasPerToken: (gasUsed / BigInt(batchSize)).toString(),
         });
-      }
+      });
     }
   } catch (error) {
     console.error("Error during data collection:", error);
+    // Fail once the partial results are written, so the pipeline does not stamp this run
+    process.exitCode = 1;
   } finally {
+    // Keep the AuditCheck-major order of the results file
+    // Results streamed before AuditCheckHash was measured only hold the AuditCheck fields
+    // The cells of the other group members get a copy of their representative's result
+    const results = expandAuditorResults(
+      store.results().map((result) => ({ checkContract: "AuditCheck", method: "validateToken", batchSize: 1, gasPerToken: result.gasUsed, ...result })),
+      GROUPS
+    );
+    results.sort((a, b) =>
+      AUDITCHECK_PREFIXES.indexOf(a.auditCheckPrefix) - AUDITCHECK_PREFIXES.indexOf(b.auditCheckPrefix) ||
+      TOKEN_PREFIXES.indexOf(a.tokenPrefix) - TOKEN_PREFIXES.indexOf(b.tokenPrefix) ||
+      a.checkContract.localeCompare(b.checkContract) ||
+      a.method.localeCompare(b.method) ||
+      a.batchSize - b.batchSize
+    );
+
     // Save results to a JSON file
     try {
       fs.writeFileSync(OUTPUT_FILE, JSON.stringify(results, null, 2));
@@ -104,7 +170,7 @@ async function collectData() {
 
 // Run the script
 collectData()
-  .then(() => process.exit(0))
+  .then(() => process.exit())
   .catch((error) => {
     console.error(error);
     process.exit(1);
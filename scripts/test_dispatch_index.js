@@ -0,0 +1,110 @@
+const fs = require("fs");
+const { createLayer, deployFromEvaluation, loadDeployedBytecode, resetNetwork } = require("./lib/harness");
+const { GasBatch } = require("./lib/measure");
+const { ResultStore, resultKey } = require("./lib/result_store");
+const { variantPrefixes } = require("./lib/prefixes");
+
+// Compares the gas of the full bytecode scan (validateToken) with the selector-index lookups
+// (validateTokenIndexed, validateTokenAt with an off-chain computed offset) for every ozTokenA variant.
+
+// Constants
+const OUTPUT_FILE = "./dispatch_index_results.json"; // Output file for results
+const STREAM_FILE = "./dispatch_index_results.jsonl"; // Results are appended here as they are measured, delete it to start over
+const TOKEN_VALIDATOR_PREFIX = "ipfs2147483647"; // Highest optimization for TokenValidator
+const OZ_TOKENA_PREFIXES = variantPrefixes("ipfs"); // ipfs Prefixes for ozTokenA
+const TOKEN_VALIDATOR_THRESHOLD = 12; // Threshold for TokenValidator
+const OZ_TOKEN_INITIAL_SUPPLY = 1000000; // Initial supply for ozTokenA
+
+// Offset of the `PUSH4 a9059cbb EQ PUSH2` entry, found the way validateToken scans for it
+function transferDispatchOffset(code) {
+  for (let i = 0; i < code.length; i++) {
+    const opcode = code[i];
+    if (opcode >= 0x60 && opcode <= 0x62) {
+      i += opcode - 0x5f;
+    } else if (opcode === 0x63 && code.subarray(i + 1, i + 7).equals(Buffer.from("a9059cbb1461", "hex"))) {
+      return i;
+    }
+  }
+  return 0;
+}
+
+async function main() {
+  const store = new ResultStore(STREAM_FILE);
+
+  try {
+    await resetNetwork();
+
+    const fixture = await createLayer(async () => {
+      const { contract } = await deployFromEvaluation(TOKEN_VALIDATOR_PREFIX, "TokenValidator", [TOKEN_VALIDATOR_THRESHOLD]);
+      return contract;
+    });
+    const validator = fixture.value;
+
+    for (const ozTokenAPrefix of OZ_TOKENA_PREFIXES) {
+      const key = resultKey("test_dispatch_index", "ozTokenA", {
+        ozTokenA: ozTokenAPrefix,
+        tokenValidator: TOKEN_VALIDATOR_PREFIX,
+      });
+      if (store.has(key)) {
+        console.log(`Skipping ozTokenA with prefix: ${ozTokenAPrefix}, already measured`);
+        continue;
+      }
+      console.log(`\nTesting ozTokenA with prefix: ${ozTokenAPrefix}`);
+
+      await fixture.restore();
+      const { address: token } = await deployFromEvaluation(ozTokenAPrefix, "ozTokenA", ["ozToken", "ozt", OZ_TOKEN_INITIAL_SUPPLY]);
+      const dispatchOffset = transferDispatchOffset(loadDeployedBytecode(ozTokenAPrefix, "ozTokenA"));
+
+      const gas = await new GasBatch()
+        .add("scan", validator, "validateToken", [token])
+        .add("indexed", validator, "validateTokenIndexed", [token])
+        .add("offset", validator, "validateTokenAt", [token, dispatchOffset])
+        .estimate();
+
+      // All three lookups have to agree on the verdict
+      const verdicts = await Promise.all([
+        validator.validateToken(token),
+        validator.validateTokenIndexed(token),
+        validator.validateTokenAt(token, dispatchOffset),
+      ]);
+      if (new Set(verdicts).size !== 1) {
+        console.warn(`Verdicts differ for ozTokenA (${ozTokenAPrefix}): scan ${verdicts[0]}, indexed ${verdicts[1]}, offset ${verdicts[2]}`);
+      }
+      console.log(`Gas for ozTokenA (${ozTokenAPrefix}): scan ${gas.scan}, indexed ${gas.indexed}, offset ${gas.offset} (at ${dispatchOffset})`);
+
+      store.append(key, {
+        ozTokenAPrefix,
+        dispatchOffset,
+        gasUsedScan: gas.scan.toString(),
+        gasUsedIndexed: gas.indexed.toString(),
+        gasUsedOffset: gas.offset.toString(),
+        verdictScan: verdicts[0],
+        verdictIndexed: verdicts[1],
+        verdictOffset: verdicts[2],
+      });
+    }
+  } catch (error) {
+    console.error("Error during testing:", error);
+    // Fail once the partial results are written, so the pipeline does not stamp this run
+    process.exitCode = 1;
+  } finally {
+    // Keep the order of the ozTokenA prefixes
+    const results = store.results();
+    results.sort((a, b) => OZ_TOKENA_PREFIXES.indexOf(a.ozTokenAPrefix) - OZ_TOKENA_PREFIXES.indexOf(b.ozTokenAPrefix));
+    console.table(results);
+
+    try {
+      fs.writeFileSync(OUTPUT_FILE, JSON.stringify(results, null, 2));
+      console.log(`Results saved to ${OUTPUT_FILE}`);
+    } catch (writeError) {
+      console.error(`Error writing results to file: ${writeError.message}`);
+    }
+  }
+}
+
+main()
+  .then(() => process.exit())
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -1,107 +1,113 @@
-const { ethers, network } = require("hardhat");
 const fs = require("fs");
-const path = require("path");
+const { createLayer, deployFromEvaluation, resetNetwork } = require("./lib/harness");
+const { GasBatch } = require("./lib/measure");
+const { ResultStore, resultKey } = require("./lib/result_store");
+const { variantPrefixes } = require("./lib/prefixes");
+const { VariantGroups } = require("./lib/groups");
 
 // Constants
-const EVALUATION_DIR = "./evaluation"; // Directory where the artifacts are stored
 const OUTPUT_FILE = "./evaluation_results.json"; // Output file for results
+const STREAM_FILE = "./evaluation_results.jsonl"; // Results are appended here as they are measured, delete it to start over
 const TOKEN_VALIDATOR_OPTIMIZED_PREFIX = "ipfs2147483647"; // Highest optimization for TokenValidator
 const TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX = "ipfsnone"; // Unoptimized version for TokenValidator
-const OZ_TOKENA_PREFIXES = ["ipfsnone", ...Array.from({ length: 32 }, (_, i) => `ipfs${2 ** (31 - i) - 1}`)]; // ipfs Prefixes for ozTokenA
+const OZ_TOKENA_PREFIXES = variantPrefixes("ipfs"); // ipfs Prefixes for ozTokenA
+const OZ_TOKENA_GROUPS = new VariantGroups(OZ_TOKENA_PREFIXES, "ozTokenAGroups"); // One ozTokenA is measured per group
 const TOKEN_VALIDATOR_THRESHOLD = 12; // Threshold for TokenValidator
 const OZ_TOKEN_INITIAL_SUPPLY = 1000000; // Initial supply for ozTokenA
 
-// Helper to reset the network
-async function resetNetwork() {
-  console.log("Resetting Hardhat network...");
-  await network.provider.send("hardhat_reset");
-}
-
-// Helper to load a contract factory from the evaluation folder
-async function getContractFactoryFromEvaluation(prefix, contractName) {
-  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
-  const artifact = JSON.parse(fs.readFileSync(artifactPath, "utf8"));
-
-  // Retrieve the first signer
-  const signer = await ethers.provider.getSigner();
-
-  // Create and return the ContractFactory with the signer
-  return new ethers.ContractFactory(artifact.abi, artifact.bytecode, signer);
-}
-
-// Deploy a contract and capture deployment cost
-async function deployContractWithCost(prefix, contractName, constructorArgs = []) {
-  const ContractFactory = await getContractFactoryFromEvaluation(prefix, contractName);
-  const tx = await ContractFactory.getDeployTransaction(...constructorArgs);
-  const signer = await ethers.provider.getSigner();
-  const response = await signer.sendTransaction(tx);
-
-  // Wait for deployment and capture the receipt
-  const receipt = await response.wait();
-  console.log(`${contractName} deployed at ${receipt.contractAddress} with prefix: ${prefix}`);
-  return { address: receipt.contractAddress, deploymentCost: receipt.gasUsed.toString() };
-}
-
 // Run tests
 async function main() {
-  const results = [];
+  const store = new ResultStore(STREAM_FILE);
 
   try {
-    for (const ozTokenAPrefix of OZ_TOKENA_PREFIXES) {
-      console.log(`\nTesting ozTokenA with prefix: ${ozTokenAPrefix}`);
-
-      // Reset the network
-      await resetNetwork();
+    await resetNetwork();
 
-      // Deploy optimized TokenValidator
-      const { address: optimizedAddress } = await deployContractWithCost(
+    // Deploy the optimized and unoptimized TokenValidator once and snapshot that state
+    const fixture = await createLayer(async () => {
+      const optimized = await deployFromEvaluation(
         TOKEN_VALIDATOR_OPTIMIZED_PREFIX,
         "TokenValidator",
         [TOKEN_VALIDATOR_THRESHOLD]
       );
-
-      // Deploy unoptimized TokenValidator
-      const { address: unoptimizedAddress } = await deployContractWithCost(
+      const unoptimized = await deployFromEvaluation(
         TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX,
         "TokenValidator",
         [TOKEN_VALIDATOR_THRESHOLD]
       );
+      return { optimizedValidator: optimized.contract, unoptimizedValidator: unoptimized.contract };
+    });
+    const { optimizedValidator, unoptimizedValidator } = fixture.value;
+
+    // Every prefix is deployed, its deployment cost depends on its own metadata hash. The
+    // validator gas only depends on the runtime code and is taken from the group's representative.
+    const measured = new Map(
+      store.results().filter((result) => !result.measuredPrefix).map((result) => [result.ozTokenAPrefix, result])
+    );
+    for (const ozTokenAPrefix of OZ_TOKENA_PREFIXES) {
+      const representative = OZ_TOKENA_GROUPS.representativeOf.get(ozTokenAPrefix);
+      const prefixes = {
+        ozTokenA: ozTokenAPrefix,
+        tokenValidatorOptimized: TOKEN_VALIDATOR_OPTIMIZED_PREFIX,
+        tokenValidatorUnoptimized: TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX,
+      };
+      if (representative !== ozTokenAPrefix) prefixes.measuredOzTokenA = representative;
+      const key = resultKey("test_from_evaluation_v6", "ozTokenA", prefixes);
+      if (store.has(key) || (representative !== ozTokenAPrefix && measured.has(ozTokenAPrefix))) {
+        console.log(`Skipping ozTokenA with prefix: ${ozTokenAPrefix}, already measured`);
+        continue;
+      }
+      console.log(`\nTesting ozTokenA with prefix: ${ozTokenAPrefix}`);
+
+      // Go back to the state with only the validators deployed
+      await fixture.restore();
 
       // Deploy ozTokenA with name, symbol, and initial supply
-      const { address: ozTokenAddress, deploymentCost } = await deployContractWithCost(
+      const { address: ozTokenAddress, deploymentCost } = await deployFromEvaluation(
         ozTokenAPrefix,
         "ozTokenA",
         ["ozToken", "ozt", OZ_TOKEN_INITIAL_SUPPLY]
       );
 
-      // Estimate gas cost with optimized TokenValidator
-      const tokenValidatorOptimized = await ethers.getContractAt(
-        "TokenValidator",
-        optimizedAddress
-      );
-      const gasOptimized = await tokenValidatorOptimized.validateToken.estimateGas(ozTokenAddress);
+      if (representative !== ozTokenAPrefix) {
+        // Same runtime code as the representative, measured before it in prefix order
+        const { gasUsedOptimized, gasUsedUnoptimized } = measured.get(representative);
+        console.log(`Deployment cost for ozTokenA with prefix=${ozTokenAPrefix}: ${deploymentCost}, gas of ${representative}`);
+        store.append(key, { ozTokenAPrefix, gasUsedOptimized, gasUsedUnoptimized, deploymentCostToken: deploymentCost, measuredPrefix: representative });
+        continue;
+      }
+
+      // Estimate gas cost with the optimized and unoptimized TokenValidator in one batch
+      const { gasOptimized, gasUnoptimized } = await new GasBatch()
+        .add("gasOptimized", optimizedValidator, "validateToken", [ozTokenAddress])
+        .add("gasUnoptimized", unoptimizedValidator, "validateToken", [ozTokenAddress])
+        .estimate();
       console.log(`Estimated gas (optimized) for ozTokenA with prefix=${ozTokenAPrefix}: ${gasOptimized.toString()}`);
-
-      // Estimate gas cost with unoptimized TokenValidator
-      const tokenValidatorUnoptimized = await ethers.getContractAt(
-        "TokenValidator",
-        unoptimizedAddress
-      );
-      const gasUnoptimized = await tokenValidatorUnoptimized.validateToken.estimateGas(ozTokenAddress);
       console.log(`Estimated gas (unoptimized) for ozTokenA with prefix=${ozTokenAPrefix}: ${gasUnoptimized.toString()}`);
 
       // Save results
-      results.push({
+      const result = {
         ozTokenAPrefix,
         gasUsedOptimized: gasOptimized.toString(),
         gasUsedUnoptimized: gasUnoptimized.toString(),
         deploymentCostToken: deploymentCost,
-      });
+      };
+      store.append(key, result);
+      measured.set(ozTokenAPrefix, result);
     }
   } catch (error) {
     console.error("Error during testing:", error);
+    // Fail once the partial results are written, so the pipeline does not stamp this run
+    process.exitCode = 1;
   } finally {
-    // Sort results in ascending order of optimization level
+    // One result per prefix: a direct measurement takes precedence over a record with the
+    // representative's gas, otherwise the latest record wins. Members without any record get a
+    // copy without deployment cost. Sort in ascending order of optimization level.
+    const latest = new Map();
+    for (const result of store.results()) {
+      const current = latest.get(result.ozTokenAPrefix);
+      if (!current || current.measuredPrefix || !result.measuredPrefix) latest.set(result.ozTokenAPrefix, result);
+    }
+    const results = OZ_TOKENA_GROUPS.expand([...latest.values()], "ozTokenAPrefix", { exclude: ["deploymentCostToken"] });
     results.sort((a, b) => {
       const prefixA = a.ozTokenAPrefix;
       const prefixB = b.ozTokenAPrefix;
@@ -130,7 +136,7 @@ async function main() {
 }
 
 main()
-  .then(() => process.exit(0))
+  .then(() => process.exit())
   .catch((error) => {
     console.error(error);
     process.exit(1);
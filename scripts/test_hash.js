@@ -1,93 +1,78 @@
-const { ethers, network } = require("hardhat");
+const { ethers } = require("hardhat");
 const fs = require("fs");
-const path = require("path");
+const { createLayer, deployFromEvaluation, resetNetwork } = require("./lib/harness");
+const { GasBatch } = require("./lib/measure");
+const { ResultStore, resultKey } = require("./lib/result_store");
+const { variantPrefixes } = require("./lib/prefixes");
+const { VariantGroups } = require("./lib/groups");
 
 // File name for saving results
 const OUTPUT_FILE = "./hash_results.json";
+const STREAM_FILE = "./hash_results.jsonl"; // Results are appended here as they are measured, delete it to start over
 
 // Constants
-const EVALUATION_DIR = "./evaluation"; // Directory where the artifacts are stored
 const TOKEN_VALIDATOR_OPTIMIZED_PREFIX = "ipfs2147483647"; // Optimized TokenValidator
 const TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX = "ipfsnone"; // Unoptimized TokenValidator
-const OZ_TOKENA_PREFIXES = ["ipfsnone", ...Array.from({ length: 32 }, (_, i) => `ipfs${2 ** (31 - i) - 1}`)]; // ozTokenA prefixes
-
-// Helper to reset the Hardhat network
-async function resetNetwork() {
-  console.log("Resetting Hardhat network...");
-  await network.provider.send("hardhat_reset");
-}
-
-// Helper to load contract factory from evaluation artifacts
-async function getContractFactoryFromEvaluation(prefix, contractName) {
-  const artifactPath = path.join(EVALUATION_DIR, prefix, `${contractName}.json`);
-  const artifact = JSON.parse(fs.readFileSync(artifactPath, "utf8"));
-
-  // Create and return the ContractFactory
-  const signer = await ethers.provider.getSigner();
-  return new ethers.ContractFactory(artifact.abi, artifact.bytecode, signer);
-}
-
-// Deploy contract and return deployment details
-async function deployContract(prefix, contractName, args = []) {
-  const ContractFactory = await getContractFactoryFromEvaluation(prefix, contractName);
-
-  // Deploy the contract
-  const contract = await ContractFactory.deploy(...args);
-  const receipt = await contract.deploymentTransaction().wait();
-
-  console.log(`${contractName} deployed at ${contract.target} with prefix: ${prefix}`);
-  return { contract, gasUsed: receipt.gasUsed.toString() };
-}
+const OZ_TOKENA_PREFIXES = variantPrefixes("ipfs"); // ozTokenA prefixes
+const OZ_TOKENA_GROUPS = new VariantGroups(OZ_TOKENA_PREFIXES, "ozTokenAGroups"); // One ozTokenA is measured per group
 
 // Run tests
 async function main() {
-  const results = [];
+  const store = new ResultStore(STREAM_FILE);
 
   try {
-    for (const ozTokenAPrefix of OZ_TOKENA_PREFIXES) {
-      console.log(`\nTesting ozTokenA with prefix: ${ozTokenAPrefix}`);
+    await resetNetwork();
 
-      // Reset the network
-      await resetNetwork();
-
-      // Deploy TokenValidator (optimized)
-      const { contract: optimizedValidator } = await deployContract(
+    // Deploy the optimized and unoptimized TokenValidator once and snapshot that state
+    const fixture = await createLayer(async () => {
+      const { contract: optimizedValidator } = await deployFromEvaluation(
         TOKEN_VALIDATOR_OPTIMIZED_PREFIX,
         "TokenValidator",
         [0] // Constructor argument
       );
-
-      // Deploy TokenValidator (unoptimized)
-      const { contract: unoptimizedValidator } = await deployContract(
+      const { contract: unoptimizedValidator } = await deployFromEvaluation(
         TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX,
         "TokenValidator",
         [0] // Constructor argument
       );
+      return { optimizedValidator, unoptimizedValidator };
+    });
+    const { optimizedValidator, unoptimizedValidator } = fixture.value;
+
+    for (const ozTokenAPrefix of OZ_TOKENA_GROUPS.representatives) {
+      const key = resultKey("test_hash", "ozTokenA", {
+        ozTokenA: ozTokenAPrefix,
+        tokenValidatorOptimized: TOKEN_VALIDATOR_OPTIMIZED_PREFIX,
+        tokenValidatorUnoptimized: TOKEN_VALIDATOR_UNOPTIMIZED_PREFIX,
+      });
+      if (store.has(key)) {
+        console.log(`Skipping ozTokenA with prefix: ${ozTokenAPrefix}, already measured`);
+        continue;
+      }
+      console.log(`\nTesting ozTokenA with prefix: ${ozTokenAPrefix}`);
+
+      // Go back to the state with only the validators deployed
+      await fixture.restore();
 
       // Deploy ozTokenA
-      const { contract: ozToken } = await deployContract(ozTokenAPrefix, "ozTokenA", [
+      const { contract: ozToken } = await deployFromEvaluation(ozTokenAPrefix, "ozTokenA", [
         "ozTokenA",
         "ozt",
         ethers.parseUnits("1000000", 18),
       ]);
 
-      // Measure gas for getCodeHashNoMeta() on optimized
-      const gasUsedOptimizedNoMeta = await optimizedValidator
-        .getCodeHashNoMeta.estimateGas(ozToken.target);
-
-      // Measure gas for getCodeHashNoMeta() on unoptimized
-      const gasUsedUnoptimizedNoMeta = await unoptimizedValidator
-        .getCodeHashNoMeta.estimateGas(ozToken.target);
-
-      // Measure gas for getCodeHash() on optimized
-      const gasUsedOptimizedMeta = await optimizedValidator.getCodeHash.estimateGas(
-        ozToken.target
-      );
-
-      // Measure gas for getCodeHash() on unoptimized
-      const gasUsedUnoptimizedMeta = await unoptimizedValidator.getCodeHash.estimateGas(
-        ozToken.target
-      );
+      // Measure getCodeHashNoMeta() and getCodeHash() on both validators in one batch
+      const {
+        gasUsedOptimizedNoMeta,
+        gasUsedUnoptimizedNoMeta,
+        gasUsedOptimizedMeta,
+        gasUsedUnoptimizedMeta,
+      } = await new GasBatch()
+        .add("gasUsedOptimizedNoMeta", optimizedValidator, "getCodeHashNoMeta", [ozToken.target])
+        .add("gasUsedUnoptimizedNoMeta", unoptimizedValidator, "getCodeHashNoMeta", [ozToken.target])
+        .add("gasUsedOptimizedMeta", optimizedValidator, "getCodeHash", [ozToken.target])
+        .add("gasUsedUnoptimizedMeta", unoptimizedValidator, "getCodeHash", [ozToken.target])
+        .estimate();
 
       console.log(
         `Gas results for ozTokenA (${ozTokenAPrefix}): \n` +
@@ -95,7 +80,7 @@ async function main() {
         `Unoptimized - NoMeta: ${gasUsedUnoptimizedNoMeta.toString()}, Meta: ${gasUsedUnoptimizedMeta.toString()}`
       );
 
-      results.push({
+      store.append(key, {
         ozTokenAPrefix,
         gasUsedOptimizedNoMeta: gasUsedOptimizedNoMeta.toString(),
         gasUsedUnoptimizedNoMeta: gasUsedUnoptimizedNoMeta.toString(),
@@ -105,8 +90,11 @@ async function main() {
     }
   } catch (error) {
     console.error("Error during testing:", error);
+    // Fail once the partial results are written, so the pipeline does not stamp this run
+    process.exitCode = 1;
   } finally {
-    // Save results to console and JSON
+    // Save results to console and JSON, the other group members get a copy
+    const results = OZ_TOKENA_GROUPS.expand(store.results(), "ozTokenAPrefix");
     console.log("Test results:");
     console.table(results);
 
@@ -120,7 +108,7 @@ async function main() {
 }
 
 main()
-  .then(() => process.exit(0))
+  .then(() => process.exit())
   .catch((error) => {
     console.error(error);
     process.exit(1);
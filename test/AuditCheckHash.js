@@ -0,0 +1,84 @@
+const { ethers } = require("hardhat");
+const { ec } = require("elliptic");
+const { expect } = require("chai");
+
+describe("AuditCheckHash", function () {
+    let auditor, auditCheck, auditCheckHash;
+    let owner;
+    let publicKeyBytes, privateKey;
+
+    // Deploy a SignedToken and sign its code hash with `wallet` through the auditor contract
+    async function deploySignedToken(wallet, auditorContract) {
+        const SignedToken = await ethers.getContractFactory("SignedToken");
+        const token = await SignedToken.deploy("Test Token", "TT", 1000);
+        if (wallet) {
+            const tokenHash = ethers.keccak256(await ethers.provider.getCode(token.target));
+            const signatureObj = await wallet.signingKey.sign(ethers.getBytes(tokenHash));
+            const signature = ethers.concat([signatureObj.r, signatureObj.s, ethers.toBeHex(signatureObj.v)]);
+            await token.connect(owner).signToken(auditorContract, signature);
+        }
+        return token;
+    }
+
+    before(async () => {
+        [owner] = await ethers.getSigners();
+
+        // Generate a new random wallet and derive the uncompressed public key
+        const wallet = ethers.Wallet.createRandom();
+        privateKey = wallet.privateKey;
+        const curve = new ec("secp256k1");
+        const key = curve.keyFromPublic(ethers.getBytes(wallet.publicKey));
+        publicKeyBytes = Uint8Array.from(key.getPublic(false).encode("array").slice(1));
+
+        const Auditor = await ethers.getContractFactory("Auditor");
+        auditor = await Auditor.deploy(publicKeyBytes);
+
+        const AuditCheck = await ethers.getContractFactory("AuditCheck");
+        auditCheck = await AuditCheck.deploy();
+
+        const AuditCheckHash = await ethers.getContractFactory("AuditCheckHash");
+        auditCheckHash = await AuditCheckHash.deploy();
+    });
+
+    it("should agree with AuditCheck on signed, imposter signed and unsigned tokens", async () => {
+        const imposter = new ethers.Wallet("0xaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa");
+        const tokens = [
+            await deploySignedToken(new ethers.Wallet(privateKey), auditor.target),
+            await deploySignedToken(imposter, auditor.target),
+            await deploySignedToken(new ethers.Wallet(privateKey), ethers.ZeroAddress),
+            await deploySignedToken(null),
+        ];
+
+        for (const [token, expected] of tokens.map((token, i) => [token, i === 0])) {
+            expect(await auditCheck.validateToken(token.target)).to.equal(expected);
+            expect(await auditCheckHash.validateToken(token.target)).to.equal(expected);
+        }
+
+        const gasCopy = await auditCheck.validateToken.estimateGas(tokens[0].target);
+        const gasHash = await auditCheckHash.validateToken.estimateGas(tokens[0].target);
+        console.log("Gas used for validateToken (copy):", gasCopy.toString(), "(extcodehash):", gasHash.toString());
+        expect(gasHash).to.be.below(gasCopy);
+    });
+
+    it("should validate a batch of tokens", async () => {
+        const auditorWallet = new ethers.Wallet(privateKey);
+        const signed = [];
+        for (let i = 0; i < 4; i++) {
+            signed.push(await deploySignedToken(auditorWallet, auditor.target));
+        }
+        const unsigned = await deploySignedToken(null);
+        const batch = [signed[0].target, unsigned.target, ...signed.slice(1).map((token) => token.target)];
+
+        const results = await auditCheckHash.validateTokens(batch);
+        expect(results).to.deep.equal([true, false, true, true, true]);
+
+        // Shared auditor lookups make the batch cheaper than one call per token
+        const gasBatch = await auditCheckHash.validateTokens.estimateGas(batch);
+        let gasSingle = 0n;
+        for (const token of batch) {
+            gasSingle += await auditCheckHash.validateToken.estimateGas(token);
+        }
+        console.log("Gas used for validateTokens:", gasBatch.toString(), "single calls:", gasSingle.toString());
+        expect(gasBatch).to.be.below(gasSingle);
+    });
+});
@@ -1,6 +1,18 @@
 const { expect } = require('chai');
 const hre = require("hardhat");
 
+// Offset of `PUSH4 a9059cbb EQ PUSH2`, skipping PUSH1-3 immediates like validateToken does
+function transferDispatchOffset(code) {
+    for (let i = 0; i < code.length; i++) {
+        if (code[i] >= 0x60 && code[i] <= 0x62) {
+            i += code[i] - 0x5f;
+        } else if (code[i] === 0x63 && code[i + 1] === 0xa9 && code[i + 2] === 0x05 && code[i + 3] === 0x9c && code[i + 4] === 0xbb && code[i + 5] === 0x14 && code[i + 6] === 0x61) {
+            return i;
+        }
+    }
+    return 0;
+}
+
 describe("TokenValidator", function () {
     let Testcoin;
     let testcoin;
@@ -67,7 +79,57 @@ describe("TokenValidator", function () {
         expect(res).to.equal(true);
     });
 
-    
+    it('Should give the same verdicts with the dispatcher walk', async function () {
+        for (const token of [testcoin, shitcoin, ozTokenA, ozTokenB]) {
+            const expected = await tokenValidator.validateToken(token);
+            const res = await tokenValidator.validateTokenIndexed(token);
+            expect(res).to.equal(expected);
+        }
+
+        const gasScan = await tokenValidator.validateToken.estimateGas(ozTokenA);
+        const gasIndexed = await tokenValidator.validateTokenIndexed.estimateGas(ozTokenA);
+        console.log('gasUsed scan:', gasScan.toString(), 'indexed:', gasIndexed.toString());
+        expect(gasIndexed).to.be.below(gasScan);
+    });
+
+    it('Should give the same verdicts with a supplied dispatch offset', async function () {
+        for (const token of [testcoin, shitcoin, ozTokenA, ozTokenB]) {
+            const expected = await tokenValidator.validateToken(token);
+            const code = hre.ethers.getBytes(await hre.ethers.provider.getCode(token.target));
+            const offset = transferDispatchOffset(code);
+
+            expect(await tokenValidator.validateTokenAt(token, offset)).to.equal(expected);
+            // a wrong offset falls back to the dispatcher walk and the full scan
+            expect(await tokenValidator.validateTokenAt(token, offset + 1)).to.equal(expected);
+        }
+    });
+
+    it('Should cache verdicts by code hash', async function () {
+        const expected = await tokenValidator.validateToken(ozTokenA);
+        expect(await tokenValidator.isVerdictCached(ozTokenA)).to.equal(false);
+
+        const gasCold = await tokenValidator.validateTokenCached.estimateGas(ozTokenA);
+        await (await tokenValidator.validateTokenCached(ozTokenA)).wait();
+        const gasWarm = await tokenValidator.validateTokenCached.estimateGas(ozTokenA);
+        console.log('gasUsed cold:', gasCold.toString(), 'warm:', gasWarm.toString());
+
+        expect(await tokenValidator.isVerdictCached(ozTokenA)).to.equal(true);
+        expect(await tokenValidator.validateTokenCached.staticCall(ozTokenA)).to.equal(expected);
+        expect(gasWarm).to.be.below(gasCold);
+    });
+
+    it('Should re-check cached verdicts against the current threshold', async function () {
+        await (await tokenValidator.validateTokenCached(shitcoin)).wait();
+
+        for (const threshold of [0, 1000, 11]) {
+            await (await tokenValidator.setValidationThreshold(threshold)).wait();
+            for (const token of [ozTokenA, shitcoin]) {
+                const expected = await tokenValidator.validateToken(token);
+                expect(await tokenValidator.validateTokenCached.staticCall(token)).to.equal(expected);
+            }
+        }
+    });
+
     it('Should be able to validate a token to a known hash', async function () {
         const result1 = await tokenValidator.getCodeHash(ozTokenA);
         const result2 = await tokenValidator.getCodeHash(ozTokenB); 
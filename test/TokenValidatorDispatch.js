@@ -0,0 +1,78 @@
+const { expect } = require('chai');
+const hre = require("hardhat");
+
+// Crafted dispatchers where the dispatcher walk or a supplied offset point at another
+// `PUSH4 a9059cbb EQ PUSH2` than the byte scan of validateToken stops at. validateTokenIndexed
+// and validateTokenAt have to give the verdict of validateToken all the same.
+const CASE_ADDRESS_BASE = 0xf023n << 144n;
+const THRESHOLD = 2;
+const PATTERN = "63a9059cbb1461"; // PUSH4 a9059cbb EQ PUSH2
+const FAIL_BODY = "5b" + "6001600210" + "600110" + "600110" + "f3"; // JUMPDEST, three comparisons, RETURN
+const PASS_BODY = "5b" + "f3"; // JUMPDEST RETURN
+
+function hex16(value) {
+    return value.toString(16).padStart(4, "0");
+}
+
+// head(fail, pass) followed by the two bodies, head gets their offsets
+function withBodies(head) {
+    const fail = head(0, 0).length / 2;
+    const pass = fail + FAIL_BODY.length / 2;
+    return "0x" + head(fail, pass) + FAIL_BODY + PASS_BODY;
+}
+
+const CASES = [
+    {
+        name: "a decoy pattern before the dispatcher entry",
+        code: withBodies((fail, pass) => PATTERN + hex16(fail) + "50" + PATTERN + hex16(pass) + "57" + "00"),
+        offsets: [0, 10],
+        verdict: false,
+    },
+    {
+        name: "a second entry after the one the scan finds",
+        code: withBodies((fail, pass) => PATTERN + hex16(pass) + "57" + PATTERN + hex16(fail) + "57" + "00"),
+        offsets: [0, 10],
+        verdict: true,
+    },
+    {
+        name: "an entry inside PUSH3 data, skipped by the scan",
+        code: withBodies((fail, pass) => "62" + PATTERN + hex16(fail) + "50" + PATTERN + hex16(pass) + "57" + "00"),
+        offsets: [1, 11],
+        verdict: true,
+    },
+    {
+        name: "an entry inside PUSH9 data, skipped by the walk",
+        code: withBodies((fail, pass) => "68" + PATTERN + hex16(fail) + "50" + PATTERN + hex16(pass) + "57" + "00"),
+        offsets: [1, 11],
+        verdict: false,
+    },
+];
+
+function caseAddress(index) {
+    return "0x" + (CASE_ADDRESS_BASE + BigInt(index)).toString(16).padStart(40, "0");
+}
+
+describe("TokenValidator crafted dispatchers", function () {
+    let tokenValidator;
+
+    before(async function () {
+        const TokenValidator = await hre.ethers.getContractFactory("TokenValidator");
+        tokenValidator = await TokenValidator.deploy(THRESHOLD);
+        await tokenValidator.waitForDeployment();
+
+        for (const [index, { code }] of CASES.entries()) {
+            await hre.network.provider.send("hardhat_setCode", [caseAddress(index), code]);
+        }
+    });
+
+    for (const [index, { name, offsets, verdict }] of CASES.entries()) {
+        it(`Should give the verdict of validateToken for ${name}`, async function () {
+            const token = caseAddress(index);
+            expect(await tokenValidator.validateToken(token)).to.equal(verdict);
+            expect(await tokenValidator.validateTokenIndexed(token)).to.equal(verdict);
+            for (const offset of offsets) {
+                expect(await tokenValidator.validateTokenAt(token, offset)).to.equal(verdict);
+            }
+        });
+    }
+});
@@ -0,0 +1,54 @@
+const { expect } = require('chai');
+const hre = require("hardhat");
+const vectors = require("./vectors/token_validator.json");
+
+// The vectors are shared with test/test_validator.py, which runs them through the offline
+// port in analysis/validator.py: both have to give the outcome recorded in the file.
+const VECTOR_ADDRESS_BASE = 0xf022n << 144n; // same address range as analysis/fuzz.py
+const CALL_GAS_LIMIT = 1000000; // keeps the loop vectors short
+const PANIC_OUTCOMES = { 0x11: "underflow", 0x32: "out of bounds" };
+
+function vectorAddress(index) {
+    return "0x" + (VECTOR_ADDRESS_BASE + BigInt(index)).toString(16).padStart(40, "0");
+}
+
+// Outcome of a validateToken call in the terms of analysis/fuzz.py
+async function outcomeOf(call) {
+    try {
+        return (await call) ? "pass" : "fail";
+    } catch (error) {
+        const message = String(error.message).toLowerCase();
+        let panic = null;
+        if (error.revert && error.revert.name === "Panic") {
+            panic = Number(error.revert.args[0]);
+        } else if (typeof error.data === "string" && error.data.startsWith("0x4e487b71")) {
+            panic = parseInt(error.data.slice(10), 16);
+        } else if (/panic code 0x([0-9a-f]+)/.test(message)) {
+            panic = parseInt(message.match(/panic code 0x([0-9a-f]+)/)[1], 16);
+        }
+        if (panic !== null) return PANIC_OUTCOMES[panic] || `panic 0x${panic.toString(16)}`;
+        return message.includes("out of gas") ? "out of gas" : "revert";
+    }
+}
+
+describe("TokenValidator vectors", function () {
+    let tokenValidator;
+
+    before(async function () {
+        const TokenValidator = await hre.ethers.getContractFactory("TokenValidator");
+        tokenValidator = await TokenValidator.deploy(12);
+        await tokenValidator.waitForDeployment();
+
+        for (const [index, vector] of vectors.entries()) {
+            await hre.network.provider.send("hardhat_setCode", [vectorAddress(index), vector.code]);
+        }
+    });
+
+    for (const [index, vector] of vectors.entries()) {
+        it(`Should give "${vector.outcome}" for ${vector.name}`, async function () {
+            await tokenValidator.setValidationThreshold(vector.threshold);
+            const outcome = await outcomeOf(tokenValidator.validateToken(vectorAddress(index), { gasLimit: CALL_GAS_LIMIT }));
+            expect(outcome).to.equal(vector.outcome);
+        });
+    }
+});
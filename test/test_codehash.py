@@ -0,0 +1,71 @@
+"""Edge cases of getCodeHashNoMeta and the keccak backends of analysis/codehash.py."""
+import random
+
+import pytest
+
+from analysis.codehash import _BACKENDS, get_keccak, hash_code, metadata_length
+
+EMPTY_KECCAK = bytes.fromhex("c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470")
+ABC_KECCAK = bytes.fromhex("4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45")
+CODE = bytes.fromhex("6080604052")
+METADATA = bytes.fromhex("a2646970667358") + bytes(3)  # CBOR map start, 10 bytes in total
+
+
+def test_metadata_is_stripped():
+    code = CODE + METADATA + bytes([0, len(METADATA)])
+    keccak256 = get_keccak()
+    assert metadata_length(code) == len(METADATA)
+    assert hash_code(code, keccak256) == (keccak256(code), keccak256(CODE), len(METADATA))
+
+
+@pytest.mark.parametrize("code", [b"", b"\x01"], ids=["empty", "one byte"])
+def test_code_too_short_reverts(code):
+    # bytecode.length - 2 underflows in the contract
+    assert metadata_length(code) is None
+    result = hash_code(code)
+    assert result.no_meta_hash is None and result.meta_length == 0
+
+
+def test_empty_code_full_hash():
+    assert hash_code(b"").full_hash == EMPTY_KECCAK
+
+
+def test_last_byte_larger_than_code_keeps_code():
+    code = CODE + b"\xff"
+    assert metadata_length(code) == 0
+    result = hash_code(code)
+    assert result.no_meta_hash == result.full_hash
+
+
+def test_length_reaching_the_first_byte_reverts():
+    # size - m - 2 underflows when m == size - 1
+    code = b"\xa2" + bytes(3) + b"\x04"
+    assert metadata_length(code) is None
+
+
+def test_no_cbor_start_keeps_code():
+    code = CODE + b"\x00\x03"
+    assert metadata_length(code) == 0
+    assert hash_code(code).no_meta_hash == hash_code(code).full_hash
+
+
+def test_only_the_last_byte_counts():
+    # uint8(bytecode[len - 2] << 8) is always 0, a two byte length is read as its low byte
+    code = CODE + METADATA + bytes([1, len(METADATA)])
+    assert metadata_length(code) == len(METADATA)
+
+
+@pytest.mark.parametrize("name", sorted(_BACKENDS))
+def test_backends_agree(name):
+    try:
+        keccak256 = get_keccak(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+    reference = get_keccak("python")
+    assert keccak256(b"") == EMPTY_KECCAK
+    assert keccak256(b"abc") == ABC_KECCAK
+    rng = random.Random(4)
+    for length in (1, 135, 136, 137, 272, 1000):  # around the 136 byte rate
+        data = bytes(rng.randrange(256) for _ in range(length))
+        assert keccak256(data) == reference(data)
+        assert keccak256(memoryview(data)) == reference(data)
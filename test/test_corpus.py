@@ -0,0 +1,68 @@
+"""The lockstep scan of BytecodeCorpus against the scalar validate_token path."""
+import random
+
+import pytest
+
+from analysis.corpus import BytecodeCorpus, VALIDATOR_SCAN_STEP
+from analysis.validator import TRANSFER_PATTERN, ValidatorRevert, find_transfer_start, validate_token
+
+BODY = bytes.fromhex("600160021015600314f3")  # three comparisons, then RETURN
+FRAGMENTS = [
+    TRANSFER_PATTERN + b"\x00\x0a",
+    TRANSFER_PATTERN,  # target bytes cut off when it ends the code
+    TRANSFER_PATTERN[:3],
+    b"\x60", b"\x61", b"\x62", b"\x63",  # PUSH1-4, immediates taken from what follows
+    bytes.fromhex("6263a9059cbb"),  # pattern start hidden in a PUSH3 immediate
+    bytes.fromhex("5b600a56"),  # loop back to 10
+    BODY,
+]
+EDGE_CASES = [
+    b"",
+    b"\x63",
+    b"\x62\x63",
+    b"\x60\x63\xa9",  # shorter than the longest scan step
+    bytes.fromhex("600163a905"),  # PUSH4 at the end, the scan reads past it
+    TRANSFER_PATTERN + b"\x00",  # one target byte
+    bytes.fromhex("6001") + TRANSFER_PATTERN,  # pattern ending the code
+    bytes.fromhex("6163a9059cbb1461000a"),  # PUSH2 immediate swallows the PUSH4
+    bytes.fromhex("62ffff"),  # PUSH3 immediate cut off
+    TRANSFER_PATTERN + b"\x00\x0a\x00" + BODY,
+    TRANSFER_PATTERN + b"\x00\x0a\x00" + BODY[:-3],  # PUSH1 and EQ, the walk reads past the end
+]
+
+
+def random_code(rng):
+    if rng.random() < 0.3:
+        return bytes(rng.randrange(256) for _ in range(rng.randrange(12)))
+    parts = [rng.choice(FRAGMENTS) if rng.random() < 0.6 else bytes([rng.randrange(256)]) for _ in range(rng.randrange(1, 12))]
+    return b"".join(parts)
+
+
+def scalar_transfer_start(code):
+    try:
+        return find_transfer_start(code), False
+    except ValidatorRevert:
+        return 0, True
+
+
+def assert_same_as_scalar(codes):
+    corpus = BytecodeCorpus.from_bytecodes(enumerate(codes))
+    transfer_start, reverts = corpus.validator_transfer_starts()
+    for k, code in enumerate(codes):
+        assert (int(transfer_start[k]), bool(reverts[k])) == scalar_transfer_start(code), code.hex()
+    assert corpus.validate(threshold=2, gas_limit=1_000_000) == [validate_token(code, 2, 1_000_000) for code in codes]
+
+
+def test_edge_cases_shorter_than_a_scan_step():
+    assert max(len(code) for code in EDGE_CASES[:4]) < int(VALIDATOR_SCAN_STEP.max())
+    assert_same_as_scalar(EDGE_CASES)
+
+
+@pytest.mark.parametrize("code", EDGE_CASES, ids=[code.hex() or "empty" for code in EDGE_CASES])
+def test_edge_case_alone(code):
+    assert_same_as_scalar([code])
+
+
+def test_random_codes():
+    rng = random.Random(20250417)
+    assert_same_as_scalar([random_code(rng) for _ in range(4000)])
@@ -0,0 +1,117 @@
+"""Generators, assembler, on-chain outcome decoding and report of analysis/fuzz.py."""
+import pytest
+
+from analysis.fuzz import (
+    FAIL,
+    GENERATORS,
+    NO_GAS,
+    OUT_OF_BOUNDS_OUTCOME,
+    PASS,
+    REVERT,
+    UNDERFLOW_OUTCOME,
+    Case,
+    _Assembler,
+    _onchain_outcome,
+    build_report,
+    case_seed,
+    generate,
+    run_offline,
+)
+
+PANIC = "0x4e487b71"
+
+
+def panic(code):
+    return PANIC + f"{code:064x}"
+
+
+@pytest.mark.parametrize("generator", sorted(GENERATORS))
+def test_generators_are_deterministic_per_seed(generator):
+    seeds = [case_seed("7", generator, index) for index in range(5)]
+    codes = [generate(generator, seed) for seed in seeds]
+    assert codes == [generate(generator, seed) for seed in seeds]
+    assert len(set(codes)) > 1
+    assert all(isinstance(code, bytes) for code in codes)
+
+
+def test_run_offline_rebuilds_every_case_from_its_seed():
+    cases = run_offline(12, ["dispatcher", "loop", "underflow"], "3", jobs=2)
+    assert [case.index for case in cases] == list(range(12))
+    assert [case.generator for case in cases[:3]] == ["dispatcher", "loop", "underflow"]
+    for case in cases:
+        assert case.code == generate(case.generator, case.seed)
+
+
+def test_assembler_resolves_labels_and_refs():
+    asm = _Assembler()
+    asm.ref("end")  # forward reference
+    asm.emit("56")
+    asm.label("start")
+    asm.push(0x1234)
+    asm.push(1, 4)
+    asm.ref("start")  # backward reference
+    asm.label("end")
+    asm.emit([0xF3])
+    code = asm.assemble()
+    # 0: PUSH2 end, 3: JUMP, 4: JUMPDEST, 5: PUSH2 1234, 8: PUSH4 1, 13: PUSH2 start, 16: JUMPDEST, 17: RETURN
+    assert code.hex() == "610010" + "56" + "5b" + "611234" + "6300000001" + "610004" + "5b" + "f3"
+
+
+@pytest.mark.parametrize("reply, outcome", [
+    ({"result": "0x" + "00" * 31 + "01"}, PASS),
+    ({"result": "0x" + "00" * 32}, FAIL),
+    ({"result": "0x"}, REVERT),
+    ({}, REVERT),
+    ({"error": {"message": "execution reverted", "data": panic(0x11)}}, UNDERFLOW_OUTCOME),
+    ({"error": {"message": "execution reverted", "data": {"data": panic(0x32)}}}, OUT_OF_BOUNDS_OUTCOME),
+    ({"error": {"message": "VM Exception: reverted with panic code 0x32 (Array accessed at an out-of-bounds index)"}}, OUT_OF_BOUNDS_OUTCOME),
+    ({"error": {"message": "execution reverted", "data": panic(0x01)}}, REVERT),
+    ({"error": {"message": "Transaction ran out of gas"}}, NO_GAS),
+    ({"error": {"message": "out of gas"}}, NO_GAS),
+    ({"error": {"message": "execution reverted", "data": "0x"}}, REVERT),
+])
+def test_onchain_outcome(reply, outcome):
+    assert _onchain_outcome(reply) == outcome
+
+
+def case(index, generator, outcome):
+    return Case(index, generator, f"0:{generator}:{index}", bytes(index + 1), {"outcome": outcome})
+
+
+def test_build_report_buckets_mismatches_and_non_terminating_cases():
+    cases = [
+        case(0, "dispatcher", PASS),
+        case(1, "dispatcher", FAIL),
+        case(2, "loop", NO_GAS),
+        case(3, "loop", PASS),
+        case(4, "underflow", UNDERFLOW_OUTCOME),
+    ]
+    onchain = [
+        {"outcome": PASS, "gas": 30_000},
+        {"outcome": PASS, "gas": 50_000},  # mismatch
+        {"outcome": NO_GAS, "gas": None},  # agrees, does not terminate
+        {"outcome": NO_GAS, "gas": None},  # mismatch and does not terminate
+        {"outcome": UNDERFLOW_OUTCOME, "gas": None},
+    ]
+    report = build_report(cases, onchain)
+
+    assert report["outcomes"] == {
+        "dispatcher": {"pass / pass": 1, "fail / pass": 1},
+        "loop": {"out of gas / out of gas": 1, "pass / out of gas": 1},
+        "underflow": {"underflow / underflow": 1},
+    }
+    assert report["mismatchCount"] == 2
+    assert [row["index"] for row in report["mismatches"]] == [1, 3]
+    assert report["nonTerminatingCount"] == 2
+    assert [row["index"] for row in report["nonTerminating"]] == [2, 3]
+    assert [row["index"] for row in report["worstGas"]] == [1, 0]
+    assert report["gasBound"] == {"max": 50_000, "maxPerCodeByte": 30_000.0, "maxCodeSize": 2}
+    assert report["mismatches"][0]["code"] == "0x0000"
+
+
+def test_build_report_offline_only():
+    report = build_report([case(0, "loop", NO_GAS), case(1, "loop", PASS)], limit=1)
+    assert report["outcomes"] == {"loop": {"out of gas": 1, "pass": 1}}
+    assert (report["mismatchCount"], report["nonTerminatingCount"]) == (0, 1)
+    assert "gasBound" not in report
+    assert "onchain" not in report["nonTerminating"][0]
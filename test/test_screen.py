@@ -0,0 +1,107 @@
+"""analysis/screen.py against a stub JSON-RPC client."""
+import pytest
+
+from analysis import codehash
+from analysis.codehash import get_keccak
+from analysis.screen import VALIDATE_TOKEN_SELECTOR, screen
+
+ENTRY = "63a9059cbb1461000a57"  # PUSH4 a9059cbb EQ PUSH2 000a JUMPI
+PASSING = "0x" + ENTRY + "5bf3"  # JUMPDEST RETURN
+FAILING = "0x" + ENTRY + "5b6001600210600110600110f3"  # three comparisons
+TOKEN_VALIDATOR, AUDIT_CHECK = "0x" + "aa" * 20, "0x" + "bb" * 20
+
+
+def address(n):
+    return "0x" + f"{n:040x}"
+
+
+class StubClient:
+    """Answers eth_getCode from ``codes`` and validateToken eth_calls from ``verdicts``."""
+
+    def __init__(self, codes, verdicts=None):
+        self.codes = codes
+        self.verdicts = verdicts or {}
+        self.calls = []
+        self.requests_sent = 0
+        self.batches_sent = 0
+
+    def call_many(self, calls):
+        self.calls.extend(calls)
+        self.requests_sent += len(calls)
+        self.batches_sent += 1
+        return [self._reply(method, params) for method, params in calls]
+
+    def _reply(self, method, params):
+        if method == "eth_getCode":
+            code = self.codes[params[0]]
+            return {"error": {"message": code}} if code.startswith("error") else {"result": code}
+        assert params[0]["data"].startswith(VALIDATE_TOKEN_SELECTOR)
+        verdict = self.verdicts[(params[0]["to"], "0x" + params[0]["data"][-40:])]
+        return {"result": "0x" + f"{int(verdict):064x}"}
+
+
+CODES = {
+    address(1): PASSING,
+    address(2): PASSING,
+    address(3): FAILING,
+    address(4): "0x",
+    address(5): "error: header not found",
+}
+
+
+def test_dedupes_by_code_hash_and_reuses_the_cache():
+    keccak256 = get_keccak()
+    cache = {}
+    client = StubClient(CODES)
+    rows, stats = screen(list(CODES) + [address(1).upper().replace("0X", "0x")], client, 2, cache=cache, keccak256=keccak256)
+
+    assert [row["passed"] for row in rows] == [True, True, False, None, None]
+    assert rows[0]["codeHash"] == rows[1]["codeHash"] == "0x" + keccak256(bytes.fromhex(PASSING[2:])).hex()
+    assert rows[4]["error"] == "error: header not found"
+    assert (stats["addresses"], stats["withCode"], stats["fetchErrors"]) == (5, 3, 1)
+    assert (stats["uniqueCodes"], stats["dedupeHits"], stats["cacheHits"], stats["analyzed"]) == (2, 1, 0, 2)
+    assert len(cache) == 2
+
+    again, stats = screen(list(CODES), StubClient(CODES), 2, cache=cache, keccak256=keccak256)
+    assert again == rows
+    assert (stats["cacheHits"], stats["analyzed"]) == (2, 0)
+
+    # Another threshold is another verdict
+    _, stats = screen(list(CODES), StubClient(CODES), 3, cache=cache, keccak256=keccak256)
+    assert (stats["cacheHits"], stats["analyzed"]) == (0, 2)
+
+
+def test_confirm_calls_the_validator_once_per_code_and_audit_check_per_address():
+    verdicts = {
+        (TOKEN_VALIDATOR, address(1)): True,
+        (TOKEN_VALIDATOR, address(3)): True,  # disagrees with the offline verdict
+        (AUDIT_CHECK, address(1)): True,
+        (AUDIT_CHECK, address(2)): False,
+        (AUDIT_CHECK, address(3)): False,
+    }
+    client = StubClient(CODES, verdicts)
+    rows, stats = screen(list(CODES), client, 2, TOKEN_VALIDATOR, AUDIT_CHECK, keccak256=get_keccak())
+
+    confirm_calls = [params[0] for method, params in client.calls if method == "eth_call"]
+    assert [call["to"] for call in confirm_calls] == [TOKEN_VALIDATOR] * 2 + [AUDIT_CHECK] * 3
+    assert stats["confirmCalls"] == 5
+    assert [row["onchainPassed"] for row in rows] == [True, True, True, None, None]
+    assert [row["auditCheckPassed"] for row in rows] == [True, False, False, None, None]
+    assert stats["validatorMismatches"] == 1
+
+
+def test_refuses_the_pure_python_keccak_unless_asked(monkeypatch):
+    def missing():
+        raise ImportError("not installed")
+
+    backends = {name: missing for name in codehash._BACKENDS}
+    backends["python"] = codehash._BACKENDS["python"]
+    monkeypatch.setattr(codehash, "_BACKENDS", backends)
+    with pytest.raises(ImportError, match="native keccak"):
+        screen(list(CODES), StubClient(CODES), 2)
+    rows, _ = screen(list(CODES), StubClient(CODES), 2, keccak256=get_keccak("python"))
+    assert rows[0]["passed"]
+
+
+def test_validate_token_selector():
+    assert VALIDATE_TOKEN_SELECTOR == "0x" + get_keccak()(b"validateToken(address)")[:4].hex()
@@ -0,0 +1,50 @@
+"""load_records against appends, partial lines and rewrites of a stream."""
+import json
+import os
+
+import pytest
+
+from analysis import stream
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream, "CACHE_DIR", str(tmp_path / "cache"))
+
+
+def append(path, *results, partial=""):
+    with open(path, "a") as file:
+        for result in results:
+            file.write(json.dumps({"key": str(result), "result": result}) + "\n")
+        file.write(partial)
+
+
+def test_appends_are_parsed_incrementally(tmp_path, monkeypatch):
+    path = tmp_path / "results.jsonl"
+    append(path, 1, 2, partial='{"key": "3"')
+    assert stream.load_stream_results(path) == [1, 2]
+
+    parsed = []
+    read_records = stream.read_records
+    monkeypatch.setattr(stream, "read_records", lambda p, offset=0: parsed.append(offset) or read_records(p, offset))
+    with open(path, "a") as file:
+        file.write(', "result": 3}\n')
+    append(path, 4)
+    assert stream.load_stream_results(path) == [1, 2, 3, 4]
+    assert stream.load_stream_results(path) == [1, 2, 3, 4]
+    assert parsed == [len(b'{"key": "1", "result": 1}\n') * 2]
+
+
+def test_rewritten_stream_is_parsed_again(tmp_path):
+    path = tmp_path / "results.jsonl"
+    append(path, 1, 2)
+    assert stream.load_stream_results(path) == [1, 2]
+
+    os.remove(path)
+    append(path, 5, 6, 7)
+    assert stream.load_stream_results(path) == [5, 6, 7]
+
+    with open(path, "w") as file:
+        file.write("")
+    append(path, 8)
+    assert stream.load_stream_results(path) == [8]
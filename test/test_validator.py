@@ -0,0 +1,33 @@
+"""The offline port of validateToken against the vectors of test/TokenValidatorVectors.js.
+
+The Hardhat test checks the same vectors against the deployed contract, so
+together they pin the port to the contract, reverts included.
+"""
+import json
+import os
+
+import pytest
+
+from analysis.fuzz import offline_outcome
+from analysis.validator import OUT_OF_GAS, validate_token
+
+with open(os.path.join(os.path.dirname(__file__), "vectors", "token_validator.json"), "r") as file:
+    VECTORS = json.load(file)
+
+
+@pytest.mark.parametrize("vector", VECTORS, ids=[vector["name"] for vector in VECTORS])
+def test_vector(vector):
+    result = offline_outcome(bytes.fromhex(vector["code"][2:]), vector["threshold"])
+    assert result["outcome"] == vector["outcome"]
+    if "comparisonCount" in vector:
+        assert result["comparisonCount"] == vector["comparisonCount"]
+
+
+def test_long_finite_walk_exceeds_the_gas_budget():
+    # PUSH4 a9059cbb EQ PUSH2 0x000a, then JUMPDESTs up to a RETURN
+    head = bytes.fromhex("63a9059cbb1461000a00")
+    short = head + bytes([0x5B]) * 100 + bytes([0xF3])
+    long = head + bytes([0x5B]) * 40_000 + bytes([0xF3])
+    assert validate_token(short).passed
+    assert validate_token(long).error == OUT_OF_GAS
+    assert validate_token(long, gas_limit=100_000_000).passed